@@ -0,0 +1,133 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+from conversion import get_exchange_rate
+
+# Upstream lookups allowed to run at the same time, matches the shared HTTP pool size
+MAX_CONCURRENCY = 10
+
+
+class AsyncConverter:
+    """
+        Asyncio front end to the conversion module that never blocks the event loop.
+
+        Lookups run on a bounded thread pool through the same rate tables, cache and pooled HTTP
+        session as the synchronous API, so both share warm state. Concurrent requests for the same
+        pair are merged into one lookup, and concurrent misses on the same base currency are merged
+        into one upstream request by the rate cache.
+
+        Parameters:
+        - max_concurrency (int): Maximum number of lookups running at once.
+
+        Example:
+        converter = AsyncConverter(max_concurrency=8)
+        rates = await converter.get_exchange_rates('your_api_key', [('USD', 'EUR'), ('USD', 'JPY')])
+        """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY) -> None:
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='rate-lookup')
+        # (source_currency, target_currency) -> future of the lookup currently running
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+        # Counters
+        self.lookups = 0
+        self.merged = 0
+
+    async def get_exchange_rate(self, api_key: str, source_currency: str, target_currency: str) -> Optional[float]:
+        """
+            Async counterpart of conversion.get_exchange_rate().
+
+            Returns:
+            float or None: The exchange rate, None if it could not be fetched.
+            """
+        key = (source_currency, target_currency)
+
+        # Join a lookup for the same pair that is already running
+        future = self._inflight.get(key)
+        if future is not None:
+            self.merged += 1
+            return await asyncio.shield(future)
+
+        self.lookups += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, get_exchange_rate, api_key, source_currency, target_currency)
+        self._inflight[key] = future
+        try:
+            # Shield the shared future so one cancelled caller does not cancel it for the others
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._inflight.pop(key, None)
+            else:
+                future.add_done_callback(lambda done: self._inflight.pop(key, None))
+
+    async def convert_currency(self, api_key: str, source_currency: str, target_currency: str,
+                               amount: float) -> Optional[float]:
+        """
+            Async counterpart of conversion.convert_currency().
+
+            Returns:
+            float or None: The converted amount, None if the exchange rate could not be fetched.
+            """
+        exchange_rate = await self.get_exchange_rate(api_key, source_currency, target_currency)
+        if exchange_rate is not None:
+            return amount * exchange_rate
+        else:
+            return None
+
+    async def get_exchange_rates(self, api_key: str,
+                                 pairs: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Optional[float]]:
+        """
+            Fetch many pairs concurrently, at most 'max_concurrency' at a time.
+
+            Parameters:
+            - api_key (str): The API key for accessing the FreeCurrencyAPI.
+            - pairs (Iterable[tuple]): (source_currency, target_currency) pairs, duplicates are looked up once.
+
+            Returns:
+            dict: (source_currency, target_currency) -> rate or None.
+            """
+        unique_pairs = list(dict.fromkeys(pairs))
+        rates = await asyncio.gather(*(self.get_exchange_rate(api_key, *pair) for pair in unique_pairs))
+        return dict(zip(unique_pairs, rates))
+
+    def close(self) -> None:
+        # Stop the worker threads once pending lookups finish
+        self._executor.shutdown(wait=False)
+
+
+# Converter shared by the module-level functions
+shared_converter = AsyncConverter()
+
+
+async def get_exchange_rate_async(api_key: str, source_currency: str, target_currency: str) -> Optional[float]:
+    """
+        Retrieve an exchange rate without blocking the event loop, see AsyncConverter.get_exchange_rate().
+
+        Example:
+        rate = await get_exchange_rate_async('your_api_key', 'USD', 'EUR')
+        """
+    return await shared_converter.get_exchange_rate(api_key, source_currency, target_currency)
+
+
+async def convert_currency_async(api_key: str, source_currency: str, target_currency: str,
+                                 amount: float) -> Optional[float]:
+    """
+        Convert an amount without blocking the event loop, see AsyncConverter.convert_currency().
+
+        Example:
+        converted_amount = await convert_currency_async('your_api_key', 'USD', 'EUR', 100.0)
+        """
+    return await shared_converter.convert_currency(api_key, source_currency, target_currency, amount)
+
+
+async def get_exchange_rates_async(api_key: str,
+                                   pairs: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Optional[float]]:
+    """
+        Fetch many pairs concurrently, see AsyncConverter.get_exchange_rates().
+
+        Example:
+        rates = await get_exchange_rates_async('your_api_key', [('USD', 'EUR'), ('EUR', 'JPY')])
+        """
+    return await shared_converter.get_exchange_rates(api_key, pairs)
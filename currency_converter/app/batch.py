@@ -0,0 +1,300 @@
+import csv
+import json
+import sys
+from decimal import Decimal
+from itertools import islice
+from math import isnan
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+import numpy as np
+from conversion import get_exchange_rate
+from decimal_conversion import (DEFAULT_ROUNDING, convert_exact, convert_minor_units, decimal_to_minor_units,
+                                format_minor_units, to_decimal)
+from currencies import is_valid_currency
+from logs import log_error
+from rate_history import get_historical_rates
+
+# Rows converted per vectorized pass, bounds memory regardless of file size
+CHUNK_SIZE = 65536
+
+# Column names shared with the command-line arguments
+SOURCE_COLUMN = 'source_currency'
+TARGET_COLUMN = 'target_currency'
+AMOUNT_COLUMN = 'amount'
+CONVERTED_COLUMN = 'converted_amount'
+# Optional YYYY-MM-DD column, dated rows convert at the rate of their own date
+DATE_COLUMN = 'date'
+
+
+def read_rows(input_path: str) -> Iterator[Dict[str, str]]:
+    """
+        Stream rows from a CSV (with a header line) or JSON Lines file.
+
+        Parameters:
+        - input_path (str): Path to a '.csv' or '.jsonl' file, '-' reads CSV from stdin.
+
+        Returns:
+        Iterator[dict]: One dict per row, keyed by column name.
+
+        Example:
+        for row in read_rows('ledger.csv'):
+            print(row['amount'])
+        """
+    if input_path == '-':
+        yield from csv.DictReader(sys.stdin)
+        return
+
+    with open(input_path, newline='', encoding='utf-8') as input_file:
+        if _is_jsonl(input_path):
+            for line in input_file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(input_file)
+
+
+def write_rows(output_path: str, rows: Iterable[Dict]) -> int:
+    """
+        Stream rows to a CSV or JSON Lines file as they are produced.
+
+        Parameters:
+        - output_path (str): Path to a '.csv', '.jsonl' or '.pdf' file, '-' writes CSV to stdout.
+        - rows (Iterable[dict]): Rows to write, the first row decides the CSV columns.
+
+        Returns:
+        int: The number of rows written.
+        """
+    if output_path.lower().endswith('.pdf'):
+        return _write_pdf(output_path, rows)
+
+    count = 0
+    output_file = sys.stdout if output_path == '-' else open(output_path, 'w', newline='', encoding='utf-8')
+    try:
+        if _is_jsonl(output_path):
+            for row in rows:
+                output_file.write(json.dumps(row) + '\n')
+                count += 1
+        else:
+            writer = None
+            for row in rows:
+                # Columns are only known once the first row arrives
+                if writer is None:
+                    writer = csv.DictWriter(output_file, fieldnames=list(row), extrasaction='ignore')
+                    writer.writeheader()
+                writer.writerow(row)
+                count += 1
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
+
+    return count
+
+
+def convert_many(api_key: str, rows: Iterable[Dict], source_currency: Optional[str] = None,
+                 target_currency: Optional[str] = None, chunk_size: int = CHUNK_SIZE,
+                 rates: Optional[Dict[Tuple[str, str], Optional[float]]] = None, exact: bool = False,
+                 rounding: str = DEFAULT_ROUNDING) -> Iterator[Dict]:
+    """
+        Convert a stream of rows, resolving each distinct currency pair's rate only once.
+
+        Rows are processed in chunks. Within a chunk they are grouped by currency pair and each
+        group's amounts are multiplied by the pair's rate in one vectorized pass. Rows come back
+        in their original order with a 'converted_amount' column added, which is None if the rate
+        could not be fetched or the amount is not a number. Rows with a 'date' column are converted
+        at that date's rate from the local rate history, one vectorized lookup per pair.
+
+        Parameters:
+        - api_key (str): The API key for accessing the FreeCurrencyAPI.
+        - rows (Iterable[dict]): Rows with 'amount' and optionally 'source_currency'/'target_currency' columns.
+        - source_currency (str, optional): Used for rows without a 'source_currency' column.
+        - target_currency (str, optional): Used for rows without a 'target_currency' column.
+        - chunk_size (int): Number of rows converted per vectorized pass.
+        - rates (dict, optional): Pair -> rate memo, shared across calls to avoid re-resolving pairs.
+        - exact (bool): Round each result to the target currency's minor units with scaled-integer
+          arithmetic and return it as an exact decimal string, e.g. '91.27'. Amounts finer than the
+          source currency's minor units are converted as they are, exactly like convert_exact().
+        - rounding (str): Rounding mode of the exact results, see decimal_conversion.ROUNDING_MODES.
+
+        Returns:
+        Iterator[dict]: The input rows with 'converted_amount' set.
+
+        Example:
+        rows = [{'amount': '100'}, {'amount': '250.5'}]
+        for row in convert_many('your_api_key', rows, 'USD', 'EUR'):
+            print(row['converted_amount'])
+        """
+    # Pair -> rate, each pair is resolved once per run
+    if rates is None:
+        rates = {}
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        yield from _convert_chunk(api_key, chunk, source_currency, target_currency, rates, exact, rounding)
+
+
+def convert_file(api_key: str, input_path: str, output_path: str, source_currency: Optional[str] = None,
+                 target_currency: Optional[str] = None, exact: bool = False,
+                 rounding: str = DEFAULT_ROUNDING) -> Dict[str, int]:
+    """
+        Convert every row of a CSV/JSONL file into another CSV/JSONL file without loading it into memory.
+
+        Parameters:
+        - api_key (str): The API key for accessing the FreeCurrencyAPI.
+        - input_path (str): The file to read, see read_rows().
+        - output_path (str): The file to write, see write_rows().
+        - source_currency (str, optional): Default source currency for rows without one.
+        - target_currency (str, optional): Default target currency for rows without one.
+        - exact (bool): Write exact decimal results rounded to minor units, see convert_many().
+        - rounding (str): Rounding mode of the exact results.
+
+        Returns:
+        dict: 'rows' written, distinct currency 'pairs' resolved and 'failed_pairs' without a rate.
+
+        Example:
+        summary = convert_file('your_api_key', 'ledger.csv', 'ledger_eur.jsonl', 'USD', 'EUR')
+        print(summary['rows'])
+        """
+    rates = {}
+    converted_rows = convert_many(api_key, read_rows(input_path), source_currency, target_currency, rates=rates,
+                                  exact=exact, rounding=rounding)
+    row_count = write_rows(output_path, converted_rows)
+
+    return {
+        'rows': row_count,
+        'pairs': len(rates),
+        'failed_pairs': sum(1 for rate in rates.values() if rate is None),
+    }
+
+
+def _convert_chunk(api_key: str, chunk: list, source_currency: Optional[str], target_currency: Optional[str],
+                   rates: Dict[Tuple[str, str], Optional[float]], exact: bool = False,
+                   rounding: str = DEFAULT_ROUNDING) -> list:
+    # Group row indices by currency pair, dated rows apart from those converted at the latest rate
+    groups = {}
+    dated_groups = {}
+    for index, row in enumerate(chunk):
+        pair = (row.get(SOURCE_COLUMN) or source_currency, row.get(TARGET_COLUMN) or target_currency)
+        (dated_groups if row.get(DATE_COLUMN) else groups).setdefault(pair, []).append(index)
+
+    for pair, indices in dated_groups.items():
+        if not (is_valid_currency(pair[0]) and is_valid_currency(pair[1])):
+            for index in indices:
+                chunk[index][CONVERTED_COLUMN] = None
+            continue
+
+        # Every date of this pair is looked up in one pass, only unseen dates reach the network
+        dates = np.array([_parse_date(chunk[index][DATE_COLUMN]) for index in indices], dtype='datetime64[D]')
+        amounts = [chunk[index].get(AMOUNT_COLUMN) for index in indices]
+        converted = _convert_amounts(amounts, get_historical_rates(api_key, pair[0], pair[1], dates), pair,
+                                     exact, rounding)
+
+        for index, converted_amount in zip(indices, converted):
+            chunk[index][CONVERTED_COLUMN] = converted_amount
+
+    for pair, indices in groups.items():
+        # Resolve the pair's rate once for the whole run, unknown codes never reach the network
+        if pair not in rates:
+            is_valid_pair = is_valid_currency(pair[0]) and is_valid_currency(pair[1])
+            rates[pair] = get_exchange_rate(api_key, *pair) if is_valid_pair else None
+        rate = rates[pair]
+
+        if rate is None:
+            for index in indices:
+                chunk[index][CONVERTED_COLUMN] = None
+            continue
+
+        # Multiply the whole amount column of this pair in one pass
+        amounts = [chunk[index].get(AMOUNT_COLUMN) for index in indices]
+        converted = _convert_amounts(amounts, rate, pair, exact, rounding)
+
+        for index, converted_amount in zip(indices, converted):
+            chunk[index][CONVERTED_COLUMN] = converted_amount
+
+    return chunk
+
+
+def _convert_amounts(amounts: list, rates, pair: Tuple[str, str], exact: bool, rounding: str) -> list:
+    # One rate for the whole group, or one per amount for dated rows. Invalid amounts or NaN rates give None
+    if exact:
+        return _convert_amounts_exact(amounts, rates, pair, rounding)
+
+    amounts = np.fromiter(map(_parse_amount, amounts), dtype=np.float64, count=len(amounts))
+    return [None if isnan(value) else value for value in (amounts * rates).tolist()]
+
+
+def _convert_amounts_exact(amounts: list, rates, pair: Tuple[str, str], rounding: str) -> list:
+    # Amounts are read as Decimal, a float would drop digits of long amount strings
+    amounts = [_parse_exact_amount(amount) for amount in amounts]
+    rates = np.broadcast_to(np.asarray(rates, dtype=np.float64), (len(amounts),))
+    minor, whole = decimal_to_minor_units(amounts, pair[0])
+    valid = np.array([amount is not None for amount in amounts], dtype=bool) & ~np.isnan(rates)
+    vectorized = valid & whole
+
+    results = [None] * len(amounts)
+    converted = np.zeros_like(minor)
+    # Scaled-integer conversion runs once per distinct rate, a single pass unless rows are dated
+    for rate in np.unique(rates[vectorized]).tolist():
+        selected = vectorized & (rates == rate)
+        converted[selected] = convert_minor_units(minor[selected], rate, pair[0], pair[1], rounding)
+    for index, text in zip(np.flatnonzero(vectorized).tolist(),
+                           format_minor_units(converted[vectorized], pair[1])):
+        results[index] = text
+
+    # Amounts finer than one minor unit are converted as they are, rounding them first would round twice
+    for index in np.flatnonzero(valid & ~whole).tolist():
+        results[index] = format(convert_exact(amounts[index], rates[index], pair[1], rounding), 'f')
+    return results
+
+
+def _write_pdf(output_path: str, rows: Iterable[Dict]) -> int:
+    # Imported on first use, reportlab is only needed for PDFs
+    from pdf_report import MARGIN, PAGE_WIDTH, Column, PdfReportWriter
+
+    rows = iter(rows)
+    first_row = next(rows, None)
+    keys = list(first_row) if first_row is not None else [AMOUNT_COLUMN, CONVERTED_COLUMN]
+    # Columns share the page width, numbers are right aligned
+    width = (PAGE_WIDTH - 2 * MARGIN) / len(keys)
+    columns = [Column(key, key, width, align_right=key in (AMOUNT_COLUMN, CONVERTED_COLUMN)) for key in keys]
+
+    with PdfReportWriter(output_path, 'Currency Conversion Report', columns) as report:
+        if first_row is not None:
+            report.add_row(first_row)
+        report.add_rows(rows)
+    return report.row_count
+
+
+def _parse_amount(amount) -> float:
+    # Unparseable amounts become NaN so they do not abort the vectorized pass
+    try:
+        return float(amount)
+    except (TypeError, ValueError) as e:
+        log_error(type(e).__name__, str(e))
+        return float('nan')
+
+
+def _parse_exact_amount(amount) -> Optional[Decimal]:
+    # Unparseable or infinite amounts become None so they do not abort the pass
+    try:
+        value = to_decimal(amount.strip() if isinstance(amount, str) else amount)
+    except (TypeError, ValueError, ArithmeticError):
+        value = None
+    if value is None or not value.is_finite():
+        log_error('ValueError', f'Invalid amount: {amount!r}')
+        return None
+    return value
+
+
+def _parse_date(date) -> np.datetime64:
+    # Unparseable dates become NaT, which never matches a stored rate
+    try:
+        return np.datetime64(date, 'D')
+    except (TypeError, ValueError) as e:
+        log_error(type(e).__name__, str(e))
+        return np.datetime64('NaT', 'D')
+
+
+def _is_jsonl(file_path: str) -> bool:
+    return file_path.lower().endswith(('.jsonl', '.ndjson'))
@@ -0,0 +1,172 @@
+"""
+    Reproducible benchmarks of the conversion path against a local stub rate provider.
+
+    Scenarios:
+    - cold:  empty memory cache, empty rate store and no open connection, the first conversion of a run
+    - disk:  empty memory cache answered from a fresh snapshot in the rate store, a restart
+    - miss:  table downloaded from the provider over a kept-alive connection
+    - revalidated: table revalidated with its ETag, the provider answers 304 Not Modified
+    - hit:   table already in memory
+    - batch: convert_many() over rows spread across several currency pairs, table in memory
+
+    The stub answers like FreeCurrencyAPI after --latency milliseconds, so results do not depend on
+    the network. Each scenario prints the median and 90th percentile per operation, followed by the
+    per-stage breakdown from instrumentation.metrics, and --json saves everything for comparing runs.
+
+    Usage:
+    python benchmarks/bench_conversion.py --runs 200 --latency 0 --batch_rows 100000 --json results.json
+    """
+import json
+import tempfile
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import environ, path
+import sys
+from threading import Thread
+from time import perf_counter, sleep
+
+# Point the app directory at a scratch location before the app modules are imported
+environ['HOME'] = environ['USERPROFILE'] = tempfile.mkdtemp(prefix='anwoo_bench_')
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import conversion  # noqa: E402
+from batch import convert_many  # noqa: E402
+from instrumentation import metrics  # noqa: E402
+from providers import FreeCurrencyApiProvider  # noqa: E402
+from rate_store import RateStore  # noqa: E402
+
+CURRENCIES = ('USD', 'EUR', 'GBP', 'JPY', 'CHF', 'CAD', 'AUD', 'CNY', 'SEK', 'NZD')
+# Size of a real latest-rates response, about 30 currencies
+TABLE = {**{currency: 1.0 + index / 10 for index, currency in enumerate(CURRENCIES)},
+         **{f'X{index:02d}': 1.0 + index for index in range(20)}}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Answers every request with TABLE after 'latency' seconds, keeping the connection open
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    body = json.dumps({'data': TABLE}).encode()
+    etag = '"bench"'
+
+    def do_GET(self):
+        if self.latency:
+            sleep(self.latency)
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('ETag', self.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', self.etag)
+        # Revalidate on every request instead of reusing the table for a while
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(latency: float) -> str:
+    StubHandler.latency = latency
+    # Headers and body in one write, see daemon.ConversionRequestHandler
+    StubHandler.wbufsize = -1
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_address[1]}/v1/latest'
+
+
+def measure(name: str, runs: int, setup, operation, operations_per_run: int = 1) -> dict:
+    # Time 'operation' alone, 'setup' puts the caches into the scenario's state before each run
+    metrics.reset()
+    timings = []
+    for _ in range(runs):
+        setup()
+        started = perf_counter()
+        operation()
+        timings.append((perf_counter() - started) / operations_per_run)
+    timings.sort()
+    result = {
+        'scenario': name,
+        'runs': runs,
+        'median_us': timings[len(timings) // 2] * 1e6,
+        'p90_us': timings[int(len(timings) * 0.9)] * 1e6,
+        'stages': metrics.snapshot()['stages'],
+    }
+    print(f"{name:11} median {result['median_us']:10.1f} us   p90 {result['p90_us']:10.1f} us")
+    for stage, values in result['stages'].items():
+        print(f"         {stage:14} {values['count']:8} x {values['mean_seconds'] * 1e6:10.1f} us mean")
+    return result
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark the conversion path against a local stub provider')
+    parser.add_argument('--runs', type=int, default=200, help='Measured runs per scenario')
+    parser.add_argument('--latency', type=float, default=0.0, help='Milliseconds the stub waits before answering')
+    parser.add_argument('--batch_rows', type=int, default=100000, help='Rows converted by the batch scenario')
+    parser.add_argument('--json', metavar='FILE', help='Also write the results as JSON')
+    args = parser.parse_args()
+
+    provider = FreeCurrencyApiProvider(api_key='benchmark')
+    provider.url = start_stub(args.latency / 1000)
+    conversion.configure_rate_providers([provider])
+
+    def convert() -> None:
+        conversion.convert_currency('benchmark', 'USD', 'EUR', 100.0)
+
+    def cold() -> None:
+        # New store file, empty cache and a fresh HTTP client, nothing is warm
+        conversion.rate_store = RateStore(tempfile.mktemp(suffix='.sqlite3', dir=environ['HOME']))
+        conversion.rate_cache.invalidate()
+        if provider.client is not None:
+            provider.client.close()
+            provider.client = None
+
+    def disk() -> None:
+        conversion.rate_cache.invalidate()
+
+    def miss() -> None:
+        conversion.rate_cache.invalidate()
+        # Stored snapshots count as too old, so the table comes from the provider
+        conversion.configure_rate_store(max_age=0)
+        provider.forget_responses()
+
+    def revalidated() -> None:
+        conversion.rate_cache.invalidate()
+        conversion.configure_rate_store(max_age=0)
+
+    rows = [{'source_currency': CURRENCIES[index % 3], 'target_currency': CURRENCIES[3 + index % 5],
+             'amount': index / 100} for index in range(args.batch_rows)]
+
+    def batch() -> None:
+        for _ in convert_many('benchmark', rows):
+            pass
+
+    def warm() -> None:
+        pass
+
+    print(f'stub latency {args.latency} ms, {args.runs} runs per scenario')
+    results = [measure('cold', args.runs, cold, convert)]
+    conversion.configure_rate_store(max_age=3600)
+    convert()
+    results.append(measure('disk', args.runs, disk, convert))
+    results.append(measure('miss', args.runs, miss, convert))
+    results.append(measure('revalidated', args.runs, revalidated, convert))
+    conversion.configure_rate_store(max_age=3600)
+    convert()
+    results.append(measure('hit', args.runs, warm, convert))
+    batch()
+    results.append(measure('batch', max(1, args.runs // 20), warm, batch, operations_per_run=len(rows)))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as results_file:
+            json.dump({'latency_ms': args.latency, 'results': results,
+                       'transfer': provider.stats()['transfer']}, results_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
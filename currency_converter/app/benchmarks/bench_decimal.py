@@ -0,0 +1,75 @@
+"""
+    Compare the float, scaled-integer and Decimal conversion paths on the same amounts.
+
+    Reports the time per amount of each path and how many float results, rounded to the target's
+    minor units, differ from the exact ones.
+
+    Usage:
+    python benchmarks/bench_decimal.py --count 1000000 --rate 0.9127000165 --rounding half_even
+    """
+import tempfile
+from argparse import ArgumentParser
+from decimal import Decimal
+from os import environ, path
+import sys
+from time import perf_counter
+
+# Point the app directory at a scratch location before the app modules are imported
+environ['HOME'] = environ['USERPROFILE'] = tempfile.mkdtemp(prefix='anwoo_bench_')
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from currencies import minor_units  # noqa: E402
+from decimal_conversion import (ROUNDING_MODES, convert_exact, convert_minor_units,  # noqa: E402
+                                format_minor_units, to_minor_units)
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark exact against float conversion')
+    parser.add_argument('--count', type=int, default=1000000, help='Number of amounts to convert')
+    parser.add_argument('--decimal_count', type=int, default=100000,
+                        help='Amounts converted one by one with Decimal, it is much slower')
+    parser.add_argument('--rate', type=float, default=0.9127000165, help='Exchange rate applied')
+    parser.add_argument('--source', default='USD', help='Source currency')
+    parser.add_argument('--target', default='EUR', help='Target currency')
+    parser.add_argument('--rounding', choices=sorted(ROUNDING_MODES), default='half_even')
+    args = parser.parse_args()
+
+    # Ledger-like amounts with cents, as text the way they arrive from a CSV
+    generator = np.random.default_rng(0)
+    texts = [f'{cents / 100:.2f}' for cents in generator.integers(1, 10 ** 8, args.count).tolist()]
+
+    started = perf_counter()
+    floats = np.array(texts, dtype=np.float64) * args.rate
+    float_seconds = perf_counter() - started
+
+    started = perf_counter()
+    minor = to_minor_units(np.array(texts, dtype=np.float64), args.source)
+    converted = convert_minor_units(minor, args.rate, args.source, args.target, args.rounding)
+    integer_seconds = perf_counter() - started
+
+    started = perf_counter()
+    formatted = format_minor_units(converted, args.target)
+    format_seconds = perf_counter() - started
+
+    started = perf_counter()
+    exact = [convert_exact(text, args.rate, args.target, args.rounding) for text in texts[:args.decimal_count]]
+    decimal_seconds = perf_counter() - started
+
+    # Check the scaled-integer results against Decimal, and count where rounded floats drift from them
+    mismatches = sum(Decimal(text) != value for text, value in zip(formatted, exact))
+    scale = 10 ** minor_units(args.target)
+    float_minor = np.rint(floats[:args.decimal_count] * scale).astype(np.int64)
+    drifted = int(np.count_nonzero(float_minor != converted[:args.decimal_count]))
+
+    print(f'{args.count} amounts, rate {args.rate}, {args.source} -> {args.target}, {args.rounding}')
+    print(f'float:          {float_seconds / args.count * 1e9:8.1f} ns per amount')
+    print(f'scaled integer: {integer_seconds / args.count * 1e9:8.1f} ns per amount '
+          f'(+{format_seconds / args.count * 1e9:.1f} ns to format)')
+    print(f'Decimal:        {decimal_seconds / len(exact) * 1e9:8.1f} ns per amount')
+    print(f'scaled integer vs Decimal mismatches: {mismatches} of {len(exact)}')
+    print(f'rounded float results differing from exact: {drifted} of {len(exact)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+    Measure how long the command-line path takes to import, using 'python -X importtime'.
+
+    Runs a fresh interpreter several times, reports the best total and the heaviest modules,
+    and exits with status 1 if the total exceeds --max_ms, so CI can track start-up regressions.
+    It also fails if the command-line path pulls in tkinter or reportlab.
+
+    Usage:
+    python benchmarks/bench_import_time.py --module main --runs 5 --max_ms 400
+    """
+import re
+import subprocess
+import sys
+from argparse import ArgumentParser
+from os import path
+
+# App directory, the modules import each other as top-level scripts
+APP_DIR = path.dirname(path.dirname(path.abspath(__file__)))
+# Modules the command-line path must never import
+FORBIDDEN_MODULES = ('tkinter', 'reportlab', 'gui')
+
+IMPORT_TIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure(module: str) -> dict:
+    # One fresh interpreter, returns {module: (self_us, cumulative_us)} for top-level imports and below
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               cwd=APP_DIR, capture_output=True, text=True, check=True)
+    timings = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            timings[name] = (int(self_us), int(cumulative_us), len(indent) == 1)
+    return timings
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark command-line start-up import time')
+    parser.add_argument('--module', default='main', help='Module to import')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to start, the best run counts')
+    parser.add_argument('--top', type=int, default=10, help='Heaviest modules to list')
+    parser.add_argument('--max_ms', type=float, help='Fail if the best total import time exceeds this')
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    # Total of the top-level imports, i.e. everything the interpreter had to load for the module
+    totals = [sum(cumulative for _, cumulative, top_level in run.values() if top_level) for run in runs]
+    best_run = runs[totals.index(min(totals))]
+    best_ms = min(totals) / 1000
+
+    print(f'import {args.module}: best {best_ms:.1f} ms over {args.runs} runs')
+    heaviest = sorted(best_run.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us, _) in heaviest:
+        print(f'  {self_us / 1000:8.2f} ms self {cumulative_us / 1000:8.2f} ms cumulative  {name}')
+
+    failed = False
+    forbidden = [name for name in best_run if name.split('.')[0] in FORBIDDEN_MODULES]
+    if forbidden:
+        print(f'FAIL: command-line path imports {", ".join(sorted(set(forbidden)))}')
+        failed = True
+    if args.max_ms is not None and best_ms > args.max_ms:
+        print(f'FAIL: {best_ms:.1f} ms exceeds the {args.max_ms:.1f} ms budget')
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+    Measure the per-conversion cost of logs.log_conversion() on the caller's thread.
+
+    The log is written to a throwaway home directory, so running this never touches ~/.anwoo.
+
+    Usage:
+    python benchmarks/bench_logging.py --count 100000 --pause 5 --policy block
+    """
+import tempfile
+from argparse import ArgumentParser
+from os import environ, path
+import sys
+from time import perf_counter, sleep
+
+# Point the app directory at a scratch location before logs is imported
+environ['HOME'] = environ['USERPROFILE'] = tempfile.mkdtemp(prefix='anwoo_bench_')
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import logs  # noqa: E402
+
+# Conversions logged back to back before each --pause
+BURST = 100
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark conversion logging overhead')
+    parser.add_argument('--count', type=int, default=100000, help='Number of conversions to log')
+    parser.add_argument('--pause', type=float, default=0.0,
+                        help='Milliseconds of idle time after every burst of 100 conversions')
+    parser.add_argument('--policy', choices=['drop', 'block'], help='Queue policy when the writer falls behind')
+    args = parser.parse_args()
+
+    if hasattr(logs, 'configure_logging'):
+        logs.configure_logging()
+    if args.policy is not None and hasattr(logs, 'queue_handler'):
+        logs.queue_handler.policy = args.policy
+
+    # Time only what the converting thread pays for. With --pause, conversions arrive in bursts
+    # separated by idle time, as they do when every conversion also waits on a rate lookup
+    caller_seconds = 0.0
+    started = perf_counter()
+    for burst_start in range(0, args.count, BURST):
+        burst_started = perf_counter()
+        for index in range(burst_start, min(burst_start + BURST, args.count)):
+            logs.log_conversion('USD', 'EUR', index, index * 0.91)
+        caller_seconds += perf_counter() - burst_started
+        if args.pause:
+            sleep(args.pause / 1000)
+
+    # Then wait for anything still queued to reach the disk
+    if hasattr(logs, 'flush_logs'):
+        logs.flush_logs()
+    total_seconds = perf_counter() - started
+
+    print(f'{args.count} conversions logged')
+    print(f'caller overhead: {caller_seconds / args.count * 1e6:.2f} us per conversion')
+    print(f'wall clock:      {total_seconds / args.count * 1e6:.2f} us per conversion')
+    if hasattr(logs, 'logging_stats'):
+        print(f"dropped:         {logs.logging_stats()['dropped']}")
+
+
+if __name__ == '__main__':
+    main()
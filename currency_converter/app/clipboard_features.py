@@ -1,9 +1,43 @@
+import re
 import tkinter as tk
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from batch import AMOUNT_COLUMN, CONVERTED_COLUMN, SOURCE_COLUMN, TARGET_COLUMN, convert_many
+
+# Cells of a pasted row are split on tabs, semicolons and runs of spaces
+CELL_SEPARATOR = re.compile(r'[\t;]+| {2,}')
+# A currency code inside a cell, e.g. 'usd' in '100 usd' or 'EUR' in 'EUR12.50'
+CURRENCY_CODE = re.compile(r'(?<![A-Za-z])[A-Za-z]{3}(?![A-Za-z])')
+# What is left of an amount once decorations and separators are removed
+PLAIN_AMOUNT = re.compile(r'[-+]?(\d+\.?\d*|\.\d+)')
+# Currency symbols and grouping characters spreadsheets add around amounts
+AMOUNT_DECORATIONS = re.compile(r"[$€£¥₹\s'_\u00a0\u202f]")
+
+
+class BulkPasteResult(NamedTuple):
+    # Converted amounts as one clipboard column, plus what went into it
+    text: str
+    amounts: int
+    converted: int
+    pairs: int
 
 
 class ClipboardFeatures:
-    def __init__(self, entry: tk.Entry, window: tk.Tk) -> None:
+    """
+        Cut, copy and paste for an Entry, and optionally converting a whole pasted column at once.
+
+        Parameters:
+        - entry (tkinter.Entry): The entry the context menu belongs to.
+        - window (tkinter.Tk): The application window.
+        - bulk_paste (Callable[[str], None], optional): Called with the clipboard text by 'Paste and Convert'
+          (also Ctrl+Shift+V), the menu item is only shown when given.
+
+        Example:
+        ClipboardFeatures(amount_entry, root, bulk_paste=lambda text: worker.submit(convert_clipboard_text, ...))
+        """
+
+    def __init__(self, entry: tk.Entry, window: tk.Tk, bulk_paste: Optional[Callable[[str], None]] = None) -> None:
         self.window = window
+        self.bulk_paste = bulk_paste
 
         # Create entry widget
         self.entry = tk.Entry(window)
@@ -14,6 +48,9 @@ class ClipboardFeatures:
         self.context_menu.add_command(label="Cut", command=self.cut_text)
         self.context_menu.add_command(label="Copy", command=self.copy_text)
         self.context_menu.add_command(label="Paste", command=self.paste_text)
+        if bulk_paste is not None:
+            self.context_menu.add_command(label="Paste and Convert", command=self.paste_and_convert)
+            entry.bind('<Control-V>', lambda event: self.paste_and_convert())
 
         # Globally bind 'undo-hotkey' (Ctrl-Z)
         entry.bind('<Control-z>', self.undo_text)
@@ -36,6 +73,14 @@ class ClipboardFeatures:
     def paste_text(self) -> None:
         self.entry.insert(tk.INSERT, self.entry.clipboard_get())
 
+    def paste_and_convert(self) -> None:
+        # Reading the clipboard must happen on the main loop, parsing and converting are left to bulk_paste
+        try:
+            text = self.entry.clipboard_get()
+        except tk.TclError:
+            return
+        self.bulk_paste(text)
+
     def undo_text(self, event) -> None:
         self.context_menu.post(event.x_root, event.y_root)
 
@@ -45,3 +90,101 @@ class ClipboardFeatures:
     def on_click(self, entry, event) -> None:
         self.entry.focus_set()
         self.entry.select_range(0, tk.END)
+
+
+def parse_clipboard_amounts(text: str, source_currency: Optional[str] = None,
+                            target_currency: Optional[str] = None) -> Iterator[Dict[str, Optional[str]]]:
+    """
+        Read the amounts of a pasted spreadsheet column or row, with optional currency codes.
+
+        Every line is a row. A row holds one or more amounts and up to two currency codes, the first
+        code being the source currency and the second the target currency of every amount in the row;
+        missing codes fall back to the given defaults. A line without an amount, such as a header or a
+        blank line, yields one row whose amount is None, so the results line up with the pasted cells.
+
+        Parameters:
+        - text (str): The clipboard payload, lines separated by any newline, cells by tabs or semicolons.
+        - source_currency (str, optional): Source currency of rows that do not name one.
+        - target_currency (str, optional): Target currency of rows that do not name one.
+
+        Returns:
+        Iterator[dict]: One row per amount, ready for batch.convert_many().
+
+        Example:
+        list(parse_clipboard_amounts('100\n2,500.50 GBP\t\n', 'USD', 'EUR'))
+        [{'amount': '100', 'source_currency': 'USD', 'target_currency': 'EUR'},
+         {'amount': '2500.50', 'source_currency': 'GBP', 'target_currency': 'EUR'}]
+        """
+    lines = text.splitlines()
+    # Spreadsheets end a copied column with a newline, which is not an extra row
+    while lines and not lines[-1].strip():
+        lines.pop()
+
+    for line in lines:
+        amounts: List[str] = []
+        codes: List[str] = []
+        for cell in CELL_SEPARATOR.split(line.strip()):
+            codes.extend(code.upper() for code in CURRENCY_CODE.findall(cell))
+            amount = _normalize_amount(CURRENCY_CODE.sub('', cell))
+            if amount is not None:
+                amounts.append(amount)
+
+        source = codes[0] if codes else source_currency
+        target = codes[1] if len(codes) > 1 else target_currency
+        for amount in amounts or [None]:
+            yield {AMOUNT_COLUMN: amount, SOURCE_COLUMN: source, TARGET_COLUMN: target}
+
+
+def convert_clipboard_text(api_key: str, text: str, source_currency: Optional[str] = None,
+                           target_currency: Optional[str] = None, exact: bool = True) -> BulkPasteResult:
+    """
+        Convert every amount of a pasted payload in one batch and return the results as a column.
+
+        The rows go through batch.convert_many(), so each distinct currency pair costs one rate lookup
+        and its amounts are converted in one vectorized pass; tens of thousands of lines take well under
+        a second once the rates are known. Blocking, run it on the GUI worker.
+
+        Parameters:
+        - api_key (str): The API key for accessing the FreeCurrencyAPI.
+        - text (str): The clipboard payload, see parse_clipboard_amounts().
+        - source_currency (str, optional): Source currency of rows that do not name one.
+        - target_currency (str, optional): Target currency of rows that do not name one.
+        - exact (bool): Round each result to the target currency's minor units, as spreadsheets expect.
+
+        Returns:
+        BulkPasteResult: 'text' has one line per amount, empty where nothing could be converted.
+
+        Example:
+        result = convert_clipboard_text('your_api_key', '100\n250.5\n', 'USD', 'EUR')
+        root.clipboard_append(result.text)
+        """
+    rows = list(parse_clipboard_amounts(text, source_currency, target_currency))
+    # Lines without an amount stay empty instead of being logged as bad amounts
+    amount_rows = [row for row in rows if row[AMOUNT_COLUMN] is not None]
+    rates: Dict[Tuple[str, str], Optional[float]] = {}
+    # convert_many() fills in the same row dicts, chunk by chunk
+    for _ in convert_many(api_key, amount_rows, rates=rates, exact=exact):
+        pass
+
+    values = [row.get(CONVERTED_COLUMN) for row in rows]
+    lines = ['' if value is None else value if exact else repr(value) for value in values]
+    converted = sum(1 for value in values if value is not None)
+    return BulkPasteResult('\n'.join(lines) + '\n' if lines else '', len(amount_rows), converted, len(rates))
+
+
+def _normalize_amount(cell: str) -> Optional[str]:
+    # '1,234.50', '$ 1 234,50', '(12.00)' -> plain decimal text, None if the cell is not an amount
+    amount = AMOUNT_DECORATIONS.sub('', cell)
+    if amount.startswith('(') and amount.endswith(')'):
+        # Accounting notation for negative amounts
+        amount = '-' + amount[1:-1]
+
+    if ',' in amount:
+        if amount.rfind('.') > amount.rfind(',') or re.fullmatch(r'[-+]?\d{1,3}(,\d{3})+', amount):
+            # Thousands separators, '1,234.50'
+            amount = amount.replace(',', '')
+        else:
+            # A decimal comma as European spreadsheets paste it, '1.234,50'
+            amount = amount.replace('.', '').replace(',', '.')
+
+    return amount if PLAIN_AMOUNT.fullmatch(amount) else None
@@ -1,7 +1,39 @@
 from json import dump, load, JSONDecodeError
 from os import getenv, makedirs
-from os.path import join, exists
-from logs import log_error
+from os.path import join
+from typing import List
+from logs import app_dir, log_error
+
+
+def config_folder() -> str:
+    """
+        Return the folder holding config.json: under APPDATA on Windows, the ~/.anwoo directory elsewhere.
+        """
+    appdata = getenv('APPDATA')
+    return join(appdata, "Anwoo's Currency Converter Tool") if appdata else app_dir
+
+
+def config_file_path() -> str:
+    return join(config_folder(), 'config.json')
+
+
+def _read_config() -> dict:
+    # Whole configuration, empty if there is none yet
+    try:
+        with open(config_file_path()) as config_file:
+            config = load(config_file)
+    except FileNotFoundError:
+        return {}
+    except JSONDecodeError as e:
+        log_error(type(e).__name__, str(e))
+        return {}
+    return config if isinstance(config, dict) else {}
+
+
+def _write_config(config: dict) -> None:
+    makedirs(config_folder(), exist_ok=True)
+    with open(config_file_path(), 'w') as config_file:
+        dump(config, config_file)
 
 
 def save_api_key(api_key_var, remember_var):
@@ -23,23 +55,12 @@ def save_api_key(api_key_var, remember_var):
     # Check for remember_var
     if remember_var.get():
 
-        # Determine the path to the configuration file in the AppData folder
-        appdata_folder = join(getenv('APPDATA'), "Anwoo's Currency Converter Tool")
-
-        # Ensure the folder exists or create it
-        if not exists(appdata_folder):
-            makedirs(appdata_folder)
-
-        config_file_path = join(appdata_folder, 'config.json')
-        # Open JSON file as config_file
-        print(config_file_path)
-        with open(config_file_path, 'w') as config_file:
-            # Retrieve the API-Key from Tkinter variable
-            api_key = api_key_var.get()
-            # Create a dict with api_key as value
-            config = {'API-KEY': api_key}
-            # Write the dict to file in JSON format
-            dump(config, config_file)
+        # Keep the rest of the configuration, such as the key pool
+        config = _read_config()
+        # Retrieve the API-Key from Tkinter variable
+        config['API-KEY'] = api_key_var.get()
+        # Write the dict to file in JSON format
+        _write_config(config)
 
 
 def load_api_key():
@@ -58,12 +79,8 @@ def load_api_key():
 
        """
     try:
-        # Determine the path to the configuration file in the AppData folder
-        appdata_folder = join(getenv('APPDATA'), "Anwoo's Currency Converter Tool")
-        config_file_path = join(appdata_folder, 'config.json')
-
         # Attempt to open the 'config.json' file
-        with open(config_file_path) as config_file:
+        with open(config_file_path()) as config_file:
             # Load contents of the file as a JSON object
             config = load(config_file)
             # Retrieve API key
@@ -76,3 +93,34 @@ def load_api_key():
         log_error(type(e).__name__, str(e))
 
         return None
+
+
+def load_api_keys() -> List[str]:
+    """
+        Load the API key pool, with the remembered API key first.
+
+        Returns:
+        list: Every stored key, without duplicates, empty if none is stored.
+
+        Example:
+        keys = load_api_keys()
+        print(f'{len(keys)} keys in the pool')
+        """
+    config = _read_config()
+    keys = [config.get('API-KEY')] + list(config.get('API-KEYS', []))
+    return [key for key in dict.fromkeys(keys) if key]
+
+
+def save_api_keys(api_keys: List[str]) -> None:
+    """
+        Store the API key pool in 'config.json', next to the remembered API key.
+
+        Parameters:
+        - api_keys (list): The keys, in order of preference.
+
+        Example:
+        save_api_keys(load_api_keys() + ['another_api_key'])
+        """
+    config = _read_config()
+    config['API-KEYS'] = [key for key in dict.fromkeys(api_keys) if key]
+    _write_config(config)
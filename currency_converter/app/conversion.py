@@ -1,10 +1,272 @@
-import requests
-from typing import Optional
+import sqlite3
+from typing import Dict, Iterable, Optional, Sequence
+from instrumentation import metrics
+from logs import log_error
+from providers import FreeCurrencyApiProvider, ProviderPool, RateProvider
+from quota import ApiKeyPool
+from rate_cache import RateCache
+from rate_store import RateStore
+from rate_table import RateTable, STRATEGY_DIRECT
 
+# Seconds a fetched rate table is served without asking the API again
+RATE_CACHE_TTL = 300.0
+# Maximum number of base currency tables kept in memory
+RATE_CACHE_SIZE = 256
+# Extra seconds an expired rate may be served while it is refreshed in the background
+RATE_CACHE_STALE_TTL = 3600.0
 
-def get_exchange_rate(api_key: str, source_currency: str, target_currency: str) -> Optional[float]:
+# Currency every cross rate is derived from when its table is already in memory
+PIVOT_CURRENCY = 'USD'
+
+# Shared rate table cache keyed by base currency, each entry holds every rate for that base
+rate_cache = RateCache(ttl=RATE_CACHE_TTL, max_size=RATE_CACHE_SIZE, stale_ttl=RATE_CACHE_STALE_TTL)
+
+# Shared on-disk snapshots answering cold starts and offline conversions
+rate_store = RateStore()
+
+# Providers every rate table is fetched from, the fastest healthy one answers
+rate_provider = ProviderPool([FreeCurrencyApiProvider()])
+
+# Keys shared by providers without a key of their own, None sends the caller's key
+api_key_pool: Optional[ApiKeyPool] = None
+
+
+def configure_rate_cache(ttl: Optional[float] = None, max_size: Optional[int] = None,
+                         stale_ttl: Optional[float] = None) -> None:
+    """
+        Adjust the shared exchange rate cache.
+
+        Parameters:
+        - ttl (float, optional): Seconds a rate is considered fresh.
+        - max_size (int, optional): Maximum number of base currency tables kept.
+        - stale_ttl (float, optional): Seconds an expired rate may still be served while it is refreshed.
+
+        Example:
+        configure_rate_cache(ttl=60, max_size=64)
+        """
+    if ttl is not None:
+        rate_cache.ttl = ttl
+    if max_size is not None:
+        rate_cache.max_size = max_size
+    if stale_ttl is not None:
+        rate_cache.stale_ttl = stale_ttl
+
+
+def configure_rate_store(max_age: Optional[float] = None, offline: Optional[bool] = None) -> None:
+    """
+        Adjust how the on-disk rate snapshots are used.
+
+        Parameters:
+        - max_age (float, optional): Seconds a stored snapshot may answer a cold start without the network.
+        - offline (bool, optional): Answer only from stored snapshots, whatever their age.
+
+        Example:
+        configure_rate_store(max_age=3600, offline=True)
+        """
+    if max_age is not None:
+        rate_store.max_age = max_age
+    if offline is not None:
+        rate_store.offline = offline
+
+
+def get_rate_staleness(base_currency: Optional[str] = None) -> Optional[float]:
+    """
+        Report how old the rates in use are.
+
+        Parameters:
+        - base_currency (str, optional): The table to report on, the oldest table in use by default.
+
+        Returns:
+        float or None: Age in seconds of the rates, None if no table has been loaded yet.
+        """
+    if base_currency is None:
+        return rate_store.max_staleness()
+    return rate_store.staleness(base_currency)
+
+
+def configure_rate_table(strategy: Optional[str] = None, pivot_currency: Optional[str] = None) -> None:
+    """
+        Choose how the shared rate table derives currency pairs.
+
+        Parameters:
+        - strategy (str, optional): 'direct' fetches one table per source currency, 'pivot' fetches only
+          the pivot currency's table and computes every pair as a cross rate.
+        - pivot_currency (str, optional): The currency cross rates are derived from.
+
+        Raises:
+        ValueError: If 'strategy' is neither 'direct' nor 'pivot'.
+
+        Example:
+        configure_rate_table(strategy='pivot', pivot_currency='USD')
+        """
+    if strategy is not None:
+        rate_table.strategy = strategy
+    if pivot_currency is not None:
+        rate_table.pivot_currency = pivot_currency
+
+
+def configure_rate_providers(providers: Optional[Sequence[RateProvider]] = None,
+                             hedge_delay: Optional[float] = None) -> None:
+    """
+        Choose the providers rate tables are fetched from.
+
+        Parameters:
+        - providers (Sequence[RateProvider], optional): The providers, in order of preference until their
+          latency has been measured.
+        - hedge_delay (float, optional): Seconds before the next provider is asked as well.
+
+        Example:
+        configure_rate_providers([FreeCurrencyApiProvider(), OpenExchangeRatesProvider(api_key='app_id')],
+                                 hedge_delay=0.3)
+        """
+    global rate_provider
+    if providers is not None:
+        rate_provider.close()
+        rate_provider = ProviderPool(providers, hedge_delay=rate_provider.hedge_delay)
+        _share_key_pool()
+    if hedge_delay is not None:
+        rate_provider.hedge_delay = hedge_delay
+
+
+def configure_api_keys(api_keys: Sequence[str], rate: Optional[float] = None,
+                       burst: Optional[float] = None) -> Optional[ApiKeyPool]:
+    """
+        Rotate requests over several API keys, each paced by its own token bucket.
+
+        Providers configured without a key of their own take the key with the most remaining quota
+        for every request, instead of the key the caller passes. Rate limits reported in response
+        headers replace 'rate' as soon as a provider sends them.
+
+        Parameters:
+        - api_keys (Sequence[str]): The keys, an empty sequence goes back to the caller's key.
+        - rate (float, optional): Requests per second per key until the provider reports its limit,
+          unlimited by default.
+        - burst (float, optional): Requests a key may send at once.
+
+        Returns:
+        ApiKeyPool or None: The pool now in use.
+
+        Example:
+        configure_api_keys(load_api_keys(), rate=10 / 60)
+        print(rate_provider.stats())
+        """
+    global api_key_pool
+    if not api_keys:
+        api_key_pool = None
+    elif burst is not None:
+        api_key_pool = ApiKeyPool(api_keys, rate=rate, burst=burst)
+    else:
+        api_key_pool = ApiKeyPool(api_keys, rate=rate)
+    _share_key_pool()
+    return api_key_pool
+
+
+def _share_key_pool() -> None:
+    # Providers with their own key keep it, the others draw from the pool
+    for provider in rate_provider.providers:
+        if provider.api_key is None:
+            provider.key_pool = api_key_pool
+
+
+def fetch_rate_table(api_key: str, base_currency: str) -> Optional[Dict[str, float]]:
+    """
+        Fetch every exchange rate for a base currency in a single request to the best rate provider.
+
+        Parameters:
+        - api_key (str): The API key for providers configured without a key of their own.
+        - base_currency (str): The currency all returned rates are quoted against.
+
+        Returns:
+        dict or None: {currency: rate} for every currency the API knows, None if the request failed.
+
+        Example:
+        table = fetch_rate_table('your_api_key', 'USD')
+        print(table['EUR'])
+        0.85
+        """
+    # Ask the configured providers, hedging and failing over between them
+    table = rate_provider.fetch_table(api_key, base_currency)
+    if table is None:
+        # Every provider failed, each failure is already logged
+        print(f'Error: no rate provider answered for {base_currency}')
+    return table
+
+
+def load_rate_table(api_key: str, base_currency: str) -> Optional[Dict[str, float]]:
+    """
+        Load a base currency's rate table for the in-memory cache.
+
+        A cold start is answered from a stored snapshot younger than the store's max_age. Otherwise
+        the table is fetched from the API and saved, and if the API cannot be reached the newest
+        snapshot of any age is used. In offline mode only stored snapshots are used.
+
+        Parameters:
+        - api_key (str): The API key for accessing the FreeCurrencyAPI.
+        - base_currency (str): The currency all returned rates are quoted against.
+
+        Returns:
+        dict or None: {currency: rate}, None if neither the API nor the store has the table.
+        """
+    # Offline mode never touches the network
+    if rate_store.offline:
+        return _load_snapshot(base_currency)
+
+    # Only a cold start may skip the network, a background refresh must reach the provider
+    if rate_cache.peek(base_currency) is None:
+        rates = _load_snapshot(base_currency, rate_store.max_age)
+        if rates is not None:
+            return rates
+
+    with metrics.stage('fetch_table'):
+        rates = fetch_rate_table(api_key, base_currency)
+    if rates is not None:
+        try:
+            with metrics.stage('snapshot_save'):
+                rate_store.save(base_currency, rates)
+        except sqlite3.Error as e:
+            log_error(type(e).__name__, str(e))
+        return rates
+
+    # Provider unreachable, fall back to the newest snapshot whatever its age
+    return _load_snapshot(base_currency)
+
+
+def _load_snapshot(base_currency: str, max_age: Optional[float] = None) -> Optional[Dict[str, float]]:
+    # A broken store must never break conversions, it only costs the network round trip
+    try:
+        with metrics.stage('snapshot_load'):
+            snapshot = rate_store.load(base_currency, max_age)
+    except sqlite3.Error as e:
+        log_error(type(e).__name__, str(e))
+        return None
+    return snapshot[0] if snapshot is not None else None
+
+
+# Shared engine answering every pair from the cached tables
+rate_table = RateTable(load_rate_table, rate_cache, pivot_currency=PIVOT_CURRENCY, strategy=STRATEGY_DIRECT)
+
+# Cache hits and misses are exported from the counters the cache and table already keep
+metrics.add_collector('rate_cache', lambda: rate_cache.stats())
+metrics.add_collector('rate_table', lambda: rate_table.stats())
+
+
+def get_rate_table(api_key: str, base_currency: str) -> Optional[Dict[str, float]]:
+    """
+        Return the full rate table for a base currency, served from the shared cache when possible.
+
+        Parameters:
+        - api_key (str): The API key for accessing the FreeCurrencyAPI.
+        - base_currency (str): The currency all returned rates are quoted against.
+
+        Returns:
+        dict or None: {currency: rate}, None if the table could not be fetched.
+        """
+    return rate_table.get_table(api_key, base_currency)
+
+
+def fetch_exchange_rate(api_key: str, source_currency: str, target_currency: str) -> Optional[float]:
     """""
-        Retrieve the exchange rate between two currencies using the FreeCurrencyAPI.
+        Fetch the exchange rate between two currencies directly from the rate providers, bypassing the cache.
 
         Parameters:
         - api_key (str): The API key for accessing the FreeCurrencyAPI.
@@ -22,27 +284,80 @@ def get_exchange_rate(api_key: str, source_currency: str, target_currency: str)
         api_key = 'your_api_key'
         source_currency = 'USD'
         target_currency = 'EUR'
-        rate = get_exchange_rate(api_key, source_currency, target_currency)
+        rate = fetch_exchange_rate(api_key, source_currency, target_currency)
         print(rate)
         0.85
         """""
-    # Create URL variable
-    url = 'https://api.freecurrencyapi.com/v1/latest'
-    # Create headers for API request
-    headers = {'apikey': api_key}
-    # Create params dict for API request
-    params = {'base_currency': source_currency, 'symbols': target_currency}
-    # Make request and get response
-    response = requests.get(url, headers=headers, params=params)
-    # Check if response is successful (status code 200)
-    if response.status_code == 200:
-        # Parse response as a json object
-        data = response.json()
-        # Return exchange rate for the target currency
-        return data['data'][target_currency]
-    else:
-        # If response is not 200, print error message
-        print(f'Error: {response.status_code}, {response.text}')
+    # Fetch the source currency's whole table from the best provider, bypassing the cache
+    table = rate_provider.fetch_table(api_key, source_currency)
+    if table is None:
+        print(f'Error: no rate provider answered for {source_currency}')
+        return None
+    # Return exchange rate for the target currency
+    return table.get(target_currency)
+
+
+def get_exchange_rate(api_key: str, source_currency: str, target_currency: str) -> Optional[float]:
+    """
+        Retrieve the exchange rate between two currencies, served from the shared rate tables when possible.
+
+        The whole table for the source currency is fetched once and every later pair with that source,
+        or any pair that can be derived from the pivot currency's table, is answered from memory.
+        Expired tables are served while a background refresh runs, and only a miss waits on the API.
+
+        Parameters:
+        - api_key (str): The API key for accessing the FreeCurrencyAPI.
+        - source_currency (str): The currency code of the source currency.
+        - target_currency (str): The currency code of the target currency.
+
+        Returns:
+        float or None: The exchange rate from source_currency to target_currency, None if it could not be fetched.
+
+        Example:
+        rate = get_exchange_rate('your_api_key', 'USD', 'EUR')
+        print(rate_table.stats()['requests_avoided'])
+        """
+    with metrics.stage('rate_lookup'):
+        return rate_table.get_rate(api_key, source_currency, target_currency)
+
+
+def get_exchange_rates(api_key: str, source_currency: str,
+                       target_currencies: Iterable[str]) -> Dict[str, Optional[float]]:
+    """
+        Retrieve the exchange rates from one source currency into many target currencies.
+
+        Every target is answered from the same rate table, so the whole call costs at most one request.
+
+        Parameters:
+        - api_key (str): The API key for accessing the FreeCurrencyAPI.
+        - source_currency (str): The currency code of the source currency.
+        - target_currencies (Iterable[str]): The currency codes to convert into.
+
+        Returns:
+        dict: {target_currency: rate or None}.
+
+        Example:
+        rates = get_exchange_rates('your_api_key', 'USD', ['EUR', 'GBP', 'JPY'])
+        print(rates['JPY'])
+        """
+    return {target_currency: rate_table.get_rate(api_key, source_currency, target_currency)
+            for target_currency in target_currencies}
+
+
+def get_cached_exchange_rate(source_currency: str, target_currency: str) -> Optional[float]:
+    """
+        Return the exchange rate between two currencies only if it can be answered from memory.
+
+        Never contacts the API, so it is safe to call on the GUI thread.
+
+        Parameters:
+        - source_currency (str): The currency code of the source currency.
+        - target_currency (str): The currency code of the target currency.
+
+        Returns:
+        float or None: The cached exchange rate, None if no cached table covers the pair.
+        """
+    return rate_table.peek_rate(source_currency, target_currency)
 
 
 def convert_currency(api_key: str, source_currency: str, target_currency: str, amount: float) -> Optional[float]:
@@ -72,7 +387,8 @@ def convert_currency(api_key: str, source_currency: str, target_currency: str, a
        85.0
        """
     # Get the exchange rate
-    exchange_rate = get_exchange_rate(api_key, source_currency, target_currency)
+    with metrics.stage('convert'):
+        exchange_rate = get_exchange_rate(api_key, source_currency, target_currency)
     # Check if there is an exchange rate to perform calculations on
     if exchange_rate is not None:
         # Convert the amount
@@ -0,0 +1,363 @@
+import logging
+import sqlite3
+from datetime import datetime
+from os import makedirs, path
+from threading import Lock
+from time import localtime, strftime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from logs import FLUSH_RECORDS, app_dir, log_file_path
+
+# SQLite file next to the log in the ~/.anwoo directory
+HISTORY_PATH = path.join(app_dir, 'conversions.sqlite3')
+# Rows returned by a search unless asked otherwise
+SEARCH_LIMIT = 100
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS conversions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    source_currency TEXT NOT NULL,
+    target_currency TEXT NOT NULL,
+    amount REAL,
+    converted_amount REAL
+);
+CREATE INDEX IF NOT EXISTS conversions_pair_ts ON conversions (source_currency, target_currency, ts);
+CREATE INDEX IF NOT EXISTS conversions_target_ts ON conversions (target_currency, ts);
+CREATE INDEX IF NOT EXISTS conversions_ts ON conversions (ts);
+CREATE TABLE IF NOT EXISTS daily_totals (
+    day TEXT NOT NULL,
+    source_currency TEXT NOT NULL,
+    target_currency TEXT NOT NULL,
+    conversions INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    converted_amount REAL NOT NULL,
+    PRIMARY KEY (day, source_currency, target_currency)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS markers (
+    name TEXT PRIMARY KEY
+) WITHOUT ROWID;
+'''
+# Marker set once the log files were imported, later conversions reach the index through the handler
+LOGS_IMPORTED = 'logs_imported'
+
+# Keeps daily_totals in step with every insert, in the same transaction
+_ADD_TO_TOTALS = '''
+INSERT INTO daily_totals (day, source_currency, target_currency, conversions, amount, converted_amount)
+VALUES (?, ?, ?, 1, ?, ?)
+ON CONFLICT (day, source_currency, target_currency) DO UPDATE SET
+    conversions = conversions + 1,
+    amount = amount + excluded.amount,
+    converted_amount = converted_amount + excluded.converted_amount
+'''
+
+
+class ConversionHistory:
+    """
+        Append-only index of every conversion, searchable by pair and time.
+
+        Conversions are stored in SQLite with indexes on (pair, time), (target, time) and time, so a
+        search reads only the matching rows. Per pair and day totals are kept up to date in their own
+        table as conversions are added, so aggregate queries cost the same whether the history holds
+        a thousand entries or millions.
+
+        Parameters:
+        - db_path (str): Location of the SQLite file, created on first use.
+
+        Example:
+        history = ConversionHistory()
+        history.add_many([(time(), 'USD', 'JPY', 100.0, 14980.5)])
+        print(history.search(target_currency='JPY', since=time() - 7 * 86400))
+        print(history.totals(source_currency='USD'))
+        """
+
+    def __init__(self, db_path: str = HISTORY_PATH) -> None:
+        self.db_path = db_path
+        self._connection = None
+        self._lock = Lock()
+
+    def add_many(self, conversions: Iterable[Tuple[float, str, str, Optional[float], Optional[float]]]) -> int:
+        """
+            Append conversions in one transaction.
+
+            Parameters:
+            - conversions (Iterable[tuple]): (timestamp, source_currency, target_currency, amount, converted_amount).
+
+            Returns:
+            int: The number of conversions added.
+            """
+        rows = [(timestamp, _day(timestamp), source_currency, target_currency, amount, converted_amount)
+                for timestamp, source_currency, target_currency, amount, converted_amount in conversions]
+        if not rows:
+            return 0
+
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany('INSERT INTO conversions (ts, day, source_currency, target_currency, amount, '
+                                       'converted_amount) VALUES (?, ?, ?, ?, ?, ?)', rows)
+                connection.executemany(_ADD_TO_TOTALS, [(day, source_currency, target_currency, amount or 0.0,
+                                                         converted_amount or 0.0)
+                                                        for _, day, source_currency, target_currency, amount,
+                                                        converted_amount in rows])
+        return len(rows)
+
+    def search(self, source_currency: Optional[str] = None, target_currency: Optional[str] = None,
+               since: Optional[float] = None, until: Optional[float] = None,
+               limit: int = SEARCH_LIMIT) -> List[Dict[str, Any]]:
+        """
+            Return matching conversions, newest first.
+
+            Parameters:
+            - source_currency (str, optional): Only conversions from this currency.
+            - target_currency (str, optional): Only conversions into this currency.
+            - since (float, optional): Only conversions at or after this Unix time.
+            - until (float, optional): Only conversions before this Unix time.
+            - limit (int): Maximum number of conversions returned.
+
+            Returns:
+            list: Dicts with 'time', 'source_currency', 'target_currency', 'amount' and 'converted_amount'.
+
+            Example:
+            # What did we convert to JPY last week?
+            history.search(target_currency='JPY', since=time() - 7 * 86400)
+            """
+        where, parameters = _filters(source_currency, target_currency)
+        if since is not None:
+            where.append('ts >= ?')
+            parameters.append(since)
+        if until is not None:
+            where.append('ts < ?')
+            parameters.append(until)
+
+        query = ('SELECT ts, source_currency, target_currency, amount, converted_amount FROM conversions'
+                 + (' WHERE ' + ' AND '.join(where) if where else '') + ' ORDER BY ts DESC LIMIT ?')
+        with self._lock:
+            rows = self._connect().execute(query, parameters + [limit]).fetchall()
+        return [{'time': _format_time(ts), 'source_currency': source_currency, 'target_currency': target_currency,
+                 'amount': amount, 'converted_amount': converted_amount}
+                for ts, source_currency, target_currency, amount, converted_amount in rows]
+
+    def totals(self, source_currency: Optional[str] = None, target_currency: Optional[str] = None,
+               since_day: Optional[str] = None, until_day: Optional[str] = None,
+               by_day: bool = True) -> List[Dict[str, Any]]:
+        """
+            Return the number of conversions and summed amounts per pair, and per day unless by_day is False.
+
+            Parameters:
+            - source_currency (str, optional): Only pairs from this currency.
+            - target_currency (str, optional): Only pairs into this currency.
+            - since_day (str, optional): First day included, as YYYY-MM-DD.
+            - until_day (str, optional): Last day included, as YYYY-MM-DD.
+            - by_day (bool): One row per pair and day, or one row per pair over the whole range.
+
+            Returns:
+            list: Dicts with 'day' (when by_day), 'source_currency', 'target_currency', 'conversions',
+            'amount' and 'converted_amount', newest day first.
+
+            Example:
+            for row in history.totals(target_currency='EUR', since_day='2024-01-01', by_day=False):
+                print(row['source_currency'], row['converted_amount'])
+            """
+        where, parameters = _filters(source_currency, target_currency)
+        if since_day is not None:
+            where.append('day >= ?')
+            parameters.append(since_day)
+        if until_day is not None:
+            where.append('day <= ?')
+            parameters.append(until_day)
+
+        day_column = 'day, ' if by_day else ''
+        query = (f'SELECT {day_column}source_currency, target_currency, SUM(conversions), SUM(amount), '
+                 f'SUM(converted_amount) FROM daily_totals'
+                 + (' WHERE ' + ' AND '.join(where) if where else '')
+                 + f' GROUP BY {day_column}source_currency, target_currency'
+                 + (' ORDER BY day DESC, source_currency, target_currency' if by_day
+                    else ' ORDER BY source_currency, target_currency'))
+        keys = (['day'] if by_day else []) + ['source_currency', 'target_currency', 'conversions', 'amount',
+                                              'converted_amount']
+        with self._lock:
+            rows = self._connect().execute(query, parameters).fetchall()
+        return [dict(zip(keys, row)) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*) FROM conversions').fetchone()[0]
+
+    def earliest(self) -> Optional[float]:
+        """
+            Return the Unix time of the oldest stored conversion, None if there is none.
+            """
+        with self._lock:
+            return self._connect().execute('SELECT MIN(ts) FROM conversions').fetchone()[0]
+
+    def has_marker(self, name: str) -> bool:
+        """
+            Return True if the marker 'name' was stored by set_marker(), in this or an earlier run.
+            """
+        with self._lock:
+            return self._connect().execute('SELECT 1 FROM markers WHERE name = ?', (name,)).fetchone() is not None
+
+    def set_marker(self, name: str) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute('INSERT OR IGNORE INTO markers (name) VALUES (?)', (name,))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened lazily, so importing this module never touches the disk
+        if self._connection is None:
+            makedirs(path.dirname(self.db_path) or '.', exist_ok=True)
+            # Written from the logging thread and read from the GUI or CLI, the lock serialises access
+            self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.executescript(_SCHEMA)
+        return self._connection
+
+
+def _filters(source_currency: Optional[str], target_currency: Optional[str]) -> Tuple[List[str], List[Any]]:
+    where, parameters = [], []
+    if source_currency is not None:
+        where.append('source_currency = ?')
+        parameters.append(source_currency)
+    if target_currency is not None:
+        where.append('target_currency = ?')
+        parameters.append(target_currency)
+    return where, parameters
+
+
+def _day(timestamp: float) -> str:
+    # Local calendar day, matching the time stamps in the log
+    return strftime('%Y-%m-%d', localtime(timestamp))
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def _to_float(value: Any) -> Optional[float]:
+    # The GUI logs the amount as typed, so it may arrive as text
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ConversionHistoryHandler(logging.Handler):
+    """
+        Logging handler that appends every logged conversion to a ConversionHistory.
+
+        It runs on the logging writer thread next to the file handler and inserts conversions in
+        batches, whenever 'flush_records' are pending or the listener flushes, so logging a conversion
+        costs the caller nothing extra.
+
+        Parameters:
+        - history (ConversionHistory): Where conversions are appended.
+        - flush_records (int): Conversions held before they are inserted in one transaction.
+        """
+
+    def __init__(self, history: ConversionHistory, flush_records: int = FLUSH_RECORDS) -> None:
+        super().__init__()
+        self.history = history
+        self.flush_records = flush_records
+        self._pending = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        fields = getattr(record, 'fields', None)
+        if not fields or fields.get('event') != 'conversion':
+            return
+        self._pending.append((record.created, fields['source_currency'], fields['target_currency'],
+                              _to_float(fields['amount']), _to_float(fields['converted_amount'])))
+        if len(self._pending) >= self.flush_records:
+            self.flush()
+
+    def flush(self) -> None:
+        # Also called from flush_logs() on the caller's thread, the handler lock keeps emit() out
+        with self.lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+            try:
+                self.history.add_many(pending)
+            except sqlite3.Error:
+                # Indexing must never break logging, the log file still has these conversions
+                self.handleError(None)
+
+
+# History shared by the logging thread, the CLI and the GUI
+conversion_history = ConversionHistory()
+
+
+def import_logged_conversions(history: Optional[ConversionHistory] = None, log_path: str = log_file_path) -> int:
+    """
+        Backfill the history from the log and its rotated files, JSON lines and the free-text lines before them.
+
+        The logs are read once per history: afterwards a stored marker makes this return straight away,
+        since the logging handler indexes every later conversion. Only conversions older than the oldest
+        one already stored are imported, so nothing is added twice. Entries without a source or target
+        currency are skipped.
+
+        Returns:
+        int: The number of conversions imported.
+
+        Example:
+        print(f'{import_logged_conversions()} conversions imported')
+        """
+    # Reuses the report's streaming log reader, which does not load reportlab
+    from pdf_report import read_logged_conversions
+
+    history = history if history is not None else conversion_history
+    # Re-reading every rotated log would make each query slower as the logs grow
+    if history.has_marker(LOGS_IMPORTED):
+        return 0
+
+    earliest = history.earliest()
+    # The log keeps whole milliseconds, so compare in those
+    cutoff = int(earliest * 1000) if earliest is not None else None
+    batch = []
+    imported = 0
+    for entry in read_logged_conversions(log_path):
+        try:
+            timestamp = datetime.fromisoformat(entry['time']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            continue
+        if cutoff is not None and round(timestamp * 1000) >= cutoff:
+            continue
+        # The pair columns are NOT NULL, an entry without one can not be indexed
+        if not entry.get('source_currency') or not entry.get('target_currency'):
+            continue
+        batch.append((timestamp, entry.get('source_currency'), entry.get('target_currency'),
+                      _to_float(entry.get('amount')), _to_float(entry.get('converted_amount'))))
+        if len(batch) >= 10000:
+            imported += history.add_many(batch)
+            batch = []
+    imported += history.add_many(batch)
+    history.set_marker(LOGS_IMPORTED)
+    return imported
+
+
+def search_conversions(**filters) -> List[Dict[str, Any]]:
+    """
+        Search the shared history, see ConversionHistory.search().
+        """
+    return conversion_history.search(**filters)
+
+
+def conversion_totals(**filters) -> List[Dict[str, Any]]:
+    """
+        Aggregate the shared history, see ConversionHistory.totals().
+        """
+    return conversion_history.totals(**filters)
+
+
+def day_start(day: str) -> float:
+    """
+        Return the Unix time of local midnight at the start of a YYYY-MM-DD day.
+        """
+    return datetime.strptime(day, '%Y-%m-%d').timestamp()
@@ -0,0 +1,254 @@
+import json
+from bisect import bisect_left
+from os import path
+from threading import Lock
+from time import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from logs import app_dir, ensure_app_dir, log_error
+
+# Provider endpoint listing every supported currency
+CURRENCIES_URL = 'https://api.freecurrencyapi.com/v1/currencies'
+# Provider's currency list cached next to the log
+CURRENCIES_CACHE_PATH = path.join(app_dir, 'currencies.json')
+# Seconds before the cached list is considered worth refreshing
+CURRENCIES_CACHE_MAX_AGE = 7 * 24 * 3600
+
+
+class Currency(NamedTuple):
+    code: str
+    name: str
+    minor_units: int
+
+
+# ISO 4217 code, name and minor-unit precision of every currency known without asking the provider
+BUILTIN_CURRENCIES = (
+    Currency('AED', 'UAE Dirham', 2),
+    Currency('ARS', 'Argentine Peso', 2),
+    Currency('AUD', 'Australian Dollar', 2),
+    Currency('BGN', 'Bulgarian Lev', 2),
+    Currency('BRL', 'Brazilian Real', 2),
+    Currency('CAD', 'Canadian Dollar', 2),
+    Currency('CHF', 'Swiss Franc', 2),
+    Currency('CLP', 'Chilean Peso', 0),
+    Currency('CNY', 'Yuan Renminbi', 2),
+    Currency('COP', 'Colombian Peso', 2),
+    Currency('CZK', 'Czech Koruna', 2),
+    Currency('DKK', 'Danish Krone', 2),
+    Currency('EGP', 'Egyptian Pound', 2),
+    Currency('EUR', 'Euro', 2),
+    Currency('GBP', 'Pound Sterling', 2),
+    Currency('HKD', 'Hong Kong Dollar', 2),
+    Currency('HUF', 'Forint', 2),
+    Currency('IDR', 'Rupiah', 2),
+    Currency('ILS', 'New Israeli Sheqel', 2),
+    Currency('INR', 'Indian Rupee', 2),
+    Currency('ISK', 'Iceland Krona', 0),
+    Currency('JPY', 'Yen', 0),
+    Currency('KRW', 'Won', 0),
+    Currency('MXN', 'Mexican Peso', 2),
+    Currency('MYR', 'Malaysian Ringgit', 2),
+    Currency('NOK', 'Norwegian Krone', 2),
+    Currency('NZD', 'New Zealand Dollar', 2),
+    Currency('PHP', 'Philippine Peso', 2),
+    Currency('PLN', 'Zloty', 2),
+    Currency('RON', 'Romanian Leu', 2),
+    Currency('RUB', 'Russian Ruble', 2),
+    Currency('SAR', 'Saudi Riyal', 2),
+    Currency('SEK', 'Swedish Krona', 2),
+    Currency('SGD', 'Singapore Dollar', 2),
+    Currency('THB', 'Baht', 2),
+    Currency('TRY', 'Turkish Lira', 2),
+    Currency('USD', 'US Dollar', 2),
+    Currency('ZAR', 'Rand', 2),
+)
+
+
+class CurrencyRegistry:
+    """
+        Immutable index of currencies with O(1) validation and prefix search.
+
+        Built once and swapped as a whole when the provider's list is refreshed, so lookups never
+        need a lock.
+
+        Parameters:
+        - currencies (Iterable[Currency]): The currencies to index.
+        """
+
+    def __init__(self, currencies: Iterable[Currency]) -> None:
+        self.by_code: Dict[str, Currency] = {currency.code: currency for currency in currencies}
+        self.codes = frozenset(self.by_code)
+        # Sorted keys for bisect-based prefix search on codes and lower-cased names
+        self._sorted_codes = sorted(self.codes)
+        names = sorted((currency.name.lower(), currency.code) for currency in self.by_code.values())
+        self._sorted_names = [name for name, code in names]
+        self._name_codes = [code for name, code in names]
+
+    def search(self, prefix: str, limit: int = 10) -> List[Currency]:
+        if not prefix:
+            return []
+
+        # Codes matching the prefix first, then currencies whose name starts with it
+        matches = self._sorted_codes[self._prefix_range(self._sorted_codes, prefix.upper())]
+        for code in self._name_codes[self._prefix_range(self._sorted_names, prefix.lower())]:
+            if code not in matches:
+                matches.append(code)
+        return [self.by_code[code] for code in matches[:limit]]
+
+    @staticmethod
+    def _prefix_range(items: List[str], prefix: str) -> slice:
+        # Every string starting with 'prefix' sorts between these two bounds
+        return slice(bisect_left(items, prefix), bisect_left(items, prefix + '\uffff'))
+
+
+# Registry shared by the CLI and GUI, starts from the builtin table plus any cached provider list
+_registry: Optional[CurrencyRegistry] = None
+_registry_lock = Lock()
+
+
+def get_registry() -> CurrencyRegistry:
+    """
+        Return the shared currency registry, building it on first use.
+
+        Example:
+        print(len(get_registry().codes))
+        """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = CurrencyRegistry(_merge(BUILTIN_CURRENCIES, _load_cached_currencies()))
+    return _registry
+
+
+def is_valid_currency(currency: str) -> bool:
+    """
+        Check whether a currency code is known.
+
+        Parameters:
+        - currency (str): The ISO 4217 code to check, e.g. 'USD'.
+
+        Returns:
+        bool: True if the currency is in the registry.
+
+        Example:
+        is_valid_currency('EUR')
+        True
+        """
+    return currency in get_registry().codes
+
+
+def get_currency(currency: str) -> Optional[Currency]:
+    """
+        Return the registry entry for a currency code, None if it is unknown.
+        """
+    return get_registry().by_code.get(currency)
+
+
+def minor_units(currency: str) -> int:
+    """
+        Return the number of decimal places a currency is quoted in, 2 for unknown currencies.
+
+        Example:
+        minor_units('JPY')
+        0
+        """
+    entry = get_registry().by_code.get(currency)
+    return entry.minor_units if entry is not None else 2
+
+
+def search_currencies(prefix: str, limit: int = 10) -> List[Currency]:
+    """
+        Find currencies whose code or name starts with 'prefix', for autocompletion.
+
+        Parameters:
+        - prefix (str): The typed text, matched case-insensitively.
+        - limit (int): Maximum number of results.
+
+        Returns:
+        list: Matching Currency entries, code matches first.
+
+        Example:
+        [currency.code for currency in search_currencies('sw')]
+        ['SEK', 'CHF']
+        """
+    return get_registry().search(prefix, limit)
+
+
+def currencies_cache_is_stale() -> bool:
+    """
+        Return True if the provider's currency list was never cached or is older than a week.
+        """
+    try:
+        return time() - path.getmtime(CURRENCIES_CACHE_PATH) > CURRENCIES_CACHE_MAX_AGE
+    except OSError:
+        return True
+
+
+def refresh_currencies(api_key: str) -> bool:
+    """
+        Fetch the provider's currency list, cache it on disk and rebuild the registry from it.
+
+        Parameters:
+        - api_key (str): The API key for accessing the FreeCurrencyAPI.
+
+        Returns:
+        bool: True if the registry was refreshed.
+
+        Example:
+        if refresh_currencies('your_api_key'):
+            print(len(get_registry().codes))
+        """
+    global _registry
+    # Imported on first use, so validation alone never loads requests
+    import http_client
+    try:
+        response = http_client.get(CURRENCIES_URL, headers={'apikey': api_key})
+    except http_client.RequestException as e:
+        log_error(type(e).__name__, str(e))
+        return False
+
+    if response.status_code != 200:
+        log_error('HTTPError', f'{response.status_code}, {response.text}')
+        return False
+
+    try:
+        provider_currencies = _parse_provider_currencies(response.json().get('data', {}))
+    except (ValueError, AttributeError, TypeError) as e:
+        # An HTML error page or a changed response shape keeps the current registry
+        log_error(type(e).__name__, f'Unexpected currency list response: {e}')
+        return False
+
+    try:
+        ensure_app_dir()
+        with open(CURRENCIES_CACHE_PATH, 'w') as cache_file:
+            json.dump([currency._asdict() for currency in provider_currencies], cache_file)
+    except OSError as e:
+        log_error(type(e).__name__, str(e))
+
+    # Swap in a new registry in one assignment
+    _registry = CurrencyRegistry(_merge(BUILTIN_CURRENCIES, provider_currencies))
+    return True
+
+
+def _parse_provider_currencies(data: dict) -> List[Currency]:
+    # Provider entries look like {"EUR": {"name": "Euro", "decimal_digits": 2, ...}}
+    return [Currency(code, entry.get('name', code), int(entry.get('decimal_digits', 2)))
+            for code, entry in data.items()]
+
+
+def _load_cached_currencies() -> List[Currency]:
+    try:
+        with open(CURRENCIES_CACHE_PATH) as cache_file:
+            return [Currency(**entry) for entry in json.load(cache_file)]
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError, TypeError) as e:
+        log_error(type(e).__name__, str(e))
+        return []
+
+
+def _merge(builtin: Iterable[Currency], provider: Iterable[Currency]) -> List[Currency]:
+    # Provider entries extend the builtin table, the builtin minor units stay authoritative
+    merged = {currency.code: currency for currency in provider}
+    merged.update({currency.code: currency for currency in builtin})
+    return list(merged.values())
@@ -0,0 +1,182 @@
+import json
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import path, remove
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlsplit
+from batch import convert_many
+import conversion
+from conversion import get_exchange_rate, rate_cache, rate_table
+from currencies import is_valid_currency
+from daemon_client import DEFAULT_HOST, DEFAULT_PORT
+from instrumentation import metrics
+from logs import log_error
+from prefetch import prefetcher
+
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    """
+        Serve conversions from the daemon's warm caches.
+
+        Routes:
+        - GET /convert?source_currency=USD&target_currency=EUR&amount=100 -> {"rate": ..., "converted_amount": ...}
+        - GET /rate?source_currency=USD&target_currency=EUR -> {"rate": ...}
+        - POST /convert {"conversions": [{"source_currency", "target_currency", "amount"}, ...]} -> {"results": [...]}
+        - GET /stats -> cache, rate table, provider and HTTP counters, and per-stage latencies
+        - GET /metrics -> every metric in the Prometheus text format, scrapeable as-is
+        """
+
+    # Keep connections open between requests, clients reuse them
+    protocol_version = 'HTTP/1.1'
+    server_version = 'AnwooConverter/1.0'
+    # Buffer the response so headers and body leave in one packet, two small writes would stall
+    # every keep-alive request on Nagle's algorithm and delayed ACKs
+    wbufsize = -1
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if url.path == '/convert':
+            self._convert(query, with_amount=True)
+        elif url.path == '/rate':
+            self._convert(query, with_amount=False)
+        elif url.path == '/stats':
+            self._send_json(200, self._stats())
+        elif url.path == '/metrics':
+            self._send_text(200, metrics.to_prometheus(), 'text/plain; version=0.0.4')
+        else:
+            self._send_json(404, {'error': f'Unknown path: {url.path}'})
+
+    def do_POST(self) -> None:
+        if urlsplit(self.path).path != '/convert':
+            self._send_json(404, {'error': f'Unknown path: {self.path}'})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {'error': 'Request body too large'})
+            return
+
+        try:
+            conversions = json.loads(self.rfile.read(length))['conversions']
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': f'Invalid request body: {e}'})
+            return
+
+        # Grouped by pair, each distinct pair's rate is resolved once
+        results = [row['converted_amount'] for row in convert_many(self.server.api_key, conversions)]
+        self._send_json(200, {'results': results})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Access logs would cost more than the conversions themselves
+        pass
+
+    def _convert(self, query: dict, with_amount: bool) -> None:
+        source_currency = query.get('source_currency')
+        target_currency = query.get('target_currency')
+        if not is_valid_currency(source_currency) or not is_valid_currency(target_currency):
+            self._send_json(400, {'error': 'Invalid source or target currency'})
+            return
+
+        try:
+            amount = float(query['amount']) if with_amount else None
+        except (KeyError, ValueError):
+            self._send_json(400, {'error': 'Invalid amount'})
+            return
+
+        prefetcher.record(source_currency, target_currency)
+        rate = get_exchange_rate(self.server.api_key, source_currency, target_currency)
+        payload = {'rate': rate}
+        if with_amount:
+            payload['converted_amount'] = amount * rate if rate is not None else None
+        self._send_json(200, payload)
+
+    def _stats(self) -> dict:
+        # Imported here so serving conversions from memory never loads requests
+        import http_client
+        return {'cache': rate_cache.stats(), 'rate_table': rate_table.stats(),
+                'providers': conversion.rate_provider.stats(), 'http': http_client.shared_client.stats(),
+                'stages': metrics.snapshot()['stages'], 'prefetch': prefetcher.stats()}
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        self._send_text(status, json.dumps(payload), 'application/json')
+
+    def _send_text(self, status: int, text: str, content_type: str) -> None:
+        body = text.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ConversionHTTPServer(ThreadingHTTPServer):
+    # One thread per client connection, the API key is shared by every request
+    daemon_threads = True
+
+    def __init__(self, address: tuple, api_key: str) -> None:
+        super().__init__(address, ConversionRequestHandler)
+        self.api_key = api_key
+
+
+class ConversionUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, api_key: str) -> None:
+        # A socket file left behind by a previous run would make bind() fail
+        if path.exists(socket_path):
+            remove(socket_path)
+        super().__init__(socket_path, ConversionRequestHandler)
+        self.api_key = api_key
+
+
+def create_server(api_key: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                  socket_path: Optional[str] = None) -> socketserver.BaseServer:
+    """
+        Create the conversion daemon's server without starting it.
+
+        Parameters:
+        - api_key (str): The API key used for every upstream request.
+        - host (str): Interface to listen on, localhost by default.
+        - port (int): TCP port to listen on, 0 picks a free one.
+        - socket_path (str, optional): Listen on this Unix socket instead of TCP.
+
+        Returns:
+        socketserver.BaseServer: Call serve_forever() to start serving and shutdown() to stop.
+
+        Example:
+        server = create_server('your_api_key', port=8642)
+        server.serve_forever()
+        """
+    if socket_path is not None:
+        return ConversionUnixServer(socket_path, api_key)
+    return ConversionHTTPServer((host, port), api_key)
+
+
+def serve(api_key: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          socket_path: Optional[str] = None) -> None:
+    """
+        Run the conversion daemon until interrupted, keeping rate caches and connections warm.
+        """
+    server = create_server(api_key, host, port, socket_path)
+    address = socket_path if socket_path is not None else f'http://{host}:{server.server_address[1]}'
+    print(f'Serving conversions on {address}')
+    # Warm the tables of the usual pairs while the first requests come in
+    prefetcher.start(api_key)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        log_error(type(e).__name__, str(e))
+        raise
+    finally:
+        server.server_close()
+        prefetcher.log_stats()
+        if socket_path is not None and path.exists(socket_path):
+            remove(socket_path)
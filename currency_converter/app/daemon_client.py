@@ -0,0 +1,116 @@
+import json
+import socket
+from http.client import HTTPConnection, HTTPException
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlencode
+
+# Where the conversion daemon listens unless told otherwise
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8642
+
+
+class UnixHTTPConnection(HTTPConnection):
+    """
+        HTTPConnection that talks to a server listening on a Unix domain socket.
+        """
+
+    def __init__(self, socket_path: str, timeout: float) -> None:
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class DaemonClient:
+    """
+        Thin client for the conversion daemon, keeping one persistent connection open.
+
+        Only the standard library is imported, so a script or CLI call using the daemon starts fast.
+
+        Parameters:
+        - host (str): Host the daemon listens on.
+        - port (int): Port the daemon listens on.
+        - socket_path (str, optional): Unix socket of the daemon, used instead of host and port.
+        - timeout (float): Seconds to wait for the daemon.
+
+        Example:
+        client = DaemonClient()
+        print(client.convert('USD', 'EUR', 100.0))
+        print(client.convert_many([('USD', 'EUR', 100.0), ('EUR', 'JPY', 5.0)]))
+        """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: Optional[str] = None,
+                 timeout: float = 5.0) -> None:
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._connection = None
+
+    def convert(self, source_currency: str, target_currency: str, amount: float) -> Optional[float]:
+        """
+            Convert one amount on the daemon.
+
+            Returns:
+            float or None: The converted amount, None if the rate could not be fetched.
+            """
+        query = urlencode({'source_currency': source_currency, 'target_currency': target_currency,
+                           'amount': amount})
+        return self._request('GET', f'/convert?{query}')['converted_amount']
+
+    def convert_many(self, conversions: Iterable[Tuple[str, str, float]]) -> List[Optional[float]]:
+        """
+            Convert many amounts in one round trip.
+
+            Parameters:
+            - conversions (Iterable[tuple]): (source_currency, target_currency, amount) triples.
+
+            Returns:
+            list: Converted amounts in the same order, None where the rate could not be fetched.
+            """
+        body = {'conversions': [{'source_currency': source_currency, 'target_currency': target_currency,
+                                 'amount': amount} for source_currency, target_currency, amount in conversions]}
+        return self._request('POST', '/convert', body)['results']
+
+    def stats(self) -> Dict[str, Any]:
+        """
+            Return the daemon's cache, rate table, provider and HTTP counters.
+            """
+        return self._request('GET', '/stats')
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _request(self, method: str, url: str, body: Optional[dict] = None) -> dict:
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload is not None else {}
+
+        # Retry once on a fresh connection in case the daemon closed the idle one
+        for attempt in range(2):
+            connection = self._connect()
+            try:
+                connection.request(method, url, body=payload, headers=headers)
+                response = connection.getresponse()
+                data = json.loads(response.read())
+            except (OSError, HTTPException):
+                self.close()
+                if attempt == 1:
+                    raise
+                continue
+
+            if response.status != 200:
+                raise ValueError(data.get('error', f'Daemon answered {response.status}'))
+            return data
+
+    def _connect(self) -> HTTPConnection:
+        if self._connection is None:
+            if self.socket_path is not None:
+                self._connection = UnixHTTPConnection(self.socket_path, self.timeout)
+            else:
+                self._connection = HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self._connection
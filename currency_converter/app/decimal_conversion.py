@@ -0,0 +1,246 @@
+from decimal import (Decimal, ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, ROUND_HALF_DOWN, ROUND_HALF_EVEN,
+                     ROUND_HALF_UP, ROUND_UP)
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+from conversion import get_exchange_rate
+from currencies import minor_units
+
+# Rounding modes by the name used on the command line
+ROUNDING_MODES = {
+    'half_even': ROUND_HALF_EVEN,
+    'half_up': ROUND_HALF_UP,
+    'half_down': ROUND_HALF_DOWN,
+    'up': ROUND_UP,
+    'down': ROUND_DOWN,
+    'ceiling': ROUND_CEILING,
+    'floor': ROUND_FLOOR,
+}
+# Banker's rounding, so rounding errors cancel out over many amounts instead of drifting upwards
+DEFAULT_ROUNDING = 'half_even'
+
+# Significant digits a rate is used with. Cross rates are float quotients such as 0.680522387872477,
+# whose trailing digits are noise; capping them keeps the scaled-integer products within int64
+RATE_SIGNIFICANT_DIGITS = 10
+
+_INT64_MAX = np.iinfo(np.int64).max
+
+
+def to_decimal(value) -> Decimal:
+    """
+        Convert a float, int or string to Decimal through its shortest text form, so 0.1 stays 0.1.
+        """
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def to_rate(rate) -> Decimal:
+    """
+        Convert a rate to Decimal rounded to RATE_SIGNIFICANT_DIGITS, the rate every exact path converts at.
+
+        Example:
+        to_rate(0.680522387872477)
+        Decimal('0.6805223879')
+        """
+    rate = to_decimal(rate)
+    if not rate.is_finite() or rate.is_zero():
+        return rate
+    exponent = Decimal(1).scaleb(rate.adjusted() - RATE_SIGNIFICANT_DIGITS + 1)
+    return rate.quantize(exponent, rounding=ROUND_HALF_EVEN)
+
+
+def convert_exact(amount, rate, target_currency: str, rounding: str = DEFAULT_ROUNDING) -> Decimal:
+    """
+        Convert an amount with decimal arithmetic and round it to the target currency's minor units.
+
+        Parameters:
+        - amount (float, str or Decimal): The amount to convert.
+        - rate (float, str or Decimal): The exchange rate, used rounded to RATE_SIGNIFICANT_DIGITS.
+        - target_currency (str): The currency converted into, decides the number of decimal places.
+        - rounding (str): One of ROUNDING_MODES.
+
+        Returns:
+        Decimal: The converted amount, e.g. Decimal('91.27') for EUR or Decimal('14980') for JPY.
+
+        Example:
+        convert_exact('100.00', 0.9127, 'EUR')
+        Decimal('91.27')
+        """
+    exponent = Decimal(1).scaleb(-minor_units(target_currency))
+    return (to_decimal(amount) * to_rate(rate)).quantize(exponent, rounding=ROUNDING_MODES[rounding])
+
+
+def convert_currency_exact(api_key: str, source_currency: str, target_currency: str, amount,
+                           rounding: str = DEFAULT_ROUNDING) -> Optional[Decimal]:
+    """
+        Exact counterpart of conversion.convert_currency(), see convert_exact().
+
+        Returns:
+        Decimal or None: The converted amount, None if the rate could not be fetched.
+
+        Example:
+        print(convert_currency_exact('your_api_key', 'USD', 'JPY', '19.99', rounding='half_up'))
+        """
+    rate = get_exchange_rate(api_key, source_currency, target_currency)
+    if rate is None:
+        return None
+    return convert_exact(amount, rate, target_currency, rounding)
+
+
+def to_minor_units(amounts: Iterable, currency: str) -> np.ndarray:
+    """
+        Turn amounts into whole minor units (cents, pence, yen) as int64, rounding half to even.
+
+        Amounts with no more decimals than the currency's minor units, as found in ledgers, convert
+        exactly: the float error of 10.15 * 100 is far below the half unit that np.rint() rounds at.
+        Finer amounts are rounded, see decimal_to_minor_units() for a conversion that never rounds.
+
+        Example:
+        to_minor_units(['10.15', '0.1'], 'USD')
+        array([1015,   10])
+        """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    return np.rint(amounts * 10 ** minor_units(currency)).astype(np.int64)
+
+
+def decimal_to_minor_units(amounts: List[Optional[Decimal]], currency: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+        Turn Decimal amounts into whole minor units as int64, exactly, where they are whole minor units.
+
+        Unlike to_minor_units(), nothing is rounded: amounts finer than one minor unit, beyond int64
+        or None are left at 0 and flagged, so the caller can convert them with convert_exact().
+
+        Returns:
+        Tuple[np.ndarray, np.ndarray]: The int64 minor units and a boolean mask of the amounts they hold.
+
+        Example:
+        decimal_to_minor_units([Decimal('10.15'), Decimal('10.005'), None], 'USD')
+        (array([1015,    0,    0]), array([ True, False, False]))
+        """
+    digits = minor_units(currency)
+    minor = np.zeros(len(amounts), dtype=np.int64)
+    whole = np.zeros(len(amounts), dtype=bool)
+    for index, amount in enumerate(amounts):
+        if amount is None or not amount.is_finite():
+            continue
+        scaled = amount.scaleb(digits)
+        if scaled == scaled.to_integral_value() and abs(scaled) <= _INT64_MAX:
+            minor[index] = int(scaled)
+            whole[index] = True
+    return minor, whole
+
+
+def format_minor_units(minor: np.ndarray, currency: str) -> List[str]:
+    """
+        Format whole minor units as exact decimal strings, e.g. 1015 -> '10.15' for USD.
+        """
+    digits = minor_units(currency)
+    if digits == 0:
+        return [str(value) for value in minor.tolist()]
+
+    # Sign and magnitude apart, so -5 cents becomes '-0.05' rather than '-1.95'
+    whole, fraction = np.divmod(np.abs(minor), 10 ** digits)
+    texts = list(map(f'%d.%0{digits}d'.__mod__, zip(whole.tolist(), fraction.tolist())))
+    for index in np.flatnonzero(minor < 0).tolist():
+        texts[index] = '-' + texts[index]
+    return texts
+
+
+def convert_minor_units(minor: np.ndarray, rate, source_currency: str, target_currency: str,
+                        rounding: str = DEFAULT_ROUNDING) -> np.ndarray:
+    """
+        Convert amounts in the source currency's minor units into the target currency's minor units
+        with scaled-integer arithmetic, rounding exactly like convert_exact().
+
+        The rate is rounded like in convert_exact() and taken as the exact decimal n / 10^k, so each result
+        is (minor * n) divided by a power of ten, computed and rounded in int64 for the whole array at once.
+        With at most RATE_SIGNIFICANT_DIGITS digits in n, amounts up to about 9 million USD fit; larger
+        products are converted with Decimal instead, so results never wrap.
+
+        Parameters:
+        - minor (np.ndarray): int64 amounts in the source currency's minor units.
+        - rate (float, str or Decimal): The exchange rate.
+        - source_currency (str): The currency of the amounts.
+        - target_currency (str): The currency converted into.
+        - rounding (str): One of ROUNDING_MODES.
+
+        Returns:
+        np.ndarray: int64 amounts in the target currency's minor units.
+
+        Example:
+        minor = to_minor_units([100.0, 19.99], 'USD')
+        format_minor_units(convert_minor_units(minor, 149.805, 'USD', 'JPY'), 'JPY')
+        ['14980', '2995']
+        """
+    if rounding not in ROUNDING_MODES:
+        raise ValueError(f'Unknown rounding mode: {rounding}')
+    minor = np.asarray(minor, dtype=np.int64)
+    numerator, exponent = _scaled_rate(to_rate(rate))
+    # result = minor * numerator * 10^(target digits - source digits - rate digits)
+    shift = minor_units(target_currency) - minor_units(source_currency) - exponent
+    if shift >= 0:
+        numerator *= 10 ** shift
+        divisor = 1
+    else:
+        divisor = 10 ** -shift
+
+    if numerator == 0:
+        return np.zeros_like(minor)
+    if numerator > _INT64_MAX or divisor > _INT64_MAX // 2:
+        return _convert_minor_units_decimal(minor, rate, source_currency, target_currency, rounding)
+
+    # Only amounts whose product fits in int64 take the vectorized path
+    safe = np.abs(minor) <= _INT64_MAX // abs(numerator)
+    result = np.empty_like(minor)
+    result[safe] = _divide_rounded(minor[safe] * numerator, divisor, rounding)
+    if not safe.all():
+        result[~safe] = _convert_minor_units_decimal(minor[~safe], rate, source_currency, target_currency, rounding)
+    return result
+
+
+def _scaled_rate(rate: Decimal) -> Tuple[int, int]:
+    # Exact integer numerator and power of ten: Decimal('0.9127') -> (9127, 4)
+    sign, digits, exponent = rate.normalize().as_tuple()
+    numerator = int(''.join(map(str, digits)))
+    if exponent > 0:
+        numerator *= 10 ** exponent
+        exponent = 0
+    return (-numerator if sign else numerator), -exponent
+
+
+def _divide_rounded(products: np.ndarray, divisor: int, rounding: str) -> np.ndarray:
+    # Integer division of every product by 'divisor', rounded like the matching decimal mode
+    if divisor == 1:
+        return products
+    quotient, remainder = np.divmod(products, divisor)
+    # np.divmod floors, so remainder is in [0, divisor) and the exact result lies in [quotient, quotient + 1)
+    inexact = remainder != 0
+    negative = products < 0
+    twice = 2 * remainder
+
+    if rounding == 'floor':
+        return quotient
+    if rounding == 'ceiling':
+        return quotient + inexact
+    if rounding == 'down':
+        return quotient + (inexact & negative)
+    if rounding == 'up':
+        return quotient + (inexact & ~negative)
+
+    above_half = twice > divisor
+    tie = twice == divisor
+    if rounding == 'half_up':
+        # Ties away from zero
+        return quotient + (above_half | (tie & ~negative))
+    if rounding == 'half_down':
+        # Ties towards zero
+        return quotient + (above_half | (tie & negative))
+    # half_even, ties to the even neighbour
+    return quotient + (above_half | (tie & (quotient % 2 == 1)))
+
+
+def _convert_minor_units_decimal(minor: np.ndarray, rate, source_currency: str, target_currency: str,
+                                 rounding: str) -> np.ndarray:
+    source_exponent = Decimal(1).scaleb(-minor_units(source_currency))
+    target_scale = Decimal(1).scaleb(minor_units(target_currency))
+    converted = [convert_exact(Decimal(value) * source_exponent, rate, target_currency, rounding) * target_scale
+                 for value in minor.tolist()]
+    return np.array([int(value) for value in converted], dtype=np.int64)
@@ -1,11 +1,16 @@
 from tkinter import Tk, Entry, Button, Checkbutton, Label, StringVar, BooleanVar, messagebox
-from conversion import convert_currency
-from clipboard_features import ClipboardFeatures
-from config import load_api_key
-from reportlab.pdfgen import canvas
+from conversion import configure_api_keys, convert_currency
+from clipboard_features import ClipboardFeatures, convert_clipboard_text
+from currencies import is_valid_currency, refresh_currencies, currencies_cache_is_stale
+from gui_worker import ConversionWorker
+from history_view import HistoryView
+from live_result import LiveResult
+from multi_target_panel import MultiTargetPanel
+from prefetch import prefetcher
+from rate_watcher import RateWatcher
+from config import config_folder, load_api_key, load_api_keys
 from config import save_api_key
-from os import startfile
-from os import path, getenv
+from os import path
 from os.path import exists
 from typing import Tuple
 from datetime import datetime, time
@@ -14,6 +19,27 @@ import logging
 from logging.handlers import RotatingFileHandler
 import time
 import tempfile
+import os
+import subprocess
+import sys
+from threading import Thread
+
+
+def open_with_default_app(file_path: str) -> None:
+    """
+        Open a file with the platform's default application.
+
+        os.startfile() only exists on Windows, so macOS uses 'open' and other systems 'xdg-open'.
+
+        Parameters:
+        - file_path (str): The file to open.
+        """
+    if hasattr(os, 'startfile'):
+        os.startfile(file_path)
+    elif sys.platform == 'darwin':
+        subprocess.Popen(['open', file_path])
+    else:
+        subprocess.Popen(['xdg-open', file_path])
 
 
 def create_gui() -> Tuple[StringVar, StringVar, StringVar, StringVar, StringVar]:
@@ -37,19 +63,6 @@ def create_gui() -> Tuple[StringVar, StringVar, StringVar, StringVar, StringVar]
     # Title of GUI window
     root.title("Anwoo's Currency Converter")
 
-    def is_valid_currency(currency: str) -> bool:
-        currency_symbols = [
-            'USD', 'EUR', 'GBP', 'JPY', 'CHF', 'CAD', 'AUD', 'CNY', 'INR', 'BRL',
-            'ZAR', 'RUB', 'MXN', 'SGD', 'HKD', 'NZD', 'SEK', 'NOK', 'DKK', 'TRY',
-            'ARS', 'CLP', 'COP', 'EGP', 'IDR', 'MYR', 'THB', 'KRW', 'ILS', 'SAR',
-            'AED', 'CHF'
-        ]
-
-        if currency in currency_symbols:
-            return True
-        else:
-            return False
-
     def is_valid_amount(amount: str) -> bool:
         try:
             float_amount = float(amount)
@@ -84,29 +97,78 @@ def create_gui() -> Tuple[StringVar, StringVar, StringVar, StringVar, StringVar]
                 messagebox.showerror('Error', 'invalid target currency')
                 return None
 
-            # Run the convert_currency() function
-            converted_amount = convert_currency(api_key_var.get(), source_currency_str, target_currency_str, amount)
-
-            # Set the result variable if one is returned
-            if converted_amount is not None:
-                result_var.set(f'{amount} {source_currency_str} = {converted_amount:.5f} {target_currency_str}')
-                log_conversion(source_currency_str, target_currency_str, amount_str, converted_amount)
-                return True
-            else:
-                # If there is no conversion set result var to string
+            def show_result(converted_amount):
+                # Set the result variable if one is returned
+                nonlocal last_conversion
+                if converted_amount is not None:
+                    result_var.set(f'{amount} {source_currency_str} = {converted_amount:.5f} {target_currency_str}')
+                    prefetcher.record(source_currency_str, target_currency_str)
+                    log_conversion(source_currency_str, target_currency_str, amount_str, converted_amount)
+                    # Row for the PDF report, same fields as the conversion log
+                    last_conversion = {'time': f'{datetime.now():%Y-%m-%dT%H:%M:%S}',
+                                       'source_currency': source_currency_str, 'target_currency': target_currency_str,
+                                       'amount': amount_str, 'converted_amount': converted_amount}
+                else:
+                    # If there is no conversion set result var to string
+                    result_var.set('Failed to fetch exchange rate')
+
+            def show_error(error):
+                # Log the error raised on the worker thread
+                log_error(type(error).__name__, str(error))
                 result_var.set('Failed to fetch exchange rate')
-                return False
+
+            # Run the convert_currency() function on a worker thread so the window stays responsive,
+            # a newer click supersedes this one and its result is dropped
+            result_var.set('Converting...')
+            worker.submit(convert_currency, api_key_var.get(), source_currency_str, target_currency_str, amount,
+                          on_done=show_result, on_error=show_error, channel='convert')
+            return True
+
+    def bulk_paste(text: str) -> None:
+        # Convert a pasted column of amounts in one batch, the entries give the default currency pair
+        if not api_key_var.get():
+            messagebox.showerror('Error', 'Please enter an API key')
+            return
+
+        def show_bulk_result(result) -> None:
+            # The converted column replaces the clipboard, ready to paste next to the original
+            root.clipboard_clear()
+            root.clipboard_append(result.text)
+            result_var.set(f'{result.converted} of {result.amounts} amounts converted, copied to the clipboard')
+
+        def show_bulk_error(error) -> None:
+            log_error(type(error).__name__, str(error))
+            result_var.set('Failed to convert the pasted amounts')
+
+        result_var.set('Converting pasted amounts...')
+        worker.submit(convert_clipboard_text, api_key_var.get(), text, source_currency_var.get() or None,
+                      target_currency_var.get() or None, on_done=show_bulk_result, on_error=show_bulk_error,
+                      channel='bulk-paste')
+
+    def stop_button_clicked() -> None:
+        # Drop the result of the conversion or rate lookup in flight
+        if worker.busy:
+            worker.cancel()
+            result_var.set('Conversion cancelled')
+
+    def show_busy(busy: bool) -> None:
+        # Busy indicator while a conversion runs in the background
+        root.config(cursor='watch' if busy else '')
+        stop_button.config(state='normal' if busy else 'disabled')
 
     def cancel_button_clicked() -> None:
         # Close window when cancel button is clicked
+        worker.shutdown()
+        watcher_worker.shutdown()
+        prefetcher.log_stats()
         root.destroy()
 
     def open_pdf(pdf_file_path: str) -> None:
         try:
             # Open the PDF with the default PDF viewer
-            startfile(pdf_file_path)
+            open_with_default_app(pdf_file_path)
         # Raise exception if file does not exist
-        except FileNotFoundError as e:
+        except (FileNotFoundError, OSError) as e:
             # Log the error
             log_error(type(e).__name__, str(e))
             # Print the error
@@ -115,62 +177,22 @@ def create_gui() -> Tuple[StringVar, StringVar, StringVar, StringVar, StringVar]
     def print_pdf() -> None:
         # Check if all entry fields are filled prior to printing
         if check_entry_fields_are_filled():
-            result_text = result_var.get()
             filename = f'Currency_Conversion_{source_currency_var.get()}_to_{target_currency_var.get()}'
-
-            # Create a temporary text file to store the result
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".txt", mode='w', encoding='utf-8') as temp_file:
-                temp_file_path = temp_file.name
-
-                try:
-                    # Write the result to the temporary file
-                    temp_file.write(result_text)
-
-                    # Create PDF file
-                    pdf_file_path = temp_file_path.replace('.txt', f'_{filename}.pdf')
-                    pdf = canvas.Canvas(pdf_file_path)
-                    pdf_file_title = filename
-                    pdf.setTitle(pdf_file_title)
-
-                    # Write the results to PDF file
-                    try:
-
-                        for line_num in range(10):
-                            pdf.drawCentredString(x=10, y=10, text=" ")
-                            if line_num == 7:
-                                pdf.drawCentredString(x=300, y=600,
-                                                      text=f'Timestamp: {datetime.fromtimestamp(time.time())}')
-                            elif line_num == 8:
-                                pdf.drawCentredString(x=300, y=580, text='Conversion done by: '
-                                                                         'https://api.freecurrencyapi.com/v1/latest')
-                        # Set size and font of PDF file
-                        pdf.setFont(psfontname='Helvetica', size=18)
-                        pdf.drawCentredString(x=300, y=560, text=result_text)
-
-                    # Catch various exceptions if they occur
-                    except Exception as e:
-                        # Log the error
-                        log_error(type(e).__name__, str(e))
-                        print(f"Error during PDF creation: {e}")
-
-                    finally:
-                        # Save the PDF
-                        pdf.save()
-                        print(f'Result saved to {pdf_file_path}')
-
-                except IOError as e:
-                    # Log the error
-                    log_error(type(e).__name__, str(e))
-                    print(f"IOError while writing to temporary file: {e}")
-
-                except UnicodeEncodeError as e:
-                    # Log the error
-                    log_error(type(e).__name__, str(e))
-                    print(f"UnicodeEncodeError while writing to temporary file: {e}")
-
-                finally:
-                    # Delete the temporary txt file
-                    temp_file.close()
+            pdf_file_path = path.join(tempfile.gettempdir(), f'{filename}.pdf')
+
+            # Imported on first use, reportlab is only needed for PDFs
+            from pdf_report import write_conversion_report
+
+            # Write the last conversion straight into the PDF table
+            conversions = [last_conversion] if last_conversion is not None else []
+            try:
+                write_conversion_report(pdf_file_path, conversions, title=filename)
+            except (OSError, ImportError) as e:
+                # Log the error
+                log_error(type(e).__name__, str(e))
+                print(f"Error during PDF creation: {e}")
+                return
+            print(f'Result saved to {pdf_file_path}')
 
             # Open the PDF
             open_pdf(pdf_file_path)
@@ -192,14 +214,42 @@ def create_gui() -> Tuple[StringVar, StringVar, StringVar, StringVar, StringVar]
     result_var = StringVar()
     remember_var = BooleanVar()
 
+    # Runs conversions off the Tk main loop
+    worker = ConversionWorker(root, on_busy_change=show_busy)
+
+    # Polls the pair on screen in the background and pushes rate moves into the result
+    rate_watcher = RateWatcher()
+    # Background polls run on a worker of their own, so they never show the busy cursor or
+    # enable 'Stop', and 'Stop' never cancels them
+    watcher_worker = ConversionWorker(root)
+    rate_watcher.attach_to_tk(root, watcher_worker, api_key_var.get)
+    # Last successful conversion, printed by the 'Open PDF' button
+    last_conversion = None
+
+    # Recompute the result as the fields change
+    LiveResult(root, worker, api_key_var, source_currency_var, target_currency_var, amount_var, result_var,
+               is_valid_currency, rate_watcher)
+
     # Load the API key when the GUI is created
-    config_file_path = path.join(getenv('APPDATA'), "Anwoo's Currency Converter Tool", 'config.json')
+    config_file_path = path.join(config_folder(), 'config.json')
     if exists(config_file_path):
         loaded_api_key = load_api_key()
 
         if loaded_api_key:
             api_key_var.set(loaded_api_key)
 
+            # Rotate over the stored key pool, if one was saved from the command line
+            api_keys = load_api_keys()
+            if len(api_keys) > 1:
+                configure_api_keys(api_keys)
+
+            # Fetch the usual pairs' rates in the background, so the first conversion is a cache hit
+            prefetcher.start(loaded_api_key)
+
+            # Pick up currencies the provider added since the list was last cached
+            if currencies_cache_is_stale():
+                Thread(target=refresh_currencies, args=(loaded_api_key,), daemon=True).start()
+
     # API-Key entry field
     api_key_label = Label(root, text='API Key: ')
     api_key_label.grid(row=0, column=0, padx=5, pady=5)
@@ -232,7 +282,8 @@ def create_gui() -> Tuple[StringVar, StringVar, StringVar, StringVar, StringVar]
     ClipboardFeatures(api_key_entry, root)
     ClipboardFeatures(source_currency_entry, root)
     ClipboardFeatures(target_currency_entry, root)
-    ClipboardFeatures(amount_entry, root)
+    # 'Paste and Convert' (Ctrl+Shift+V) converts a whole pasted column of amounts
+    ClipboardFeatures(amount_entry, root, bulk_paste=bulk_paste)
 
     # Save API-Key checkbox
     remember_checkbox = Checkbutton(root, text='Remember API Key',
@@ -256,10 +307,29 @@ def create_gui() -> Tuple[StringVar, StringVar, StringVar, StringVar, StringVar]
     close_button = Button(root, text='Close', command=cancel_button_clicked)
     close_button.grid(row=6, column=1, columnspan=2, pady=10)
 
+    # 'Stop' button to cancel the conversion in flight
+    stop_button = Button(root, text='Stop', command=stop_button_clicked, state='disabled')
+    stop_button.grid(row=7, column=0, columnspan=1, pady=1)
+
+    # Past conversions of the current pair, searchable by pair and day
+    history_button = Button(root, text='History',
+                            command=lambda: HistoryView(root, worker, source_currency_var.get(),
+                                                        target_currency_var.get()))
+    history_button.grid(row=7, column=1, columnspan=2, pady=1)
+
+    # Closing the window also stops the worker pool
+    root.protocol('WM_DELETE_WINDOW', cancel_button_clicked)
+
     # Print result to GUI
     result_label = Label(root, textvariable=result_var)
     result_label.grid(row=8, column=0, columnspan=2, pady=5)
 
+    # One amount converted into many target currencies, all from one rate table
+    multi_target_panel = MultiTargetPanel(root, worker, api_key_var, source_currency_var, amount_var,
+                                          is_valid_currency)
+    multi_target_panel.frame.grid(row=9, column=0, columnspan=2, pady=5)
+    ClipboardFeatures(multi_target_panel.targets_entry, root)
+
     # Open GUI
     root.mainloop()
 
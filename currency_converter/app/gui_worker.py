@@ -0,0 +1,137 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Empty, Queue
+from typing import Any, Callable, Dict, Optional
+from tkinter import Misc
+from logs import log_error
+
+# Milliseconds between checks for finished work while something is running
+POLL_INTERVAL_MS = 30
+# Worker threads available to the GUI
+MAX_WORKERS = 4
+
+
+class ConversionWorker:
+    """
+        Run slow calls on a thread pool and hand their results back on the Tk main loop.
+
+        Work is submitted on a named channel. Only the newest submission on a channel is delivered,
+        so when the user fires several conversions in a row the earlier, stale results are dropped.
+        Results travel through a queue that the main loop polls with after(), because Tk widgets
+        must only be touched from the thread running mainloop().
+
+        Parameters:
+        - root (tkinter.Misc): Any widget of the application, used to schedule polling.
+        - on_busy_change (Callable[[bool], None], optional): Called on the main loop when work starts or ends.
+        - max_workers (int): Worker threads in the pool.
+        - poll_interval_ms (int): Milliseconds between queue checks while work is pending.
+
+        Example:
+        worker = ConversionWorker(root, on_busy_change=lambda busy: root.config(cursor='watch' if busy else ''))
+        worker.submit(convert_currency, api_key, 'USD', 'EUR', 100.0, on_done=lambda amount: print(amount))
+        """
+
+    def __init__(self, root: Misc, on_busy_change: Optional[Callable[[bool], None]] = None,
+                 max_workers: int = MAX_WORKERS, poll_interval_ms: int = POLL_INTERVAL_MS) -> None:
+        self.root = root
+        self.on_busy_change = on_busy_change
+        self.poll_interval_ms = poll_interval_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gui-worker')
+        self._results: Queue = Queue()
+        # channel -> number of the newest submission, older results on that channel are stale
+        self._generations: Dict[str, int] = {}
+        # channel -> future of the newest submission
+        self._futures: Dict[str, Future] = {}
+        self._pending = 0
+        self._polling = False
+        self.suppressed = 0
+
+    @property
+    def busy(self) -> bool:
+        # True while any submitted work has not been delivered or dropped yet
+        return self._pending > 0
+
+    def submit(self, function: Callable, *args: Any, on_done: Callable[[Any], None],
+               on_error: Optional[Callable[[BaseException], None]] = None, channel: str = 'default') -> int:
+        """
+            Run 'function(*args)' on the pool and call 'on_done' with its result on the main loop.
+
+            Parameters:
+            - function (Callable): The blocking call to run.
+            - *args: Arguments passed to 'function'.
+            - on_done (Callable): Called with the result, only if this is still the newest submission on 'channel'.
+            - on_error (Callable, optional): Called with the exception instead if 'function' raised.
+            - channel (str): Submissions on the same channel supersede each other.
+
+            Returns:
+            int: The submission's generation number on its channel.
+            """
+        generation = self._generations.get(channel, 0) + 1
+        self._generations[channel] = generation
+
+        future = self._executor.submit(function, *args)
+        self._futures[channel] = future
+        # Runs on the worker thread, so only touch the thread-safe queue
+        future.add_done_callback(lambda done: self._results.put((channel, generation, done, on_done, on_error)))
+
+        self._pending += 1
+        if self._pending == 1 and self.on_busy_change is not None:
+            self.on_busy_change(True)
+        self._schedule_poll()
+
+        return generation
+
+    def cancel(self, channel: Optional[str] = None) -> None:
+        """
+            Drop the result of the running work on a channel, or on every channel if none is given.
+            """
+        channels = list(self._generations) if channel is None else [channel]
+        for name in channels:
+            # Bumping the generation makes whatever is in flight stale
+            self._generations[name] = self._generations.get(name, 0) + 1
+            future = self._futures.pop(name, None)
+            if future is not None:
+                # Only succeeds if the work has not started yet
+                future.cancel()
+
+    def shutdown(self) -> None:
+        # Stop accepting work, running calls finish in the background
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _schedule_poll(self) -> None:
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval_ms, self._poll)
+
+    def _poll(self) -> None:
+        self._polling = False
+
+        try:
+            while True:
+                try:
+                    channel, generation, future, on_done, on_error = self._results.get_nowait()
+                except Empty:
+                    break
+
+                self._pending -= 1
+                # A newer submission or a cancel made this result stale
+                if future.cancelled() or generation != self._generations.get(channel):
+                    self.suppressed += 1
+                    continue
+
+                self._futures.pop(channel, None)
+                error = future.exception()
+                # A failing callback is logged, it must not stop the results queued behind it
+                try:
+                    if error is None:
+                        on_done(future.result())
+                    elif on_error is not None:
+                        on_error(error)
+                except Exception as e:
+                    log_error(type(e).__name__, str(e))
+        finally:
+            # Keep polling while work is pending, whatever happened above
+            if self._pending > 0:
+                self._schedule_poll()
+            elif self.on_busy_change is not None:
+                self.on_busy_change(False)
@@ -0,0 +1,125 @@
+from tkinter import Button, Entry, Label, Listbox, Scrollbar, StringVar, Toplevel, Misc
+from typing import Any, Dict, List, Optional
+from gui_worker import ConversionWorker
+from logs import flush_logs, log_error
+
+# Conversions listed at once, the index answers any filter without reading the rest
+HISTORY_ROWS = 200
+
+
+def load_history(source_currency: Optional[str], target_currency: Optional[str], since: Optional[str],
+                 totals: bool, import_logs: bool = False) -> List[Dict[str, Any]]:
+    """
+        Query the conversion index, run on the worker thread.
+
+        Parameters:
+        - source_currency (str, optional): Only conversions from this currency.
+        - target_currency (str, optional): Only conversions into this currency.
+        - since (str, optional): First day included, as YYYY-MM-DD.
+        - totals (bool): Per pair and day totals instead of single conversions.
+        - import_logs (bool): First backfill conversions logged before the index existed, see
+          import_logged_conversions().
+
+        Returns:
+        list: Rows from ConversionHistory.search() or ConversionHistory.totals().
+        """
+    # Imported here so the main window never opens the history database
+    from conversion_history import conversion_history, day_start, import_logged_conversions
+
+    # Conversions still queued for the writer thread show up too
+    flush_logs()
+    if import_logs:
+        import_logged_conversions()
+    if totals:
+        return conversion_history.totals(source_currency, target_currency, since_day=since)
+    return conversion_history.search(source_currency, target_currency,
+                                     since=day_start(since) if since else None, limit=HISTORY_ROWS)
+
+
+def format_history_row(row: Dict[str, Any]) -> str:
+    """
+        Format one search or totals row as a single line of the list.
+        """
+    if 'conversions' in row:
+        return (f"{row['day']}  {row['source_currency']}->{row['target_currency']}  "
+                f"{row['conversions']} conversions  {row['amount']:.2f} -> {row['converted_amount']:.2f}")
+    converted_amount = row['converted_amount']
+    converted_text = f'{converted_amount:.5f}' if converted_amount is not None else '-'
+    return f"{row['time']}  {row['amount']} {row['source_currency']} = {converted_text} {row['target_currency']}"
+
+
+class HistoryView:
+    """
+        Window listing past conversions or their per-day totals, filtered by pair and start day.
+
+        Queries run on the worker, so the window stays responsive however large the history is.
+
+        Parameters:
+        - parent (tkinter.Misc): The main window.
+        - worker (ConversionWorker): Worker running the queries off the main loop.
+        - source_currency (str): Initial source currency filter, empty for any.
+        - target_currency (str): Initial target currency filter, empty for any.
+
+        Example:
+        history_button = Button(root, text='History',
+                                command=lambda: HistoryView(root, worker, source_currency_var.get(), ''))
+        """
+
+    def __init__(self, parent: Misc, worker: ConversionWorker, source_currency: str = '',
+                 target_currency: str = '') -> None:
+        self.worker = worker
+        self.window = Toplevel(parent)
+        self.window.title('Conversion History')
+
+        self.source_currency_var = StringVar(master=self.window, value=source_currency)
+        self.target_currency_var = StringVar(master=self.window, value=target_currency)
+        self.since_var = StringVar(master=self.window)
+        self.status_var = StringVar(master=self.window)
+
+        # Filter fields, empty means any
+        for row, (text, variable) in enumerate([('From: ', self.source_currency_var),
+                                                ('To: ', self.target_currency_var),
+                                                ('Since (YYYY-MM-DD): ', self.since_var)]):
+            Label(self.window, text=text).grid(row=row, column=0, padx=5, pady=2, sticky='w')
+            Entry(self.window, textvariable=variable).grid(row=row, column=1, padx=5, pady=2)
+
+        Button(self.window, text='Search', command=lambda: self.refresh(totals=False)).grid(row=3, column=0, pady=5)
+        Button(self.window, text='Totals', command=lambda: self.refresh(totals=True)).grid(row=3, column=1, pady=5)
+
+        self.listbox = Listbox(self.window, width=90, height=20, font='TkFixedFont')
+        scrollbar = Scrollbar(self.window, command=self.listbox.yview)
+        self.listbox.config(yscrollcommand=scrollbar.set)
+        self.listbox.grid(row=4, column=0, columnspan=2, padx=5, sticky='nsew')
+        scrollbar.grid(row=4, column=2, sticky='ns')
+        Label(self.window, textvariable=self.status_var).grid(row=5, column=0, columnspan=2, pady=5)
+
+        self.refresh(totals=False, import_logs=True)
+
+    def refresh(self, totals: bool, import_logs: bool = False) -> None:
+        """
+            Run the query for the current filters on the worker, then show its rows.
+
+            Parameters:
+            - totals (bool): Per pair and day totals instead of single conversions.
+            - import_logs (bool): Backfill the logs first, see import_logged_conversions().
+            """
+        source_currency = self.source_currency_var.get().strip().upper() or None
+        target_currency = self.target_currency_var.get().strip().upper() or None
+        since = self.since_var.get().strip() or None
+
+        self.status_var.set('Loading...')
+        self.worker.submit(load_history, source_currency, target_currency, since, totals, import_logs,
+                           on_done=self.show_rows, on_error=self.show_error, channel='history')
+
+    def show_rows(self, rows: List[Dict[str, Any]]) -> None:
+        if not self.window.winfo_exists():
+            return
+        self.listbox.delete(0, 'end')
+        self.listbox.insert('end', *map(format_history_row, rows))
+        self.status_var.set(f'{len(rows)} rows')
+
+    def show_error(self, error: Exception) -> None:
+        log_error(type(error).__name__, str(error))
+        if self.window.winfo_exists():
+            # A malformed start day is the usual cause
+            self.status_var.set(f'Search failed: {error}')
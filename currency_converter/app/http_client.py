@@ -0,0 +1,304 @@
+import random
+import requests
+from threading import Lock
+from time import monotonic, perf_counter, sleep
+from typing import Any, Callable, Dict, FrozenSet, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from instrumentation import metrics
+
+# Seconds allowed to establish the TCP/TLS connection
+CONNECT_TIMEOUT = 3.05
+# Seconds allowed between bytes of the response
+READ_TIMEOUT = 10.0
+# Retries after the first attempt for connection errors, timeouts and RETRY_STATUSES
+MAX_RETRIES = 3
+# Backoff before retry n is a random value in [0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** n)]
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+# Status codes worth retrying, everything else is returned to the caller as-is
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Keep-alive connections kept per host, and number of hosts pooled
+POOL_MAXSIZE = 10
+POOL_CONNECTIONS = 4
+# Consecutive failures before the circuit opens, and seconds it stays open
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0
+
+
+# Base class of every error a request can raise, re-exported so callers need not import requests
+RequestException = requests.exceptions.RequestException
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+        Raised instead of contacting the provider while its circuit breaker is open.
+        """
+
+
+class _TimedConnectionMixin:
+    # DNS resolution and the TCP handshake both happen in _new_conn(), so they are timed together
+
+    def _new_conn(self):
+        started = perf_counter()
+        sock = super()._new_conn()
+        self._connect_seconds = perf_counter() - started
+        metrics.observe('connect', self._connect_seconds)
+        metrics.increment('connections_opened')
+        return sock
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    """
+        HTTPConnection recording the time to resolve and connect as the 'connect' stage.
+        """
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    """
+        HTTPSConnection recording 'connect' like TimedHTTPConnection, and the TLS handshake as 'tls'.
+        """
+
+    def connect(self) -> None:
+        self._connect_seconds = 0.0
+        started = perf_counter()
+        super().connect()
+        metrics.observe('tls', perf_counter() - started - self._connect_seconds)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+        HTTPAdapter whose pools open Timed*Connection objects, so new connections are measured.
+
+        Reused keep-alive connections record nothing, so 'connections_opened' against the number of
+        requests shows how well connections are being reused.
+        """
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool,
+                                                   'https': TimedHTTPSConnectionPool}
+
+
+class CircuitBreaker:
+    """
+        Fail fast while an upstream keeps failing.
+
+        After 'failure_threshold' consecutive failures the circuit opens and every call is refused
+        for 'reset_timeout' seconds. The first call after that is let through as a trial: success
+        closes the circuit, failure opens it again.
+
+        Parameters:
+        - failure_threshold (int): Consecutive failures that open the circuit.
+        - reset_timeout (float): Seconds the circuit stays open before a trial call is allowed.
+        - clock (Callable[[], float]): Monotonic time source, replaceable in tests.
+        """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT,
+                 clock: Callable[[], float] = monotonic) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = Lock()
+
+    def allow(self) -> bool:
+        # Decide whether a call may go out right now
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                # Let a single trial call through
+                self.state = self.HALF_OPEN
+                return True
+            return self.state == self.CLOSED
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+
+class HttpClient:
+    """
+        Keep-alive HTTP client with pooled connections, timeouts, retry with backoff and a circuit breaker.
+
+        Parameters:
+        - pool_connections (int): Number of hosts whose connection pools are kept.
+        - pool_maxsize (int): Keep-alive connections kept per host.
+        - connect_timeout (float): Seconds allowed to connect.
+        - read_timeout (float): Seconds allowed between bytes of the response.
+        - max_retries (int): Retries after the first attempt.
+        - backoff_base (float): Base of the jittered exponential backoff, in seconds.
+        - backoff_max (float): Upper bound of a single backoff, in seconds.
+        - breaker (CircuitBreaker, optional): Breaker guarding the upstream, a new one by default.
+        - sleep_function (Callable[[float], None]): Used to wait between retries, replaceable in tests.
+
+        Example:
+        client = HttpClient(pool_maxsize=20, read_timeout=5)
+        response = client.get('https://api.freecurrencyapi.com/v1/latest', headers={'apikey': api_key})
+        """
+
+    def __init__(self, pool_connections: int = POOL_CONNECTIONS, pool_maxsize: int = POOL_MAXSIZE,
+                 connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT,
+                 max_retries: int = MAX_RETRIES, backoff_base: float = BACKOFF_BASE,
+                 backoff_max: float = BACKOFF_MAX, breaker: Optional[CircuitBreaker] = None,
+                 sleep_function: Callable[[float], None] = sleep) -> None:
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.sleep_function = sleep_function
+
+        # One session shares keep-alive connections across every request
+        self.session = requests.Session()
+        # Retries are handled here, so the adapter itself must not retry
+        adapter = TimedHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # Counters
+        self._lock = Lock()
+        self.requests_sent = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+            params: Optional[Dict[str, str]] = None,
+            retry_statuses: FrozenSet[int] = RETRY_STATUSES) -> requests.Response:
+        """
+            Send a GET request, retrying connection errors, timeouts and 429/5xx responses.
+
+            Parameters:
+            - url (str): The URL to request.
+            - headers (dict, optional): Request headers.
+            - params (dict, optional): Query string parameters.
+            - retry_statuses (frozenset): Statuses retried, callers rotating API keys leave out 429
+              to get it back at once.
+
+            Returns:
+            requests.Response: The final response, which may still carry an error status.
+
+            Raises:
+            - CircuitOpenError: If the circuit breaker is open.
+            - requests.exceptions.RequestException: If every attempt failed to get a response.
+            """
+        # Fail fast while the upstream is known to be down
+        if not self.breaker.allow():
+            with self._lock:
+                self.rejected += 1
+            raise CircuitOpenError(f'Circuit open for {url}, not sending request')
+
+        for attempt in range(self.max_retries + 1):
+            with self._lock:
+                self.requests_sent += 1
+
+            try:
+                response = self.session.get(url, headers=headers, params=params,
+                                            timeout=(self.connect_timeout, self.read_timeout))
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                # Out of attempts, count the failure against the upstream and give up
+                if attempt == self.max_retries:
+                    self._record_failure()
+                    raise
+                self._backoff(attempt)
+                continue
+            except requests.exceptions.RequestException:
+                # Broken bodies, bad encodings and redirect loops are not worth retrying, but they are
+                # failures: a half-open trial ending here must reopen the circuit, not leave it half-open
+                self._record_failure()
+                raise
+
+            if response.status_code not in retry_statuses:
+                self.breaker.record_success()
+                return response
+
+            # Out of attempts, hand the error response to the caller
+            if attempt == self.max_retries:
+                self._record_failure()
+                return response
+
+            self._backoff(attempt, response.headers.get('Retry-After'))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+            Return the request counters and the circuit breaker state.
+            """
+        with self._lock:
+            return {
+                'requests_sent': self.requests_sent,
+                'retries': self.retries,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'circuit': self.breaker.state,
+            }
+
+    def close(self) -> None:
+        # Release the pooled connections
+        self.session.close()
+
+    def _record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+        self.breaker.record_failure()
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> None:
+        with self._lock:
+            self.retries += 1
+
+        # Honour the server's Retry-After (in seconds) when it sends one
+        try:
+            delay = min(float(retry_after), self.backoff_max)
+        except (TypeError, ValueError):
+            # Full jitter keeps many clients from retrying in lockstep
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+        self.sleep_function(delay)
+
+
+# Client shared by every module talking to the rate provider
+shared_client = HttpClient()
+
+
+def configure_http_client(**kwargs) -> HttpClient:
+    """
+        Replace the shared client with one built from the given HttpClient arguments.
+
+        Example:
+        configure_http_client(pool_maxsize=32, connect_timeout=2, read_timeout=5)
+        """
+    global shared_client
+    shared_client.close()
+    shared_client = HttpClient(**kwargs)
+    return shared_client
+
+
+def get(url: str, headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, str]] = None) -> requests.Response:
+    """
+        Send a GET request through the shared client, see HttpClient.get().
+        """
+    return shared_client.get(url, headers=headers, params=params)
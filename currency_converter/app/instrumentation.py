@@ -0,0 +1,245 @@
+import json
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+# Upper bounds of the latency buckets in seconds, from a cache hit to a slow provider
+LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0)
+# Prefix of every exported metric name
+METRIC_PREFIX = 'anwoo'
+# Quantiles reported in the JSON export
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Histogram:
+    """
+        Count observations into fixed buckets, keeping their number and sum.
+
+        Parameters:
+        - buckets (Sequence[float]): Sorted upper bounds, values above the last one are counted separately.
+        """
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        # One count per bucket plus the overflow bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        # The first bucket whose upper bound is at least 'value'
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+            Estimate a quantile as the upper bound of the bucket it falls in, None without observations.
+            """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class _Stage:
+    # Times one 'with' block and records it in the stage's histogram
+
+    __slots__ = ('metrics', 'name', 'started')
+
+    def __init__(self, metrics: 'Metrics', name: str) -> None:
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self) -> '_Stage':
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.metrics.observe(self.name, perf_counter() - self.started)
+
+
+class _NoStage:
+    # Stand-in for _Stage while metrics are disabled
+
+    def __enter__(self) -> '_NoStage':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+class Metrics:
+    """
+        Per-stage latency histograms and counters for the conversion path, exported as Prometheus text or JSON.
+
+        Stages are timed with perf_counter() and recorded under a lock, about a microsecond per stage,
+        so they stay on in normal use. Components that already keep counters, such as the rate cache,
+        are read through collectors at export time instead of being counted twice.
+
+        Parameters:
+        - buckets (Sequence[float]): Upper bounds of the stage histograms in seconds.
+        - enabled (bool): False turns stage() and increment() into no-ops.
+
+        Example:
+        with metrics.stage('http'):
+            response = client.get(url)
+        metrics.increment('provider_requests', provider='freecurrencyapi', outcome='ok')
+        print(metrics.to_prometheus())
+        """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS, enabled: bool = True) -> None:
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self._lock = Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        # (name, sorted label items) -> count
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        # name -> function returning {key: number}, read at export time
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def stage(self, name: str):
+        """
+            Return a context manager recording the time spent in its block under stage 'name'.
+            """
+        return _Stage(self, name) if self.enabled else _NO_STAGE
+
+    def observe(self, name: str, seconds: float) -> None:
+        """
+            Record one duration for stage 'name'.
+            """
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        """
+            Add 'value' to the counter 'name' with the given labels.
+            """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add_collector(self, name: str, collector: Callable[[], Dict[str, Any]]) -> None:
+        """
+            Export the numeric values of 'collector()' as gauges named '<name>_<key>'.
+
+            Example:
+            metrics.add_collector('rate_cache', lambda: rate_cache.stats())
+            """
+        with self._lock:
+            self._collectors[name] = collector
+
+    def reset(self) -> None:
+        """
+            Forget every recorded stage and counter, collectors are kept.
+            """
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+            Return every stage, counter and collected gauge as plain data.
+
+            Returns:
+            dict: {'stages': {stage: {'count', 'sum_seconds', 'mean_seconds', 'p50_seconds', 'p90_seconds',
+            'p99_seconds'}}, 'counters': {'name{label="value"}': count}, 'gauges': {name: value}}.
+            """
+        with self._lock:
+            stages = {}
+            for name, histogram in sorted(self._histograms.items()):
+                stage = {'count': histogram.count, 'sum_seconds': histogram.sum,
+                         'mean_seconds': histogram.sum / histogram.count}
+                for q in QUANTILES:
+                    stage[f'p{int(q * 100)}_seconds'] = histogram.quantile(q)
+                stages[name] = stage
+            counters = {_series(name, labels): value for (name, labels), value in sorted(self._counters.items())}
+        return {'stages': stages, 'counters': counters, 'gauges': self._collect()}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True, default=str)
+
+    def to_prometheus(self) -> str:
+        """
+            Render every metric in the Prometheus text exposition format.
+            """
+        lines = []
+        stage_name = f'{METRIC_PREFIX}_stage_seconds'
+        with self._lock:
+            if self._histograms:
+                lines.append(f'# HELP {stage_name} Time spent in each stage of the conversion path.')
+                lines.append(f'# TYPE {stage_name} histogram')
+            for name, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{stage_name}_bucket{{stage="{name}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{stage_name}_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{stage_name}_sum{{stage="{name}"}} {histogram.sum!r}')
+                lines.append(f'{stage_name}_count{{stage="{name}"}} {histogram.count}')
+
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                full_name = f'{METRIC_PREFIX}_{name}_total'
+                if full_name not in typed:
+                    typed.add(full_name)
+                    lines.append(f'# TYPE {full_name} counter')
+                lines.append(f'{_series(full_name, labels)} {value:g}')
+
+        for name, value in sorted(self._collect().items()):
+            full_name = f'{METRIC_PREFIX}_{name}'
+            lines.append(f'# TYPE {full_name} gauge')
+            lines.append(f'{full_name} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+    def _collect(self) -> Dict[str, float]:
+        with self._lock:
+            collectors = list(self._collectors.items())
+        gauges = {}
+        for prefix, collector in collectors:
+            for key, value in collector().items():
+                # Booleans and text such as the circuit state are not gauges
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    gauges[f'{prefix}_{key}'] = value
+        return gauges
+
+
+def _series(name: str, labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+# Metrics shared by every module on the conversion path
+metrics = Metrics()
+
+
+def write_metrics(output: str) -> None:
+    """
+        Write the shared metrics to a file, as JSON for '.json' files and Prometheus text otherwise.
+
+        Example:
+        write_metrics('metrics.prom')
+        """
+    text = metrics.to_json() if output.endswith('.json') else metrics.to_prometheus()
+    with open(output, 'w', encoding='utf-8') as metrics_file:
+        metrics_file.write(text)
@@ -0,0 +1,142 @@
+from tkinter import Misc, StringVar
+from typing import Callable, Optional, Tuple
+from conversion import get_cached_exchange_rate, get_exchange_rate
+from gui_worker import ConversionWorker
+from logs import log_error
+
+# Milliseconds of typing pause before a currency change triggers a rate lookup
+LIVE_DEBOUNCE_MS = 400
+
+
+class LiveResult:
+    """
+        Keep the result line up to date as the amount and currency fields change.
+
+        Currency edits are debounced and then resolved once, from memory when the rate is cached
+        or on the worker otherwise; a newer lookup supersedes an older one. Amount edits only
+        multiply against the rate already known for the pair on screen, so they never reach the
+        network. The pair on screen is watched, and rate moves pushed by the watcher refresh the result.
+
+        Parameters:
+        - root (tkinter.Misc): Widget whose after() schedules the debounced lookups.
+        - worker (ConversionWorker): Worker running the rate lookups off the main loop.
+        - api_key_var (StringVar): Variable holding the API key.
+        - source_currency_var (StringVar): Variable holding the source currency.
+        - target_currency_var (StringVar): Variable holding the target currency.
+        - amount_var (StringVar): Variable holding the amount.
+        - result_var (StringVar): Variable the result line is written to.
+        - is_valid_currency (Callable[[str], bool]): Validates a currency code before any lookup.
+        - rate_watcher (RateWatcher, optional): Pushes moves of the pair on screen.
+
+        Example:
+        live_result = LiveResult(root, worker, api_key_var, source_currency_var, target_currency_var, amount_var,
+                                 result_var, is_valid_currency, rate_watcher)
+        """
+
+    def __init__(self, root: Misc, worker: ConversionWorker, api_key_var: StringVar,
+                 source_currency_var: StringVar, target_currency_var: StringVar, amount_var: StringVar,
+                 result_var: StringVar, is_valid_currency: Callable[[str], bool], rate_watcher=None) -> None:
+        self.root = root
+        self.worker = worker
+        self.api_key_var = api_key_var
+        self.source_currency_var = source_currency_var
+        self.target_currency_var = target_currency_var
+        self.amount_var = amount_var
+        self.result_var = result_var
+        self.is_valid_currency = is_valid_currency
+        self.rate_watcher = rate_watcher
+
+        # Rate behind the live result, and the pair it belongs to
+        self.pair: Optional[Tuple[str, str]] = None
+        self.rate: Optional[float] = None
+        self._subscription = None
+        # after() id of the debounced rate lookup
+        self._pending_lookup = None
+
+        # Recompute the result as the fields change
+        self.amount_var.trace_add('write', lambda *args: self.update())
+        self.source_currency_var.trace_add('write', self._schedule_lookup)
+        self.target_currency_var.trace_add('write', self._schedule_lookup)
+
+    def update(self) -> None:
+        """
+            Multiply the amount against the rate already known for the current pair, no lookup needed.
+            """
+        amount = _parse_amount(self.amount_var.get())
+        pair = (self.source_currency_var.get(), self.target_currency_var.get())
+        if amount is None or self.rate is None or self.pair != pair:
+            return
+
+        self.result_var.set(f'{amount} {pair[0]} = {amount * self.rate:.5f} {pair[1]}')
+
+    def look_up(self) -> None:
+        """
+            Resolve the rate of the pair on screen, from memory if possible and on the worker otherwise.
+            """
+        self._pending_lookup = None
+
+        source_currency = self.source_currency_var.get()
+        target_currency = self.target_currency_var.get()
+        # Wait until the pair is complete and valid before touching the network
+        if not self.api_key_var.get() or not self.is_valid_currency(source_currency) \
+                or not self.is_valid_currency(target_currency):
+            return
+
+        # Rates already in memory are applied straight away
+        cached_rate = get_cached_exchange_rate(source_currency, target_currency)
+        if cached_rate is not None:
+            self._store_rate(source_currency, target_currency, cached_rate)
+            return
+
+        # Otherwise fetch on the worker, a newer lookup supersedes this one
+        self.result_var.set('Fetching rate...')
+        self.worker.submit(get_exchange_rate, self.api_key_var.get(), source_currency, target_currency,
+                           on_done=lambda rate: self._store_rate(source_currency, target_currency, rate),
+                           on_error=self._lookup_failed, channel='rate')
+
+    def rate_moved(self, change) -> None:
+        """
+            Apply a move pushed by the rate watcher, on the main loop, if it is the pair on screen.
+            """
+        if (change.source_currency, change.target_currency) == self.pair:
+            self.rate = change.new_rate
+            self.update()
+
+    def _schedule_lookup(self, *args) -> None:
+        # Restart the debounce timer on every keystroke
+        if self._pending_lookup is not None:
+            self.root.after_cancel(self._pending_lookup)
+        self._pending_lookup = self.root.after(LIVE_DEBOUNCE_MS, self.look_up)
+
+    def _store_rate(self, source_currency: str, target_currency: str, rate: Optional[float]) -> None:
+        if rate is None:
+            self._lookup_failed()
+            return
+
+        self.pair, self.rate = (source_currency, target_currency), rate
+        self.update()
+        self._watch(rate)
+
+    def _lookup_failed(self, error: Optional[BaseException] = None) -> None:
+        # Replaces 'Fetching rate...', the worker only delivers the outcome of the latest lookup
+        if error is not None:
+            log_error(type(error).__name__, str(error))
+        self.result_var.set('Failed to fetch exchange rate')
+
+    def _watch(self, rate: float) -> None:
+        # Only the pair on screen is watched, switching pairs drops the old one
+        if self.rate_watcher is None:
+            return
+        if self._subscription is not None:
+            if (self._subscription.source_currency, self._subscription.target_currency) == self.pair:
+                return
+            self.rate_watcher.unsubscribe(self._subscription)
+        self._subscription = self.rate_watcher.subscribe(self.pair[0], self.pair[1], self.rate_moved, rate=rate)
+
+
+def _parse_amount(amount: str) -> Optional[float]:
+    # Silent parse for half-typed input, no error is logged
+    try:
+        return float(amount)
+    except ValueError:
+        return None
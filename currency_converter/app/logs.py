@@ -1,29 +1,304 @@
 from datetime import datetime
 import time
+import json
+import re
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from os import path, makedirs
+from queue import Empty, Full, Queue
+from threading import Lock
+from typing import Any, Dict, Optional
+from instrumentation import metrics
 
 # Define the app directory and log file path
 home_dir = path.expanduser('~')
 app_dir = path.join(home_dir, ".anwoo")
 log_file_path = path.join(app_dir, 'anwoo_log.log')
 
-# Check if directory exists, if not create it
-if not path.exists(log_file_path):
-    makedirs(app_dir)
+# Records waiting for the writer thread, beyond this QUEUE_POLICY applies
+QUEUE_SIZE = 10000
+# 'drop' discards records while the queue is full, 'block' makes the caller wait for room
+QUEUE_POLICY = 'drop'
+# Records written before the file is flushed, and seconds of idle time after which it is flushed anyway
+FLUSH_RECORDS = 256
+FLUSH_INTERVAL = 1.0
 
-    # Check if log file exits, if not, create an empty log file
-    with open(log_file_path, 'w'):
-        pass
 
-# Configure the logging settings
-log_format = '%(asctime)s - %(levelname)s - %(message)s'
-logging.basicConfig(
-    handlers=[RotatingFileHandler(log_file_path, maxBytes=100000, backupCount=5)],
-    level=logging.INFO,
-    format=log_format,
-)
+class JsonLinesFormatter(logging.Formatter):
+    """
+        Format each record as one JSON object per line.
+
+        Structured fields passed as extra={'fields': {...}} are merged into the object, so the log
+        can be parsed without regular expressions.
+        """
+
+    # Reused encoder, json.dumps() builds a new one per call whenever 'default' is passed
+    encoder = json.JSONEncoder(default=str, ensure_ascii=False)
+
+    def __init__(self) -> None:
+        super().__init__()
+        # Timestamp text of the last second formatted, most records share it
+        self._second = None
+        self._second_text = ''
+
+    def format(self, record: logging.LogRecord) -> str:
+        second = int(record.created)
+        if second != self._second:
+            self._second = second
+            self._second_text = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(second))
+
+        entry = {
+            'time': f'{self._second_text}.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        return self.encoder.encode(entry)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+        Hand records to a bounded queue with an explicit policy for when it is full.
+
+        Parameters:
+        - queue (Queue): Bounded queue drained by a QueueListener.
+        - policy (str): 'drop' discards the record and counts it, 'block' waits for room.
+        """
+
+    def __init__(self, queue: Queue, policy: str = QUEUE_POLICY) -> None:
+        if policy not in ('drop', 'block'):
+            raise ValueError(f'Unknown queue policy: {policy}')
+        super().__init__(queue)
+        self.policy = policy
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener runs in this process, so skip the formatting and copying the base class
+        # does for pickling and leave all formatting to the writer thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.policy == 'block':
+            self.queue.put(record)
+            return
+
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+
+
+class BatchingRotatingFileHandler(RotatingFileHandler):
+    """
+        RotatingFileHandler that flushes the file once per batch of records instead of after every record.
+
+        Parameters:
+        - filename (str): The log file.
+        - flush_records (int): Records written between flushes.
+        - **kwargs: Passed on to RotatingFileHandler (maxBytes, backupCount, ...).
+        """
+
+    def __init__(self, filename: str, flush_records: int = FLUSH_RECORDS, **kwargs) -> None:
+        super().__init__(filename, **kwargs)
+        self.flush_records = flush_records
+        self._unflushed = 0
+        # Track the size ourselves instead of seeking and stat-ing the file for every record
+        self._size = path.getsize(filename) if path.exists(filename) else 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            message = self.format(record) + self.terminator
+            if self.maxBytes > 0 and self._size + len(message) >= self.maxBytes:
+                self.doRollover()
+                self._size = 0
+            if self.stream is None:
+                self.stream = self._open()
+
+            self.stream.write(message)
+            self._size += len(message)
+            self._unflushed += 1
+            if self._unflushed >= self.flush_records:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        super().flush()
+        self._unflushed = 0
+
+
+class BatchingQueueListener(QueueListener):
+    """
+        QueueListener that flushes its handlers whenever the queue has been idle for 'flush_interval' seconds.
+        """
+
+    def __init__(self, queue: Queue, *handlers: logging.Handler, flush_interval: float = FLUSH_INTERVAL) -> None:
+        super().__init__(queue, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        # Wait for the next record, flushing the partial batch while nothing arrives
+        while True:
+            try:
+                return self.queue.get(block, self.flush_interval)
+            except Empty:
+                if not block:
+                    raise
+                for handler in self.handlers:
+                    handler.flush()
+
+
+# Conversion lines written before the log was structured, '%(asctime)s - %(levelname)s - %(message)s'
+LEGACY_CONVERSION_LINE = re.compile(r'(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)(?:,(\d{3}))? - (\w+) - '
+                                    r'(\S+) to (\S+), Amount:(.*?) Converted: (.*)')
+
+# Name of the logger every record of the application goes through
+LOGGER_NAME = 'anwoo'
+
+# Dedicated logger, so the host process's root logger configuration neither hides our records
+# nor sends third-party records (urllib3, aiohttp) into the JSON log
+logger = logging.getLogger(LOGGER_NAME)
+
+# Writer thread owns the file, callers only pay for a queue put. Everything is created on the
+# first log call by configure_logging(), so importing this module never touches the disk
+log_queue = None
+queue_handler = None
+file_handler = None
+history_handler = None
+log_listener = None
+# True between configure_logging() starting the writer thread and stop_logging() stopping it
+_listener_running = False
+_configure_lock = Lock()
+
+
+def ensure_app_dir() -> None:
+    """
+        Create the ~/.anwoo directory if it does not exist yet.
+        """
+    makedirs(app_dir, exist_ok=True)
+
+
+def configure_logging() -> None:
+    """
+        Create the log file and start the writer thread, only the first call does anything.
+        """
+    global log_queue, queue_handler, file_handler, history_handler, log_listener, _listener_running
+    if log_listener is not None:
+        return
+
+    with _configure_lock:
+        if log_listener is not None:
+            return
+
+        # Check if directory exists, if not create it
+        ensure_app_dir()
+
+        log_queue = Queue(maxsize=QUEUE_SIZE)
+        queue_handler = BoundedQueueHandler(log_queue, policy=QUEUE_POLICY)
+        file_handler = BatchingRotatingFileHandler(log_file_path, maxBytes=100000, backupCount=5)
+        file_handler.setFormatter(JsonLinesFormatter())
+        # Imported here, conversion_history imports this module for the app directory
+        from conversion_history import ConversionHistoryHandler, conversion_history
+        # Conversions are also indexed in the history database, on the same writer thread
+        history_handler = ConversionHistoryHandler(conversion_history)
+        listener = BatchingQueueListener(log_queue, file_handler, history_handler)
+        listener.start()
+        _listener_running = True
+
+        # Only our own logger feeds the queue, whatever the root logger is configured to do
+        logger.addHandler(queue_handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+        atexit.register(stop_logging)
+        log_listener = listener
+
+
+def flush_logs() -> None:
+    """
+        Block until every queued record has been written to the log file.
+        """
+    if log_listener is None:
+        return
+    log_queue.join()
+    file_handler.flush()
+    history_handler.flush()
+
+
+def stop_logging() -> None:
+    """
+        Write out every queued record and stop the writer thread, registered to run at exit.
+        """
+    global _listener_running
+    if log_listener is None:
+        return
+    with _configure_lock:
+        if _listener_running:
+            log_listener.stop()
+            _listener_running = False
+    file_handler.flush()
+    history_handler.flush()
+
+
+def logging_stats() -> dict:
+    """
+        Return the number of records waiting in the queue and dropped because it was full.
+        """
+    configure_logging()
+    return {'queued': log_queue.qsize(), 'dropped': queue_handler.dropped, 'policy': queue_handler.policy}
+
+
+def parse_log_line(line: str) -> Optional[Dict[str, Any]]:
+    """
+        Read one line of the log, in the JSON lines format or the free-text format used before it.
+
+        Parameters:
+        - line (str): One line of anwoo_log.log or a rotated file.
+
+        Returns:
+        dict or None: The entry with at least 'time', 'level' and 'message', conversions also carry
+        'event', 'source_currency', 'target_currency', 'amount' and 'converted_amount'. None for
+        lines that are neither format.
+
+        Example:
+        parse_log_line('2024-03-01 09:00:00,123 - INFO - USD to EUR, Amount:100.0 Converted: 92.0')
+        {'time': '2024-03-01T09:00:00.123', 'level': 'INFO', 'message': 'USD to EUR, Amount:100.0 Converted: 92.0',
+         'event': 'conversion', 'source_currency': 'USD', 'target_currency': 'EUR', 'amount': 100.0,
+         'converted_amount': 92.0}
+        """
+    if line.startswith('{'):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return None
+        return entry if isinstance(entry, dict) else None
+
+    match = LEGACY_CONVERSION_LINE.match(line.rstrip('\r\n'))
+    if match is None:
+        return None
+    second, milliseconds, level, source_currency, target_currency, amount, converted_amount = match.groups()
+    return {
+        'time': f"{second.replace(' ', 'T')}.{milliseconds or '000'}",
+        'level': level,
+        'message': line[match.start(4):].rstrip('\r\n'),
+        'event': 'conversion',
+        'source_currency': source_currency,
+        'target_currency': target_currency,
+        'amount': _legacy_number(amount),
+        'converted_amount': _legacy_number(converted_amount),
+    }
+
+
+def _legacy_number(text: str) -> Any:
+    # The old format wrote str(value), so 'None' stands for a failed conversion
+    text = text.strip()
+    if text == 'None':
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return text
 
 
 def log_conversion(source_currency, target_currency, amount, converted_amount):
@@ -32,10 +307,23 @@ def log_conversion(source_currency, target_currency, amount, converted_amount):
                           f'Amount:{amount} '
                           f'Converted: {converted_amount}')
 
-    logging.info(conversion_details)
+    # Structured copy of the details for the JSON lines log
+    fields = {
+        'event': 'conversion',
+        'source_currency': source_currency,
+        'target_currency': target_currency,
+        'amount': amount,
+        'converted_amount': converted_amount,
+    }
+    configure_logging()
+    # Caller-side cost only, formatting and writing happen on the writer thread
+    with metrics.stage('log'):
+        logger.info(conversion_details, extra={'fields': fields})
 
 
 def log_error(exception_type, exception_message):
     # Log error details
     error_details = f'Error: {exception_type}, Message: {exception_message}'
-    logging.error(error_details)
+    fields = {'event': 'error', 'exception_type': exception_type}
+    configure_logging()
+    logger.error(error_details, extra={'fields': fields})
@@ -1,8 +1,14 @@
+import atexit
 from argparse import ArgumentParser
-from sys import argv
-from conversion import convert_currency
-from gui import create_gui
+from sys import argv, stderr
+from typing import Optional
+from config import load_api_keys, save_api_keys
+from conversion import (convert_currency, configure_api_keys, configure_rate_providers, configure_rate_store,
+                        get_exchange_rate, get_rate_staleness)
+from currencies import is_valid_currency, refresh_currencies, currencies_cache_is_stale
+from instrumentation import write_metrics
 from logs import log_conversion
+from providers import PROVIDERS
 
 
 def main():
@@ -12,36 +18,283 @@ def main():
         # No command-line arguments
         print("Running in GUI mode...")
 
+        # Imported here so the command-line path never loads tkinter or reportlab
+        from gui import create_gui
+
         # Open GUI
         create_gui()
 
     else:
         # Parse command-line arguments
-        print("Running in command-line mode...")
+        print("Running in command-line mode...", file=stderr)
 
         # Create argument parser object
         parser = ArgumentParser(description="Anwoo's Currency Converter Tool")
 
         # Add command line arguments
         parser.add_argument('--api_key', required=True, help='Your API key for the currency exchange service')
-        parser.add_argument('--source_currency', required=True, help='Source currency code')
-        parser.add_argument('--target_currency', required=True, help='Target currency code')
-        parser.add_argument('--amount', type=float, required=True, help='Amount to convert')
+        parser.add_argument('--source_currency', help='Source currency code')
+        parser.add_argument('--target_currency', help='Target currency code')
+        parser.add_argument('--amount', type=float, help='Amount to convert')
+        parser.add_argument('--batch', metavar='INPUT',
+                            help='CSV or JSONL file of rows to convert (columns: amount, and optionally '
+                                 'source_currency, target_currency), "-" reads CSV from stdin')
+        parser.add_argument('--output', default='-',
+                            help='CSV, JSONL or PDF file for the --batch results, "-" writes CSV to stdout')
+        parser.add_argument('--report', metavar='PDF',
+                            help='Write every logged conversion to a PDF audit report and exit')
+        parser.add_argument('--history', action='store_true',
+                            help='List recent conversions, filtered by --source_currency, --target_currency '
+                                 'and --since, and exit')
+        parser.add_argument('--totals', action='store_true',
+                            help='Show conversion totals per currency pair and day, with the same filters, and exit')
+        parser.add_argument('--since', metavar='YYYY-MM-DD', help='First day included by --history and --totals')
+        parser.add_argument('--limit', type=int, default=100, help='Conversions listed by --history (default: 100)')
+        parser.add_argument('--matrix', metavar='OUTPUT',
+                            help='Write every cross rate among the known currencies to a .csv, .npy or .parquet '
+                                 'file, derived from the --source_currency table (default: USD), and exit')
+        parser.add_argument('--prefetch', action='store_true',
+                            help='Fetch the rates of the most used pairs into the rate store, so the next '
+                                 'conversions start warm')
+        parser.add_argument('--date', metavar='YYYY-MM-DD',
+                            help='Convert at the rate of this past date instead of the latest rate')
+        parser.add_argument('--exact', action='store_true',
+                            help="Convert with decimal arithmetic, rounded to the target currency's minor units")
+        # Same names as decimal_conversion.ROUNDING_MODES, listed here so parsing never loads numpy
+        parser.add_argument('--rounding', default='half_even',
+                            choices=['half_even', 'half_up', 'half_down', 'up', 'down', 'ceiling', 'floor'],
+                            help='Rounding mode of --exact results (default: half_even)')
+        parser.add_argument('--offline', action='store_true',
+                            help='Convert using only the rates stored on disk, without contacting the API')
+        parser.add_argument('--max_staleness', type=float, metavar='SECONDS',
+                            help='Age up to which stored rates are used without contacting the API')
+        parser.add_argument('--provider', action='append', choices=sorted(PROVIDERS),
+                            help='Rate provider to use, repeat in order of preference (default: freecurrencyapi)')
+        parser.add_argument('--provider_key', action='append', default=[], metavar='PROVIDER=KEY',
+                            help='API key for one provider, --api_key is used for providers without one')
+        parser.add_argument('--hedge_delay', type=float, metavar='SECONDS',
+                            help='Seconds before the next provider is asked as well')
+        parser.add_argument('--add_api_key', action='append', default=[], metavar='KEY',
+                            help='Store another API key in the key pool, requests rotate over --api_key and '
+                                 'every stored key')
+        parser.add_argument('--rate_limit', type=float, metavar='REQUESTS_PER_MINUTE',
+                            help='Requests per minute sent with each key until the provider reports its limit')
+        parser.add_argument('--serve', action='store_true',
+                            help='Run as a conversion daemon keeping rates and connections warm')
+        parser.add_argument('--daemon', action='store_true',
+                            help='Convert through a running daemon, falling back to converting in-process')
+        parser.add_argument('--host', default='127.0.0.1', help='Host the daemon listens on')
+        parser.add_argument('--port', type=int, default=8642, help='Port the daemon listens on')
+        parser.add_argument('--socket', metavar='PATH', help='Unix socket of the daemon, used instead of --host/--port')
+        parser.add_argument('--metrics', metavar='FILE',
+                            help='Write per-stage timings and counters on exit, as JSON for .json files and '
+                                 'Prometheus text otherwise')
 
         # Parse command-line arguments
         args = parser.parse_args()
 
-        # Start conversion
-        converted_amount = convert_currency(args.api_key, args.source_currency, args.target_currency, args.amount)
+        # Dump the timings however the run ends
+        if args.metrics:
+            atexit.register(write_metrics, args.metrics)
+
+        # Decide how far stored rates may answer before the network is needed
+        configure_rate_store(max_age=args.max_staleness, offline=args.offline)
+        configure_providers(parser, args)
+
+        # Daemon mode, serve conversions until interrupted
+        if args.serve:
+            # Imported here so ordinary conversions never load the HTTP server
+            from daemon import serve
+
+            serve(args.api_key, args.host, args.port, args.socket)
+            return
+
+        # Report mode, stream the conversion log into a PDF
+        if args.report:
+            # Imported here so conversions never load reportlab
+            from pdf_report import write_conversion_report
+
+            count = write_conversion_report(args.report)
+            print(f'Wrote {count} conversions to {args.report}', file=stderr)
+            return
+
+        # History mode, query the conversion index instead of converting
+        if args.history or args.totals:
+            show_history(parser, args)
+            return
+
+        # Matrix mode, every pair from one rate table
+        if args.matrix:
+            # Imported here so single conversions never load numpy
+            from rate_matrix import build_rate_matrix, export_rate_matrix, quoted_currencies
+
+            matrix = build_rate_matrix(args.api_key, base_currency=args.source_currency or 'USD')
+            if matrix is None:
+                print('Failed to fetch exchange rate')
+                return
+            export_rate_matrix(matrix, args.matrix)
+            print(f'Wrote {len(quoted_currencies(matrix))} x {len(quoted_currencies(matrix))} cross rates '
+                  f'to {args.matrix}', file=stderr)
+            return
+
+        # Prefetch mode, warm the stored tables of the pairs the history says are used most
+        if args.prefetch:
+            # Imported here so single conversions never read the history
+            from prefetch import prefetcher
+
+            fetched = prefetcher.prefetch(args.api_key)
+            stats = prefetcher.stats()
+            print(f"Prefetched {fetched} of {stats['tables']} rate tables for "
+                  f"{', '.join(stats['pairs']) or 'no pairs'}", file=stderr)
+            return
 
-        # Display conversion result
+        # Batch mode, stream the whole file through the converter
+        if args.batch:
+            # Imported here so single conversions never load numpy
+            from batch import convert_file
+
+            summary = convert_file(args.api_key, args.batch, args.output, args.source_currency, args.target_currency,
+                                   exact=args.exact, rounding=args.rounding)
+            # Keep stdout clean for the converted rows
+            print(f"Converted {summary['rows']} rows across {summary['pairs']} currency pairs "
+                  f"({summary['failed_pairs']} failed)", file=stderr)
+            report_staleness()
+            return
+
+        # Single conversion needs every field
+        if args.source_currency is None or args.target_currency is None or args.amount is None:
+            parser.error('--source_currency, --target_currency and --amount are required without --batch')
+
+        # Reject typos before they cost a network round trip
+        for currency in (args.source_currency, args.target_currency):
+            if not is_known_currency(currency, args.api_key, args.offline):
+                parser.error(f'Unknown currency code: {currency}')
+
+        # Start conversion, on the daemon's warm caches when asked to
+        converted_amount = None
+        if args.exact:
+            converted_amount = convert_exactly(parser, args)
+        elif args.date:
+            rate = rate_at_date(parser, args)
+            converted_amount = args.amount * rate if rate is not None else None
+        else:
+            if args.daemon:
+                converted_amount = convert_with_daemon(args)
+            if converted_amount is None:
+                converted_amount = convert_currency(args.api_key, args.source_currency, args.target_currency,
+                                                    args.amount)
+
+        # Display conversion result, exact results print every digit they carry and no more
         if converted_amount is not None:
-            print(f'{args.amount} {args.source_currency:.5f} is = {converted_amount:.5f} {args.target_currency}')
+            result_text = str(converted_amount) if args.exact else f'{converted_amount:.5f}'
+            print(f'{args.amount} {args.source_currency} is = {result_text} {args.target_currency}')
             log_conversion(args.source_currency, args.target_currency, args.amount, converted_amount)
+            report_staleness()
         else:
             print('Failed to fetch exchange rate')
 
 
+def is_known_currency(currency: str, api_key: str, offline: bool) -> bool:
+    # Unknown codes get one chance against a refreshed provider list, at most once a week
+    if is_valid_currency(currency):
+        return True
+    if not offline and currencies_cache_is_stale() and refresh_currencies(api_key):
+        return is_valid_currency(currency)
+    return False
+
+
+def configure_providers(parser: ArgumentParser, args) -> None:
+    # Build the provider pool from --provider and --provider_key
+    provider_keys = {}
+    for entry in args.provider_key:
+        name, separator, key = entry.partition('=')
+        if not separator or name not in PROVIDERS:
+            parser.error(f'--provider_key expects PROVIDER=KEY with a known provider, got {entry}')
+        provider_keys[name] = key
+
+    providers = None
+    if args.provider:
+        providers = [PROVIDERS[name](api_key=provider_keys.get(name)) for name in dict.fromkeys(args.provider)]
+    configure_rate_providers(providers, hedge_delay=args.hedge_delay)
+
+    # Rotate over the stored key pool when there is more than the one key given
+    if args.add_api_key:
+        save_api_keys(load_api_keys() + args.add_api_key)
+    api_keys = list(dict.fromkeys([args.api_key] + load_api_keys()))
+    if len(api_keys) > 1 or args.rate_limit is not None:
+        configure_api_keys(api_keys, rate=args.rate_limit / 60 if args.rate_limit is not None else None)
+
+
+def rate_at_date(parser: ArgumentParser, args) -> Optional[float]:
+    # Imported here so latest-rate conversions never load numpy
+    from rate_history import get_historical_rate
+
+    try:
+        return get_historical_rate(args.api_key, args.source_currency, args.target_currency, args.date)
+    except ValueError:
+        parser.error(f'--date expects YYYY-MM-DD, got {args.date}')
+
+
+def convert_exactly(parser: ArgumentParser, args):
+    # Imported here so float conversions never load numpy
+    from decimal_conversion import convert_exact
+
+    if args.date:
+        rate = rate_at_date(parser, args)
+    else:
+        rate = get_exchange_rate(args.api_key, args.source_currency, args.target_currency)
+    if rate is None:
+        return None
+    return convert_exact(args.amount, rate, args.target_currency, args.rounding)
+
+
+def convert_with_daemon(args) -> Optional[float]:
+    # Imported here so only daemon clients load it
+    from daemon_client import DaemonClient
+
+    client = DaemonClient(args.host, args.port, args.socket)
+    try:
+        return client.convert(args.source_currency, args.target_currency, args.amount)
+    except (OSError, ValueError) as e:
+        # No daemon listening, the caller converts in-process instead
+        print(f'Daemon unavailable ({e}), converting in-process', file=stderr)
+        return None
+    finally:
+        client.close()
+
+
+def show_history(parser: ArgumentParser, args) -> None:
+    # Imported here so conversions never open the history database
+    from conversion_history import conversion_history, day_start, import_logged_conversions
+
+    try:
+        since = day_start(args.since) if args.since else None
+    except ValueError:
+        parser.error(f'Invalid --since date: {args.since}')
+
+    # Conversions logged before the index existed are picked up on first use
+    imported = import_logged_conversions()
+    if imported:
+        print(f'Indexed {imported} conversions from the log', file=stderr)
+
+    if args.totals:
+        for row in conversion_history.totals(args.source_currency, args.target_currency, since_day=args.since):
+            print(f"{row['day']} {row['source_currency']}->{row['target_currency']}: {row['conversions']} "
+                  f"conversions, {row['amount']:.2f} -> {row['converted_amount']:.2f}")
+    else:
+        for row in conversion_history.search(args.source_currency, args.target_currency, since=since,
+                                             limit=args.limit):
+            print(f"{row['time']} {row['amount']} {row['source_currency']} = "
+                  f"{row['converted_amount']} {row['target_currency']}")
+
+
+def report_staleness() -> None:
+    # Tell the user how old the rates are when they did not come straight from the API
+    staleness = get_rate_staleness()
+    if staleness is not None and staleness >= 1:
+        print(f'Rates are {staleness:.0f} seconds old', file=stderr)
+
+
 # Run the script
 if __name__ == '__main__':
     main()
@@ -0,0 +1,135 @@
+import re
+from tkinter import Entry, Frame, Label, StringVar, Misc
+from typing import Callable, Dict, List, Optional, Tuple
+from conversion import get_exchange_rates
+from gui_worker import ConversionWorker
+from logs import log_error
+
+# Milliseconds of typing pause before a source or target change triggers a lookup
+DEBOUNCE_MS = 400
+
+
+class MultiTargetPanel:
+    """
+        Show one amount converted into many target currencies at once.
+
+        All targets are answered from the source currency's rate table, so N targets cost at most one
+        upstream request. Rows are created or removed only when the target list changes; a new amount
+        or new rates just update each row's StringVar, so refreshing never rebuilds widgets.
+
+        Parameters:
+        - parent (tkinter.Misc): The widget the panel is placed in.
+        - worker (ConversionWorker): Worker running the rate lookups off the main loop.
+        - api_key_var (StringVar): Variable holding the API key.
+        - source_currency_var (StringVar): Variable holding the source currency.
+        - amount_var (StringVar): Variable holding the amount.
+        - is_valid_currency (Callable[[str], bool]): Validates a currency code before any lookup.
+
+        Example:
+        panel = MultiTargetPanel(root, worker, api_key_var, source_currency_var, amount_var, is_valid_currency)
+        panel.frame.grid(row=9, column=0, columnspan=2)
+        panel.targets_var.set('EUR, GBP, JPY')
+        """
+
+    def __init__(self, parent: Misc, worker: ConversionWorker, api_key_var: StringVar,
+                 source_currency_var: StringVar, amount_var: StringVar,
+                 is_valid_currency: Callable[[str], bool]) -> None:
+        self.worker = worker
+        self.api_key_var = api_key_var
+        self.source_currency_var = source_currency_var
+        self.amount_var = amount_var
+        self.is_valid_currency = is_valid_currency
+
+        self.frame = Frame(parent)
+        self.targets_var = StringVar(master=parent)
+
+        # Target currency entry field, comma or space separated
+        Label(self.frame, text='Targets: ').grid(row=0, column=0, padx=5, pady=5)
+        self.targets_entry = Entry(self.frame, textvariable=self.targets_var)
+        self.targets_entry.grid(row=0, column=1, padx=5, pady=5)
+
+        # Result rows live in their own frame below the entry
+        self.table = Frame(self.frame)
+        self.table.grid(row=1, column=0, columnspan=2)
+
+        # target currency -> (code label, value label, value variable)
+        self._rows: Dict[str, Tuple[Label, Label, StringVar]] = {}
+        # Source currency and rates the rows were last computed from
+        self._source: Optional[str] = None
+        self._rates: Dict[str, Optional[float]] = {}
+        self._pending_lookup = None
+
+        self.targets_var.trace_add('write', self._schedule_lookup)
+        self.source_currency_var.trace_add('write', self._schedule_lookup)
+        self.amount_var.trace_add('write', lambda *args: self.render())
+
+    def targets(self) -> List[str]:
+        """
+            Return the valid target currencies typed into the panel, in order and without duplicates.
+            """
+        codes = re.split(r'[\s,;]+', self.targets_var.get().strip())
+        return [code for code in dict.fromkeys(codes) if code and self.is_valid_currency(code)]
+
+    def refresh(self) -> None:
+        """
+            Fetch the rates for every target on the worker, then render them.
+            """
+        self._pending_lookup = None
+        source_currency = self.source_currency_var.get()
+        targets = self.targets()
+        self._sync_rows(targets)
+
+        if not self.api_key_var.get() or not self.is_valid_currency(source_currency) or not targets:
+            return
+
+        self.worker.submit(get_exchange_rates, self.api_key_var.get(), source_currency, targets,
+                           on_done=lambda rates: self._store_rates(source_currency, rates),
+                           on_error=lambda error: log_error(type(error).__name__, str(error)),
+                           channel='multi-target')
+
+    def render(self) -> None:
+        """
+            Update every row's value from the current amount and the rates already fetched.
+            """
+        try:
+            amount = float(self.amount_var.get())
+        except ValueError:
+            amount = None
+
+        for target, (code_label, value_label, value_var) in self._rows.items():
+            rate = self._rates.get(target) if self._source == self.source_currency_var.get() else None
+            # Only touch the variable when the text changes, Tk redraws on every set()
+            text = f'{amount * rate:.5f}' if amount is not None and rate is not None else '-'
+            if value_var.get() != text:
+                value_var.set(text)
+
+    def _schedule_lookup(self, *args) -> None:
+        # Restart the debounce timer on every keystroke
+        if self._pending_lookup is not None:
+            self.frame.after_cancel(self._pending_lookup)
+        self._pending_lookup = self.frame.after(DEBOUNCE_MS, self.refresh)
+
+    def _store_rates(self, source_currency: str, rates: Dict[str, Optional[float]]) -> None:
+        self._source = source_currency
+        self._rates = rates
+        self.render()
+
+    def _sync_rows(self, targets: List[str]) -> None:
+        # Remove rows for targets that were taken out
+        for target in [target for target in self._rows if target not in targets]:
+            code_label, value_label, value_var = self._rows.pop(target)
+            code_label.destroy()
+            value_label.destroy()
+
+        # Create rows only for new targets, existing widgets are kept
+        for target in targets:
+            if target not in self._rows:
+                value_var = StringVar(master=self.table, value='-')
+                self._rows[target] = (Label(self.table, text=target),
+                                      Label(self.table, textvariable=value_var), value_var)
+
+        # Re-grid in the typed order, which moves widgets without recreating them
+        for index, target in enumerate(targets):
+            code_label, value_label, value_var = self._rows[target]
+            code_label.grid(row=index, column=0, padx=5, sticky='w')
+            value_label.grid(row=index, column=1, padx=5, sticky='e')
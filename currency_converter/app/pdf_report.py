@@ -0,0 +1,211 @@
+from datetime import datetime
+from os import path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+from logs import log_file_path, parse_log_line
+
+# Page layout in points, A4 landscape leaves room for wide tables
+PAGE_WIDTH = 842.0
+PAGE_HEIGHT = 595.0
+MARGIN = 36.0
+FONT = 'Helvetica'
+BOLD_FONT = 'Helvetica-Bold'
+FONT_SIZE = 9
+TITLE_FONT_SIZE = 14
+ROW_HEIGHT = 13.0
+# Rotated log files written by logs.py, read oldest first
+LOG_BACKUP_COUNT = 5
+
+
+class Column(NamedTuple):
+    key: str
+    header: str
+    width: float
+    # Numbers are right aligned so their digits line up
+    align_right: bool = False
+
+
+# Columns of a conversion audit report, keys match the fields logged by logs.log_conversion()
+CONVERSION_COLUMNS = (
+    Column('time', 'Time', 150),
+    Column('source_currency', 'From', 60),
+    Column('target_currency', 'To', 60),
+    Column('amount', 'Amount', 150, align_right=True),
+    Column('converted_amount', 'Converted', 150, align_right=True),
+)
+
+
+class PdfReportWriter:
+    """
+        Stream rows into a multi-page PDF table in one pass.
+
+        Rows are drawn as they arrive and each full page is handed to reportlab and compressed, so
+        only the current page's text is held uncompressed whatever the number of rows. Each page's
+        cells are written into a single text object, with the header repeated on every page. Nothing
+        is displayed, so reports can be built without a screen.
+
+        Parameters:
+        - output (str or binary file): Where the PDF is written.
+        - title (str): Printed at the top of the first page and stored in the document properties.
+        - columns (Iterable[Column]): The table layout, see CONVERSION_COLUMNS.
+        - subtitle (str, optional): Printed under the title, a creation time stamp by default.
+
+        Example:
+        with PdfReportWriter('audit.pdf', 'Conversions') as report:
+            report.add_rows(read_logged_conversions())
+        print(report.row_count, report.page_count)
+        """
+
+    def __init__(self, output: Union[str, BinaryIO], title: str,
+                 columns: Iterable[Column] = CONVERSION_COLUMNS, subtitle: Optional[str] = None) -> None:
+        # Imported on first use, reportlab is only needed for PDFs
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+        from reportlab.pdfgen import canvas
+
+        self._string_width = stringWidth
+        self.columns = list(columns)
+        self.title = title
+        self.subtitle = subtitle if subtitle is not None else f'Created {datetime.now():%Y-%m-%d %H:%M:%S}'
+        self.row_count = 0
+        self.page_count = 0
+
+        self._pdf = canvas.Canvas(output, pagesize=(PAGE_WIDTH, PAGE_HEIGHT), pageCompression=1)
+        self._pdf.setTitle(title)
+        # Left edge of every column, computed once
+        self._x = []
+        x = MARGIN
+        for column in self.columns:
+            self._x.append(x)
+            x += column.width
+        self._text = None
+        self._y = 0.0
+        self._start_page()
+
+    def add_row(self, row: Dict[str, Any]) -> None:
+        """
+            Draw one row, starting a new page when the current one is full.
+
+            Parameters:
+            - row (dict): Cell values by column key, missing keys are left blank.
+            """
+        if self._y < MARGIN + ROW_HEIGHT:
+            self._finish_page()
+            self._start_page()
+
+        self._draw_cells([_format_cell(row.get(column.key)) for column in self.columns], FONT)
+        self.row_count += 1
+
+    def add_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+            Draw every row of an iterable without holding on to it.
+
+            Returns:
+            int: The number of rows drawn.
+            """
+        count = 0
+        for row in rows:
+            self.add_row(row)
+            count += 1
+        return count
+
+    def close(self) -> None:
+        """
+            Finish the last page and write the document.
+            """
+        if self._pdf is None:
+            return
+        self._finish_page()
+        self._pdf.save()
+        self._pdf = None
+
+    def __enter__(self) -> 'PdfReportWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _start_page(self) -> None:
+        self.page_count += 1
+        self._y = PAGE_HEIGHT - MARGIN
+        if self.page_count == 1:
+            self._pdf.setFont(BOLD_FONT, TITLE_FONT_SIZE)
+            self._pdf.drawString(MARGIN, self._y - TITLE_FONT_SIZE, self.title)
+            self._pdf.setFont(FONT, FONT_SIZE)
+            self._pdf.drawString(MARGIN, self._y - TITLE_FONT_SIZE - 2 * ROW_HEIGHT + FONT_SIZE, self.subtitle)
+            self._y -= TITLE_FONT_SIZE + 3 * ROW_HEIGHT
+
+        # One text object holds every cell of the page, starting in the body font
+        self._pdf.setFont(FONT, FONT_SIZE)
+        self._text = self._pdf.beginText()
+        self._draw_cells([column.header for column in self.columns], BOLD_FONT)
+
+    def _finish_page(self) -> None:
+        self._pdf.drawText(self._text)
+        self._pdf.setFont(FONT, FONT_SIZE)
+        self._pdf.drawRightString(PAGE_WIDTH - MARGIN, MARGIN / 2, f'Page {self.page_count}')
+        self._pdf.showPage()
+
+    def _draw_cells(self, cells: List[str], font: str) -> None:
+        self._y -= ROW_HEIGHT
+        if font != FONT:
+            self._text.setFont(font, FONT_SIZE)
+        for column, x, cell in zip(self.columns, self._x, cells):
+            if column.align_right:
+                x += column.width - self._string_width(cell, font, FONT_SIZE) - 4
+            self._text.setTextOrigin(x, self._y)
+            self._text.textOut(cell)
+        if font != FONT:
+            self._text.setFont(FONT, FONT_SIZE)
+
+
+def _format_cell(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return f'{value:.5f}'
+    return str(value)
+
+
+def read_logged_conversions(log_path: str = log_file_path) -> Iterator[Dict[str, Any]]:
+    """
+        Stream the conversions recorded in the log, oldest first, including rotated files.
+
+        Both the JSON lines format and the free-text lines written before it are read, see
+        logs.parse_log_line(). Lines that are not conversion records, such as errors, are skipped.
+
+        Example:
+        for conversion in read_logged_conversions():
+            print(conversion['source_currency'], conversion['converted_amount'])
+        """
+    log_paths = [f'{log_path}.{index}' for index in range(LOG_BACKUP_COUNT, 0, -1)] + [log_path]
+    for file_path in log_paths:
+        if not path.exists(file_path):
+            continue
+        with open(file_path, encoding='utf-8') as log_file:
+            for line in log_file:
+                entry = parse_log_line(line)
+                if entry is not None and entry.get('event') == 'conversion':
+                    yield entry
+
+
+def write_conversion_report(output: Union[str, BinaryIO], conversions: Optional[Iterable[Dict[str, Any]]] = None,
+                            title: str = 'Currency Conversion Report') -> int:
+    """
+        Write an audit report of conversions as a PDF table.
+
+        Parameters:
+        - output (str or binary file): Where the PDF is written.
+        - conversions (Iterable[dict], optional): Rows with the CONVERSION_COLUMNS keys, every logged
+          conversion by default.
+        - title (str): The report title.
+
+        Returns:
+        int: The number of conversions in the report.
+
+        Example:
+        count = write_conversion_report('audit.pdf')
+        print(f'{count} conversions')
+        """
+    if conversions is None:
+        conversions = read_logged_conversions()
+    with PdfReportWriter(output, title) as report:
+        return report.add_rows(conversions)
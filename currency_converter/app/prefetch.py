@@ -0,0 +1,194 @@
+from datetime import date, timedelta
+from threading import Lock, Thread
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import conversion
+from conversion_history import ConversionHistory, conversion_history, import_logged_conversions
+from instrumentation import metrics
+from logs import configure_logging, log_error, logger
+
+# Days of history mined for the pairs to prefetch
+HISTORY_DAYS = 30
+# Most frequent pairs prefetched at launch
+TOP_PAIRS = 5
+
+
+def predict_pairs(history: Optional[ConversionHistory] = None, days: int = HISTORY_DAYS,
+                  limit: int = TOP_PAIRS, today: Optional[date] = None) -> List[Tuple[str, str]]:
+    """
+        Return the currency pairs converted most often over the last days, most frequent first.
+
+        Reads the per-day totals of the conversion history, one indexed query however long the
+        history is. An empty history is first backfilled from the conversion log.
+
+        Parameters:
+        - history (ConversionHistory, optional): The history mined, the shared one by default.
+        - days (int): Days of history counted, today included.
+        - limit (int): Most pairs returned.
+        - today (date, optional): Last day counted, replaceable in tests.
+
+        Returns:
+        list: (source_currency, target_currency) tuples.
+
+        Example:
+        predict_pairs(limit=3)
+        [('USD', 'EUR'), ('EUR', 'GBP'), ('USD', 'JPY')]
+        """
+    history = history if history is not None else conversion_history
+    if history.earliest() is None:
+        import_logged_conversions(history)
+
+    since_day = ((today or date.today()) - timedelta(days=days - 1)).isoformat()
+    totals = history.totals(since_day=since_day, by_day=False)
+    # Ties go to the pair with the larger converted volume, then alphabetically
+    totals.sort(key=lambda row: (-row['conversions'], -(row['amount'] or 0)))
+    return [(row['source_currency'], row['target_currency']) for row in totals
+            if row['source_currency'] and row['target_currency']][:limit]
+
+
+def plan_tables(pairs: Sequence[Tuple[str, str]], pivot_currency: str) -> List[str]:
+    """
+        Return the base currencies whose tables answer every predicted pair, one table when possible.
+
+        Pairs sharing one source currency are answered directly by that currency's table. Otherwise
+        the pivot currency's table answers all of them, as cross rates derived in memory.
+
+        Example:
+        plan_tables([('USD', 'EUR'), ('EUR', 'JPY')], 'USD')
+        ['USD']
+        """
+    sources = {source_currency for source_currency, target_currency in pairs}
+    if not sources:
+        return []
+    return list(sources) if len(sources) == 1 else [pivot_currency]
+
+
+class Prefetcher:
+    """
+        Warm the rate cache at launch with the tables the user's usual pairs need, and measure how well it guessed.
+
+        The most frequent pairs of recent history are predicted and their tables fetched on a
+        background thread, so the first conversion of a session is answered from memory. Every
+        conversion made afterwards is recorded against the prediction to give the hit rate.
+
+        Parameters:
+        - history (ConversionHistory, optional): The history mined, the shared one by default.
+        - days (int): Days of history counted.
+        - limit (int): Most pairs predicted.
+        - get_table (Callable[[str, str], dict], optional): Fetches one table through the shared cache,
+          conversion.get_rate_table by default.
+
+        Example:
+        prefetcher.start('your_api_key')
+        ...
+        prefetcher.record('USD', 'EUR')
+        print(prefetcher.stats()['hit_rate'])
+        """
+
+    def __init__(self, history: Optional[ConversionHistory] = None, days: int = HISTORY_DAYS,
+                 limit: int = TOP_PAIRS,
+                 get_table: Optional[Callable[[str, str], Optional[Dict[str, float]]]] = None) -> None:
+        self.history = history
+        self.days = days
+        self.limit = limit
+        self.get_table = get_table
+        self.predicted: List[Tuple[str, str]] = []
+        self.tables: List[str] = []
+        self._lock = Lock()
+        self._thread: Optional[Thread] = None
+
+        # Counters
+        self.fetched = 0
+        self.prefetch_seconds = 0.0
+        self.conversions = 0
+        self.hits = 0
+        # Conversions recorded before the prefetch had finished
+        self.early = 0
+
+    def prefetch(self, api_key: str) -> int:
+        """
+            Predict the pairs and fetch the tables that answer them, blocking.
+
+            Returns:
+            int: The number of tables fetched, failures are logged and skipped.
+            """
+        started = perf_counter()
+        with metrics.stage('prefetch'):
+            try:
+                predicted = predict_pairs(self.history, self.days, self.limit)
+            except Exception as e:
+                # A broken history must not stop the application from starting
+                log_error(type(e).__name__, str(e))
+                predicted = []
+            tables = plan_tables(predicted, conversion.rate_table.pivot_currency)
+            with self._lock:
+                self.predicted = predicted
+                self.tables = tables
+
+            get_table = self.get_table or conversion.get_rate_table
+            fetched = 0
+            for base_currency in tables:
+                try:
+                    if get_table(api_key, base_currency) is not None:
+                        fetched += 1
+                except Exception as e:
+                    log_error(type(e).__name__, str(e))
+
+        with self._lock:
+            self.fetched += fetched
+            self.prefetch_seconds = perf_counter() - started
+        return fetched
+
+    def start(self, api_key: str) -> Thread:
+        """
+            Run prefetch() on a daemon thread and return it, the caller never waits.
+            """
+        self._thread = Thread(target=self.prefetch, args=(api_key,), name='rate-prefetch', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def record(self, source_currency: str, target_currency: str) -> bool:
+        """
+            Count one conversion against the prediction.
+
+            Returns:
+            bool: True if the pair was predicted.
+            """
+        with self._lock:
+            is_hit = (source_currency, target_currency) in self.predicted
+            self.conversions += 1
+            self.hits += is_hit
+            if self._thread is not None and self._thread.is_alive():
+                self.early += 1
+        return is_hit
+
+    def stats(self) -> Dict[str, Any]:
+        """
+            Return the prediction, what was fetched and the hit rate so far.
+            """
+        with self._lock:
+            return {'predicted_pairs': len(self.predicted), 'tables': len(self.tables),
+                    'tables_fetched': self.fetched, 'prefetch_seconds': self.prefetch_seconds,
+                    'conversions': self.conversions, 'hits': self.hits,
+                    'hit_rate': self.hits / self.conversions if self.conversions else 0.0,
+                    'early_conversions': self.early,
+                    'pairs': [f'{source_currency}->{target_currency}'
+                              for source_currency, target_currency in self.predicted]}
+
+    def log_stats(self) -> None:
+        """
+            Write the hit rate to the log, once a session that made conversions ends.
+            """
+        stats = self.stats()
+        if not stats['conversions']:
+            return
+        configure_logging()
+        logger.info(f"Prefetch hit rate {stats['hit_rate']:.0%} over {stats['conversions']} conversions",
+                     extra={'fields': {'event': 'prefetch', **stats}})
+
+
+# Shared prefetcher started by the GUI and the daemon
+prefetcher = Prefetcher()
+
+# Exported next to the cache counters, so the hit rate shows up in --metrics and /metrics
+metrics.add_collector('prefetch', lambda: prefetcher.stats())
@@ -0,0 +1,457 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from threading import Lock
+from time import monotonic, perf_counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from instrumentation import metrics
+from logs import log_error
+from quota import ApiKeyPool
+
+# Seconds the preferred provider may take before a second one is asked as well, None disables hedging
+HEDGE_DELAY = 0.5
+# Weight of the newest sample in the moving averages of latency and errors
+EWMA_ALPHA = 0.2
+# Seconds of latency one failed request is scored like, so an erroring provider sinks in the ranking
+ERROR_PENALTY = 5.0
+# Seconds a table is reused without asking again when the provider sends neither ETag nor Last-Modified
+# nor Cache-Control, short enough for the rate watcher's polls to still see every move
+FALLBACK_TTL = 30.0
+# Compressed encodings asked for, urllib3 decodes them transparently
+ACCEPT_ENCODING = 'gzip, deflate'
+
+
+class StoredResponse:
+    """
+        The last full table a provider sent for one request, with what is needed to revalidate it.
+        """
+
+    __slots__ = ('table', 'etag', 'last_modified', 'fresh_until', 'body_bytes')
+
+    def __init__(self, table: Dict[str, float], etag: Optional[str], last_modified: Optional[str],
+                 fresh_until: float, body_bytes: int) -> None:
+        self.table = table
+        self.etag = etag
+        self.last_modified = last_modified
+        # Monotonic time until which the table is reused without any request
+        self.fresh_until = fresh_until
+        self.body_bytes = body_bytes
+
+
+class RateProvider:
+    """
+        Adapter for one exchange rate API, turning a base currency into a {currency: rate} table.
+
+        Subclasses set 'name', 'url' and 'historical_url' and implement build_params() and parse().
+        Each provider gets its own HttpClient, so one provider's open circuit breaker never blocks failing over to another.
+
+        Requests are conditional: the ETag and Last-Modified of the last table are sent back, and a
+        304 reuses the stored table without downloading or parsing it again. Providers that send no
+        validators have their table reused for Cache-Control's max-age, or FALLBACK_TTL seconds.
+        Responses are asked for compressed, and the bytes on the wire, decoded bytes and bytes
+        saved are counted per provider.
+
+        Parameters:
+        - api_key (str, optional): Key for this provider, the caller's key is used when not given.
+        - client (HttpClient, optional): Client used for requests, a new one is created on first use.
+        - key_pool (ApiKeyPool, optional): Keys to rotate through with client-side pacing, used instead
+          of the caller's key when this provider has no key of its own.
+        """
+
+    name = 'provider'
+    url = ''
+    historical_url = ''
+
+    def __init__(self, api_key: Optional[str] = None, client: Optional[Any] = None,
+                 key_pool: Optional[ApiKeyPool] = None) -> None:
+        self.api_key = api_key
+        self.client = client
+        self.key_pool = key_pool
+        # (base currency, date) -> last full table, for conditional requests
+        self._responses: Dict[Tuple[str, Optional[str]], StoredResponse] = {}
+        self._lock = Lock()
+
+        # Transfer counters
+        self.full_responses = 0
+        self.not_modified = 0
+        self.fresh = 0
+        self.wire_bytes = 0
+        self.body_bytes = 0
+        self.saved_bytes = 0
+        self.parse_seconds = 0.0
+
+    def fetch_table(self, api_key: str, base_currency: str,
+                    date: Optional[str] = None) -> Optional[Dict[str, float]]:
+        """
+            Fetch every rate for 'base_currency', the latest ones or those of a past 'date' (YYYY-MM-DD).
+
+            Returns:
+            dict or None: {currency: rate}, None if the request failed.
+            """
+        # Imported on first fetch, so conversions answered from memory or disk never load requests
+        import http_client
+        if self.client is None:
+            self.client = http_client.HttpClient()
+
+        # A table still fresh by the provider's own terms costs no request at all
+        request_key = (base_currency, date)
+        with self._lock:
+            stored = self._responses.get(request_key)
+            if stored is not None and monotonic() < stored.fresh_until:
+                self.fresh += 1
+                self.saved_bytes += stored.body_bytes
+                metrics.increment('provider_requests', provider=self.name, outcome='fresh')
+                return dict(stored.table)
+
+        pool = self.key_pool if self.api_key is None else None
+        # A throttled key is rested and the request moves on to the next one
+        attempts = len(pool.keys) if pool is not None else 1
+        for attempt in range(attempts):
+            if pool is not None:
+                key = pool.acquire()
+                if key is None:
+                    metrics.increment('provider_requests', provider=self.name, outcome='no_key')
+                    log_error('QuotaExhausted', f'{self.name}: no API key has quota left')
+                    return None
+            else:
+                key = self.api_key if self.api_key is not None else api_key
+
+            request = {'headers': {**self.build_headers(key), **_conditional_headers(stored)},
+                       'params': self.build_params(key, base_currency, date)}
+            if pool is not None:
+                # A 429 comes straight back so the pool rests that key and the next one is used,
+                # instead of the client retrying the throttled key
+                request['retry_statuses'] = http_client.RETRY_STATUSES - {429}
+            try:
+                # Request and body download, connection set-up is timed on its own by http_client
+                with metrics.stage('http'):
+                    response = self.client.get(self.build_url(date), **request)
+            except http_client.RequestException as e:
+                metrics.increment('provider_requests', provider=self.name, outcome='error')
+                log_error(type(e).__name__, f'{self.name}: {e}')
+                return None
+
+            if pool is not None:
+                pool.record(key, response.status_code, response.headers)
+            if response.status_code != 429 or attempt == attempts - 1:
+                break
+
+        wire_bytes, body_bytes = _transfer_size(response)
+        metrics.increment('provider_bytes', wire_bytes, provider=self.name, kind='wire')
+        metrics.increment('provider_bytes', body_bytes, provider=self.name, kind='body')
+
+        if response.status_code == 304 and stored is not None:
+            # Unchanged upstream, the stored table is served without parsing anything
+            with self._lock:
+                stored.fresh_until = monotonic() + _freshness(response.headers, stored.etag, stored.last_modified)
+                self.not_modified += 1
+                self.wire_bytes += wire_bytes
+                self.saved_bytes += max(0, stored.body_bytes - wire_bytes)
+            metrics.increment('provider_requests', provider=self.name, outcome='not_modified')
+            return dict(stored.table)
+
+        if response.status_code != 200:
+            metrics.increment('provider_requests', provider=self.name, outcome=str(response.status_code))
+            log_error('HTTPError', f'{self.name}: {response.status_code}, {response.text}')
+            return None
+
+        started = perf_counter()
+        try:
+            with metrics.stage('parse'):
+                table = self.parse(response.json(), base_currency, date)
+        except (ValueError, KeyError, TypeError, ZeroDivisionError) as e:
+            # A changed response shape is a provider failure, not a crash
+            metrics.increment('provider_requests', provider=self.name, outcome='bad_response')
+            log_error(type(e).__name__, f'{self.name}: unexpected response, {e}')
+            return None
+        parse_seconds = perf_counter() - started
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        with self._lock:
+            self._responses[request_key] = StoredResponse(
+                table, etag, last_modified, monotonic() + _freshness(response.headers, etag, last_modified),
+                body_bytes)
+            self.full_responses += 1
+            self.wire_bytes += wire_bytes
+            self.body_bytes += body_bytes
+            # Compression savings
+            self.saved_bytes += max(0, body_bytes - wire_bytes)
+            self.parse_seconds += parse_seconds
+        metrics.increment('provider_requests', provider=self.name, outcome='ok')
+        return dict(table)
+
+    def forget_responses(self) -> None:
+        """
+            Drop the stored tables, so the next request for each is unconditional.
+            """
+        with self._lock:
+            self._responses.clear()
+
+    def build_url(self, date: Optional[str]) -> str:
+        return self.url if date is None else self.historical_url
+
+    def build_headers(self, api_key: str) -> Dict[str, str]:
+        return {}
+
+    def build_params(self, api_key: str, base_currency: str, date: Optional[str]) -> Dict[str, str]:
+        raise NotImplementedError
+
+    def parse(self, payload: dict, base_currency: str, date: Optional[str]) -> Dict[str, float]:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.client.stats() if self.client is not None else {}
+        with self._lock:
+            refreshes = self.full_responses + self.not_modified
+            stats = {**stats, 'transfer': {
+                'full_responses': self.full_responses, 'not_modified': self.not_modified, 'fresh': self.fresh,
+                'wire_bytes': self.wire_bytes, 'body_bytes': self.body_bytes, 'saved_bytes': self.saved_bytes,
+                'wire_bytes_per_refresh': self.wire_bytes / refreshes if refreshes else 0.0,
+                'parse_seconds_per_refresh': self.parse_seconds / refreshes if refreshes else 0.0,
+            }}
+        if self.key_pool is not None:
+            stats = {**stats, 'api_keys': self.key_pool.stats()}
+        return stats
+
+
+class FreeCurrencyApiProvider(RateProvider):
+    """
+        freecurrencyapi.com, quotes any base currency directly.
+        """
+
+    name = 'freecurrencyapi'
+    url = 'https://api.freecurrencyapi.com/v1/latest'
+    historical_url = 'https://api.freecurrencyapi.com/v1/historical'
+
+    def build_headers(self, api_key: str) -> Dict[str, str]:
+        return {'apikey': api_key}
+
+    def build_params(self, api_key: str, base_currency: str, date: Optional[str]) -> Dict[str, str]:
+        # Leave out 'symbols' so the response carries the whole table
+        params = {'base_currency': base_currency}
+        if date is not None:
+            params['date'] = date
+        return params
+
+    def parse(self, payload: dict, base_currency: str, date: Optional[str]) -> Dict[str, float]:
+        # Historical responses nest the table under its date
+        return payload['data'] if date is None else payload['data'][date]
+
+
+class OpenExchangeRatesProvider(RateProvider):
+    """
+        openexchangerates.org. Free plans only quote USD, so other bases are derived from the USD table.
+        """
+
+    name = 'openexchangerates'
+    url = 'https://openexchangerates.org/api/latest.json'
+    historical_url = 'https://openexchangerates.org/api/historical/{date}.json'
+    quote_currency = 'USD'
+
+    def build_url(self, date: Optional[str]) -> str:
+        return self.url if date is None else self.historical_url.format(date=date)
+
+    def build_params(self, api_key: str, base_currency: str, date: Optional[str]) -> Dict[str, str]:
+        return {'app_id': api_key, 'base': self.quote_currency}
+
+    def parse(self, payload: dict, base_currency: str, date: Optional[str]) -> Dict[str, float]:
+        rates = payload['rates']
+        if base_currency == self.quote_currency:
+            return rates
+        # Rebase: one unit of base_currency buys rates[c] / rates[base_currency] of currency c
+        base_rate = rates[base_currency]
+        return {currency: rate / base_rate for currency, rate in rates.items()}
+
+
+def _conditional_headers(stored: Optional[StoredResponse]) -> Dict[str, str]:
+    # Compression always, validators when a table was stored
+    headers = {'Accept-Encoding': ACCEPT_ENCODING}
+    if stored is not None:
+        if stored.etag:
+            headers['If-None-Match'] = stored.etag
+        if stored.last_modified:
+            headers['If-Modified-Since'] = stored.last_modified
+    return headers
+
+
+def _freshness(headers: Any, etag: Optional[str], last_modified: Optional[str]) -> float:
+    # Seconds a response may be reused without a request: the provider's max-age if it sends one,
+    # none when it can be revalidated cheaply, FALLBACK_TTL when it can not
+    cache_control = (headers.get('Cache-Control') or '').lower()
+    if 'no-cache' in cache_control or 'no-store' in cache_control:
+        return 0.0
+    for directive in cache_control.split(','):
+        name, _, value = directive.strip().partition('=')
+        if name == 'max-age':
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                break
+    return 0.0 if etag or last_modified else FALLBACK_TTL
+
+
+def _transfer_size(response: Any) -> Tuple[int, int]:
+    # Bytes read off the connection, compressed when the provider compressed, and bytes after decoding
+    content = getattr(response, 'content', None)
+    body_bytes = len(content) if isinstance(content, bytes) else len(response.text.encode())
+    raw = getattr(response, 'raw', None)
+    wire_bytes = raw.tell() if hasattr(raw, 'tell') else body_bytes
+    return wire_bytes, body_bytes
+
+
+# Adapters selectable by name from the command line
+PROVIDERS = {
+    FreeCurrencyApiProvider.name: FreeCurrencyApiProvider,
+    OpenExchangeRatesProvider.name: OpenExchangeRatesProvider,
+}
+
+
+class ProviderStats:
+    """
+        Moving averages of one provider's latency and error rate.
+        """
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.wins = 0
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+
+    def record(self, seconds: float, ok: bool) -> None:
+        self.requests += 1
+        if not ok:
+            self.errors += 1
+        self.error_rate += EWMA_ALPHA * ((0.0 if ok else 1.0) - self.error_rate)
+        # Failed requests often return early, only successful ones say how fast the provider is
+        if ok:
+            self.latency = seconds if self.latency is None else self.latency + EWMA_ALPHA * (seconds - self.latency)
+
+    def score(self) -> tuple:
+        # Lower is better, providers that never answered rank after every measured one
+        return self.latency is None, (self.latency or 0.0) + self.error_rate * ERROR_PENALTY
+
+
+class ProviderPool:
+    """
+        Fetch rate tables from the fastest healthy provider, hedging slow requests and failing over on errors.
+
+        Providers are ranked by their moving average latency plus a penalty for their recent error
+        rate. The best one is asked first. If it has not answered after 'hedge_delay' seconds the next
+        one is asked as well and the first good answer wins. If it fails, the next one is asked at once.
+
+        Parameters:
+        - providers (Sequence[RateProvider]): The providers, in order of preference until measured.
+        - hedge_delay (float, optional): Seconds before a hedged request is sent, None only fails over.
+        - clock (Callable[[], float]): Time source, replaceable in tests.
+
+        Example:
+        pool = ProviderPool([FreeCurrencyApiProvider(), OpenExchangeRatesProvider(api_key='app_id')])
+        table = pool.fetch_table('your_api_key', 'EUR')
+        print(pool.stats())
+        """
+
+    def __init__(self, providers: Sequence[RateProvider], hedge_delay: Optional[float] = HEDGE_DELAY,
+                 clock=monotonic) -> None:
+        if not providers:
+            raise ValueError('At least one rate provider is required')
+        self.providers: List[RateProvider] = list(providers)
+        self.hedge_delay = hedge_delay
+        self.clock = clock
+
+        self._lock = Lock()
+        self._stats = {id(provider): ProviderStats() for provider in self.providers}
+        # Losing hedged requests keep running here and still update the statistics
+        self._executor = ThreadPoolExecutor(max_workers=max(8, 4 * len(self.providers)),
+                                            thread_name_prefix='rate-provider')
+        self.hedged = 0
+        self.failovers = 0
+
+    def ranked(self) -> List[RateProvider]:
+        """
+            Return the providers best first, ties keep their configured order.
+            """
+        with self._lock:
+            return sorted(self.providers, key=lambda provider: self._stats[id(provider)].score())
+
+    def fetch_table(self, api_key: str, base_currency: str,
+                    date: Optional[str] = None) -> Optional[Dict[str, float]]:
+        """
+            Fetch every rate for 'base_currency' from whichever provider answers first.
+
+            Parameters:
+            - api_key (str): The API key for providers configured without a key of their own.
+            - base_currency (str): The currency all returned rates are quoted against.
+            - date (str, optional): A past date (YYYY-MM-DD) to fetch instead of the latest rates.
+
+            Returns:
+            dict or None: {currency: rate}, None if every provider failed.
+            """
+        waiting = self.ranked()
+        first = waiting.pop(0)
+        pending = {self._submit(first, api_key, base_currency, date): first}
+
+        while pending:
+            timeout = self.hedge_delay if waiting else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                provider = pending.pop(future)
+                table = future.result()
+                if table is not None:
+                    with self._lock:
+                        self._stats[id(provider)].wins += 1
+                    return table
+
+            if not waiting:
+                continue
+
+            # A request in flight failed, or the one in flight is past the hedge delay
+            with self._lock:
+                if done:
+                    self.failovers += 1
+                else:
+                    self.hedged += 1
+            provider = waiting.pop(0)
+            pending[self._submit(provider, api_key, base_currency, date)] = provider
+
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+            Return the pool counters and each provider's request, error and latency figures.
+            """
+        with self._lock:
+            return {
+                'hedged': self.hedged,
+                'failovers': self.failovers,
+                'providers': {
+                    provider.name: {
+                        'requests': stats.requests,
+                        'errors': stats.errors,
+                        'wins': stats.wins,
+                        'avg_latency_seconds': stats.latency,
+                        'error_rate': stats.error_rate,
+                        'http': provider.stats(),
+                    } for provider in self.providers for stats in (self._stats[id(provider)],)
+                },
+            }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def _submit(self, provider: RateProvider, api_key: str, base_currency: str, date: Optional[str]) -> Future:
+        return self._executor.submit(self._timed_fetch, provider, api_key, base_currency, date)
+
+    def _timed_fetch(self, provider: RateProvider, api_key: str, base_currency: str,
+                     date: Optional[str]) -> Optional[Dict[str, float]]:
+        started = self.clock()
+        try:
+            table = provider.fetch_table(api_key, base_currency, date)
+        except Exception as e:
+            # A broken adapter counts as a failed provider instead of failing the lookup
+            log_error(type(e).__name__, f'{provider.name}: {e}')
+            table = None
+
+        with self._lock:
+            self._stats[id(provider)].record(self.clock() - started, table is not None)
+        return table
@@ -0,0 +1,280 @@
+from threading import Lock
+from time import monotonic, sleep, time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+from instrumentation import metrics
+
+# Burst of requests a key may send at once before pacing starts
+BURST = 5
+# Seconds a key rests after a 429 that came without Retry-After
+THROTTLE_COOLDOWN = 60.0
+# Seconds a key with an exhausted quota rests before one trial request, when no reset time is sent
+EXHAUSTED_COOLDOWN = 3600.0
+# Seconds acquire() may wait for a key to become usable before giving up
+MAX_WAIT = 30.0
+
+
+class TokenBucket:
+    """
+        Client-side rate limiter: 'rate' tokens per second, holding at most 'capacity'.
+
+        Parameters:
+        - rate (float, optional): Tokens added per second, None for no limit.
+        - capacity (float): Largest burst allowed after a quiet period.
+        - clock (Callable[[], float]): Monotonic time source, replaceable in tests.
+
+        Example:
+        bucket = TokenBucket(rate=10 / 60, capacity=5)
+        if bucket.take():
+            send_request()
+        """
+
+    def __init__(self, rate: Optional[float] = None, capacity: float = BURST,
+                 clock: Callable[[], float] = monotonic) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def take(self) -> bool:
+        """
+            Take one token if one is available, never waits.
+            """
+        if self.rate is None:
+            return True
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        """
+            Return the seconds until a token is available, 0 if one is available now.
+            """
+        if self.rate is None:
+            return 0.0
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate) if self.rate > 0 else float('inf')
+
+    def set_rate(self, rate: Optional[float], capacity: Optional[float] = None) -> None:
+        self._refill()
+        self.rate = rate
+        if capacity is not None:
+            self.capacity = capacity
+            self.tokens = min(self.tokens, capacity)
+
+    def _refill(self) -> None:
+        now = self.clock()
+        if self.rate is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class KeyState:
+    """
+        Quota, limiter and counters of one API key in an ApiKeyPool.
+        """
+
+    def __init__(self, key: str, bucket: TokenBucket) -> None:
+        self.key = key
+        self.bucket = bucket
+        # Requests left in the provider's long-term quota (month or day), None until a response says
+        self.remaining: Optional[int] = None
+        self.limit: Optional[int] = None
+        # Monotonic time before which the key must not be used, after a 429 or an exhausted quota
+        self.resting_until = 0.0
+
+        # Counters
+        self.requests = 0
+        self.throttled = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def is_usable(self, now: float) -> bool:
+        return now >= self.resting_until
+
+    def name(self) -> str:
+        # Never expose a whole key in stats or logs
+        return f'{self.key[:4]}...{self.key[-2:]}' if len(self.key) > 8 else '***'
+
+
+class ApiKeyPool:
+    """
+        Spread requests over several API keys, pacing each with a token bucket and following its quota.
+
+        Each request takes the usable key with the most remaining quota that has a token available;
+        when none has a token, the caller waits for the first one that will. The quota and rate
+        limit each provider reports in its response headers update the key's state, so a 429 or an
+        exhausted quota rests the key instead of sending it more requests.
+
+        Parameters:
+        - keys (Sequence[str]): The API keys, duplicates are ignored.
+        - rate (float, optional): Requests per second allowed per key until the provider reports its limit.
+        - burst (float): Requests a key may send at once.
+        - max_wait (float): Seconds acquire() waits for a usable key before returning None.
+        - clock (Callable[[], float]): Monotonic time source, replaceable in tests.
+        - sleep_function (Callable[[float], None]): Used to wait, replaceable in tests.
+
+        Example:
+        pool = ApiKeyPool(['key_one', 'key_two'], rate=10 / 60)
+        key = pool.acquire()
+        response = client.get(url, headers={'apikey': key})
+        pool.record(key, response.status_code, response.headers)
+        """
+
+    def __init__(self, keys: Sequence[str], rate: Optional[float] = None, burst: float = BURST,
+                 max_wait: float = MAX_WAIT, clock: Callable[[], float] = monotonic,
+                 sleep_function: Callable[[float], None] = sleep) -> None:
+        if not keys:
+            raise ValueError('An API key pool needs at least one key')
+        self.burst = burst
+        self.max_wait = max_wait
+        self.clock = clock
+        self.sleep_function = sleep_function
+        self._states: Dict[str, KeyState] = {key: KeyState(key, TokenBucket(rate, burst, clock))
+                                             for key in dict.fromkeys(keys)}
+        self._lock = Lock()
+
+    @property
+    def keys(self) -> List[str]:
+        return list(self._states)
+
+    def acquire(self) -> Optional[str]:
+        """
+            Return the key to send the next request with, waiting for pacing or quota if needed.
+
+            Returns:
+            str or None: The key, None if no key becomes usable within max_wait seconds.
+            """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                usable = [state for state in self._states.values() if state.is_usable(now)]
+                # Most remaining quota first, keys that have not reported theirs yet count as full
+                usable.sort(key=lambda state: -state.remaining if state.remaining is not None else -float('inf'))
+                for state in usable:
+                    if state.bucket.take():
+                        state.requests += 1
+                        if waited:
+                            state.waits += 1
+                            state.wait_seconds += waited
+                        return state.key
+
+                # Nothing can go out now, wait for the first key that can
+                waits = [state.bucket.wait_time() for state in usable]
+                waits += [state.resting_until - now for state in self._states.values() if state.resting_until > now]
+            delay = min(waits, default=float('inf'))
+            if waited + delay > self.max_wait:
+                return None
+            self.sleep_function(delay)
+            waited += delay
+
+    def record(self, key: str, status_code: int, headers: Mapping[str, str]) -> None:
+        """
+            Update a key's quota and pacing from a provider response.
+
+            Parameters:
+            - key (str): The key the request was sent with.
+            - status_code (int): The response status.
+            - headers (Mapping[str, str]): The response headers, read case-insensitively.
+            """
+        quota = parse_rate_limit_headers(headers)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return
+            now = self.clock()
+
+            if quota['remaining'] is not None:
+                state.remaining = quota['remaining']
+            if quota['limit'] is not None:
+                state.limit = quota['limit']
+            if quota['per_second'] is not None and quota['per_second'] != state.bucket.rate:
+                # Pace at the limit the provider reports, bursting no further than it allows
+                state.bucket.set_rate(quota['per_second'], min(self.burst, quota['window_limit']))
+            if quota['window_remaining'] == 0:
+                state.resting_until = max(state.resting_until, now + (quota['reset'] or quota['window']))
+            if quota['remaining'] == 0:
+                # Tried again once the quota renews, or after a long rest if the provider does not say when
+                state.resting_until = max(state.resting_until, now + (quota['reset'] or EXHAUSTED_COOLDOWN))
+
+            if status_code == 429:
+                state.throttled += 1
+                cooldown = quota['retry_after'] if quota['retry_after'] is not None else THROTTLE_COOLDOWN
+                state.resting_until = max(state.resting_until, now + cooldown)
+            elif status_code in (401, 403) and quota['remaining'] is None:
+                # Revoked or unpaid key, rest it like an exhausted quota
+                state.resting_until = now + THROTTLE_COOLDOWN
+        metrics.increment('api_key_responses', key=state.name(), status=str(status_code))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+            Return every key's counters and quota, keyed by a masked form of the key.
+            """
+        with self._lock:
+            now = self.clock()
+            return {state.name(): {'requests': state.requests, 'throttled': state.throttled,
+                                   'waits': state.waits, 'wait_seconds': state.wait_seconds,
+                                   'remaining': state.remaining, 'limit': state.limit,
+                                   'requests_per_second': state.bucket.rate,
+                                   'resting_seconds': max(0.0, state.resting_until - now)}
+                    for state in self._states.values()}
+
+
+# Seconds in the windows providers name in their rate limit headers
+_WINDOWS = {'second': 1.0, 'minute': 60.0, 'hour': 3600.0}
+
+
+def parse_rate_limit_headers(headers: Mapping[str, str]) -> Dict[str, Optional[float]]:
+    """
+        Read quota and rate limit headers in the forms providers use.
+
+        FreeCurrencyAPI sends X-RateLimit-{Limit,Remaining}-Quota-{Minute,Month}; others send
+        X-RateLimit-Limit/Remaining/Reset or RateLimit-* and Retry-After on a 429.
+
+        Returns:
+        dict: 'remaining' and 'limit' of the long-term quota, 'window_limit', 'window_remaining' and
+        'window' (seconds) of the short rate limit window, 'per_second' derived from it, 'reset'
+        and 'retry_after' in seconds. Values not sent are None.
+
+        Example:
+        parse_rate_limit_headers({'X-RateLimit-Limit-Quota-Minute': '10',
+                                  'X-RateLimit-Remaining-Quota-Minute': '0'})['per_second']
+        0.16666666666666666
+        """
+    quota = {'remaining': None, 'limit': None, 'window_limit': None, 'window_remaining': None,
+             'window': None, 'per_second': None, 'reset': None, 'retry_after': None}
+    for name, value in headers.items():
+        name = name.lower()
+        if 'ratelimit' not in name and name != 'retry-after':
+            continue
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            continue
+
+        if name == 'retry-after':
+            quota['retry_after'] = number
+            continue
+        if name.endswith('reset'):
+            # Either seconds from now or a Unix time stamp
+            quota['reset'] = max(0.0, number - time()) if number > 1e9 else number
+            continue
+
+        window = next((seconds for unit, seconds in _WINDOWS.items() if name.endswith(unit)), None)
+        field = 'remaining' if 'remaining' in name else 'limit' if 'limit' in name else None
+        if field is None:
+            continue
+        if window is not None:
+            quota['window'] = window
+            quota[f'window_{field}'] = int(number)
+        else:
+            # Month, day or unnamed quotas, the tightest one counts
+            current = quota[field]
+            quota[field] = int(number) if current is None else min(current, int(number))
+
+    if quota['window_limit']:
+        quota['per_second'] = quota['window_limit'] / quota['window']
+    return quota
@@ -0,0 +1,195 @@
+from collections import OrderedDict
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class RateCache:
+    """
+        Size-bounded LRU cache with a time-to-live and stale-while-revalidate semantics.
+
+        Entries younger than 'ttl' seconds are served as-is. Entries older than 'ttl' but
+        younger than 'ttl + stale_ttl' are still served, while a single background thread
+        refreshes them. Anything older is treated as a miss and loaded synchronously. Concurrent
+        misses on the same key share a single load.
+
+        Parameters:
+        - ttl (float): Seconds an entry is considered fresh.
+        - max_size (int): Maximum number of entries kept before the least recently used is evicted.
+        - stale_ttl (float): Extra seconds a stale entry may be served while it is being refreshed.
+        - clock (Callable[[], float]): Monotonic time source, replaceable in tests.
+
+        Example:
+        cache = RateCache(ttl=60, max_size=128)
+        rate = cache.get(('USD', 'EUR'), lambda: fetch_exchange_rate(api_key, 'USD', 'EUR'))
+        print(cache.stats()['hits'])
+        """
+
+    def __init__(self, ttl: float = 300.0, max_size: int = 256, stale_ttl: float = 3600.0,
+                 clock: Callable[[], float] = monotonic) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+
+        # key -> (value, stored_at), ordered from least to most recently used
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        # Keys that currently have a background refresh running
+        self._refreshing = set()
+        # key -> _Flight for misses currently being loaded
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._lock = Lock()
+
+        # Counters
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.evictions = 0
+        self.merged_misses = 0
+        self._load_count = 0
+        self._load_seconds = 0.0
+
+    def get(self, key: Hashable, loader: Callable[[], Optional[Any]]) -> Optional[Any]:
+        """
+            Return the cached value for 'key', calling 'loader' on a miss.
+
+            Parameters:
+            - key (Hashable): Cache key, e.g. a (source_currency, target_currency) tuple.
+            - loader (Callable): Zero-argument function returning the value or None on failure.
+
+            Returns:
+            The cached or freshly loaded value, or None if the loader failed on a miss.
+            """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = self.clock() - stored_at
+
+                # Fresh entry, serve it directly
+                if age <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+                # Stale but still servable, kick off one background refresh
+                if age <= self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+                    return value
+
+            self.misses += 1
+
+            # Another caller is already loading this key, wait for its result instead
+            flight = self._inflight.get(key)
+            is_owner = flight is None
+            if is_owner:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.merged_misses += 1
+
+        if not is_owner:
+            flight.done.wait()
+            return flight.value
+
+        # Load outside the lock so a slow upstream does not block other keys
+        try:
+            flight.value = self._load(loader)
+            if flight.value is not None:
+                self.set(key, flight.value)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+        return flight.value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """
+            Return the cached value for 'key' regardless of its age, without loading or counting.
+            """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+            Store 'value' under 'key', evicting the least recently used entries if needed.
+            """
+        with self._lock:
+            self._entries[key] = (value, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+            Drop a single entry, or every entry if no key is given.
+            """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+            Return the cache counters along with an estimate of the upstream time saved.
+
+            Returns:
+            dict: hits, stale_hits, misses, refreshes, refresh_failures, evictions, merged_misses, size,
+                  avg_load_seconds and saved_seconds.
+            """
+        with self._lock:
+            avg_load = self._load_seconds / self._load_count if self._load_count else 0.0
+            return {
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'refreshes': self.refreshes,
+                'refresh_failures': self.refresh_failures,
+                'evictions': self.evictions,
+                'merged_misses': self.merged_misses,
+                'size': len(self._entries),
+                'avg_load_seconds': avg_load,
+                # Every hit, fresh or stale, skipped one synchronous load
+                'saved_seconds': (self.hits + self.stale_hits) * avg_load,
+            }
+
+    def _load(self, loader: Callable[[], Optional[Any]]) -> Optional[Any]:
+        # Time the loader so stats() can report how much latency hits save
+        started = monotonic()
+        try:
+            return loader()
+        finally:
+            with self._lock:
+                self._load_count += 1
+                self._load_seconds += monotonic() - started
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Optional[Any]]) -> None:
+        try:
+            value = self._load(loader)
+        except Exception:
+            value = None
+
+        if value is not None:
+            self.set(key, value)
+
+        with self._lock:
+            if value is not None:
+                self.refreshes += 1
+            else:
+                self.refresh_failures += 1
+            self._refreshing.discard(key)
+
+
+class _Flight:
+    # Result of a load shared by every caller that missed on the same key
+    def __init__(self) -> None:
+        self.done = Event()
+        self.value = None
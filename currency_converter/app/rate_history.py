@@ -0,0 +1,324 @@
+from concurrent.futures import ThreadPoolExecutor
+from os import makedirs, path, replace
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import conversion
+from logs import app_dir, log_error
+
+# One .npz file per base currency in the ~/.anwoo directory
+HISTORY_DIR = path.join(app_dir, 'history')
+# Days a missing date may be answered with the last earlier rate, covering weekends and holidays
+MAX_AS_OF_DAYS = 7
+# Past dates fetched from the providers at the same time
+FETCH_CONCURRENCY = 4
+# Seconds a date the providers did not return is not asked for again
+FAILED_DATE_TTL = 3600.0
+
+
+class _BaseHistory:
+    # Columnar history of one base currency: a sorted date index and one rate column per target currency
+
+    def __init__(self, dates: np.ndarray, currencies: List[str], rates: np.ndarray) -> None:
+        self.dates = dates
+        self.currencies = currencies
+        self.columns = {currency: index for index, currency in enumerate(currencies)}
+        self.rates = rates
+
+
+class RateHistory:
+    """
+        Daily exchange rates kept as NumPy arrays, one date-indexed matrix per base currency.
+
+        Each base currency holds a sorted datetime64[D] index and a float64 matrix with one column per
+        target currency, NaN where a rate is unknown. Lookups of many dates are a single searchsorted()
+        over the index, so converting a ledger costs one vectorized pass instead of one request per row.
+        Each base is saved as one .npz file and loaded on first use.
+
+        Parameters:
+        - directory (str): Where the .npz files are kept, created on first save.
+
+        Example:
+        history = RateHistory()
+        history.add_tables('USD', {'2024-01-31': {'EUR': 0.92}, '2024-02-29': {'EUR': 0.93}})
+        dates, rates = history.get_series('USD', 'EUR', '2024-01-01', '2024-03-01')
+        print(history.get_rates('USD', 'EUR', ['2024-02-03']))
+        """
+
+    def __init__(self, directory: str = HISTORY_DIR) -> None:
+        self.directory = directory
+        self._lock = Lock()
+        self._bases: Dict[str, _BaseHistory] = {}
+        # (base currency, datetime.date) -> monotonic time the providers failed to return it
+        self._failed: Dict[Tuple[str, Any], float] = {}
+
+    def add_tables(self, base_currency: str, tables: Dict[str, Dict[str, float]]) -> None:
+        """
+            Store the rate tables of many dates at once, replacing any stored for the same dates.
+
+            Parameters:
+            - base_currency (str): The currency the rates are quoted against.
+            - tables (dict): {date: {currency: rate}}, dates as YYYY-MM-DD strings or datetime64.
+            """
+        if not tables:
+            return
+
+        with self._lock:
+            history = self._get(base_currency)
+            currencies = list(history.currencies)
+            columns = dict(history.columns)
+            for table in tables.values():
+                for currency in table:
+                    if currency not in columns:
+                        columns[currency] = len(currencies)
+                        currencies.append(currency)
+
+            # Merge the new dates into the sorted index, new dates overwrite stored ones
+            new_dates = np.array(list(tables), dtype='datetime64[D]')
+            dates = np.union1d(history.dates, new_dates)
+            rates = np.full((len(dates), len(currencies)), np.nan)
+            rates[np.searchsorted(dates, history.dates), :len(history.currencies)] = history.rates
+            for row, table in zip(np.searchsorted(dates, new_dates), tables.values()):
+                rates[row, [columns[currency] for currency in table]] = list(table.values())
+
+            self._bases[base_currency] = _BaseHistory(dates, currencies, rates)
+
+    def dates(self, base_currency: str) -> np.ndarray:
+        """
+            Return the sorted dates stored for a base currency.
+            """
+        with self._lock:
+            return self._get(base_currency).dates.copy()
+
+    def missing_dates(self, base_currency: str, dates: Iterable) -> np.ndarray:
+        """
+            Return the distinct dates among 'dates' that have no stored table yet.
+            """
+        with self._lock:
+            return np.setdiff1d(_to_dates(dates), self._get(base_currency).dates)
+
+    def record_failures(self, base_currency: str, dates: Iterable) -> None:
+        """
+            Remember dates the providers did not return, so missing_dates() skips them for a while.
+            """
+        now = monotonic()
+        with self._lock:
+            for date in _to_dates(dates).tolist():
+                self._failed[(base_currency, date)] = now
+
+    def without_recent_failures(self, base_currency: str, dates: np.ndarray,
+                                ttl: float = FAILED_DATE_TTL) -> np.ndarray:
+        """
+            Return 'dates' minus those that failed less than 'ttl' seconds ago.
+            """
+        now = monotonic()
+        with self._lock:
+            if not self._failed:
+                return dates
+            keep = [now - self._failed.get((base_currency, date), -ttl) >= ttl for date in dates.tolist()]
+        return dates[np.array(keep, dtype=bool)]
+
+    def get_series(self, base_currency: str, target_currency: str, start, end) -> Tuple[np.ndarray, np.ndarray]:
+        """
+            Return every stored rate of a pair between two dates, both included.
+
+            Returns:
+            tuple: (dates, rates) arrays, NaN where the target currency was not quoted.
+            """
+        with self._lock:
+            history = self._get(base_currency)
+            # The index is sorted, so the range is one slice between two binary searches
+            low = np.searchsorted(history.dates, np.datetime64(start, 'D'), side='left')
+            high = np.searchsorted(history.dates, np.datetime64(end, 'D'), side='right')
+            column = history.columns.get(target_currency)
+            if column is None:
+                return history.dates[low:high].copy(), np.full(high - low, np.nan)
+            return history.dates[low:high].copy(), history.rates[low:high, column].copy()
+
+    def get_rates(self, base_currency: str, target_currency: str, dates: Iterable,
+                  max_as_of_days: int = MAX_AS_OF_DAYS) -> np.ndarray:
+        """
+            Look up a pair's rate on many dates in one vectorized pass.
+
+            A date without a stored table is answered with the last earlier one, at most
+            'max_as_of_days' days before, so weekends and holidays resolve to the previous close.
+
+            Parameters:
+            - base_currency (str): The currency the rates are quoted against.
+            - target_currency (str): The currency to convert into.
+            - dates (Iterable): Dates as YYYY-MM-DD strings or datetime64, in any order and with repeats.
+            - max_as_of_days (int): Oldest earlier rate accepted for a missing date, 0 only accepts exact dates.
+
+            Returns:
+            np.ndarray: One rate per date, NaN where none is stored.
+            """
+        dates = _to_dates(dates)
+        with self._lock:
+            history = self._get(base_currency)
+            column = history.columns.get(target_currency)
+            if column is None or not len(history.dates):
+                return np.full(len(dates), np.nan)
+
+            # Index of the last stored date on or before each requested date
+            rows = np.searchsorted(history.dates, dates, side='right') - 1
+            found = rows >= 0
+            rows = np.where(found, rows, 0)
+            found &= (dates - history.dates[rows]) <= np.timedelta64(max_as_of_days, 'D')
+            return np.where(found, history.rates[rows, column], np.nan)
+
+    def save(self, base_currency: str) -> None:
+        """
+            Write a base currency's history to its .npz file.
+            """
+        with self._lock:
+            history = self._get(base_currency)
+            makedirs(self.directory, exist_ok=True)
+            file_path = self._path(base_currency)
+            # Write next to the file and swap it in, so a crash never leaves a truncated history
+            temporary_path = file_path + '.tmp'
+            with open(temporary_path, 'wb') as history_file:
+                np.savez(history_file, dates=history.dates, currencies=np.array(history.currencies, dtype=str),
+                         rates=history.rates)
+            replace(temporary_path, file_path)
+
+    def _get(self, base_currency: str) -> _BaseHistory:
+        history = self._bases.get(base_currency)
+        if history is None:
+            history = self._bases[base_currency] = self._load(base_currency)
+        return history
+
+    def _load(self, base_currency: str) -> _BaseHistory:
+        try:
+            with np.load(self._path(base_currency), allow_pickle=False) as stored:
+                return _BaseHistory(stored['dates'], stored['currencies'].tolist(), stored['rates'])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            # A damaged file only costs refetching the dates
+            log_error(type(e).__name__, str(e))
+        return _BaseHistory(np.array([], dtype='datetime64[D]'), [], np.empty((0, 0)))
+
+    def _path(self, base_currency: str) -> str:
+        return path.join(self.directory, f'{base_currency}.npz')
+
+
+def _to_dates(dates) -> np.ndarray:
+    return np.asarray(dates, dtype='datetime64[D]').reshape(-1)
+
+
+# History shared by the CLI, batch conversions and the daemon
+rate_history = RateHistory()
+
+
+def fetch_history(api_key: str, base_currency: str, dates: Iterable) -> int:
+    """
+        Fetch and store the tables of every date in 'dates' that is not stored yet.
+
+        Each missing date costs one request, sent FETCH_CONCURRENCY at a time. Dates that are
+        already stored, in the future or asked for in offline mode are never fetched, and dates
+        the providers failed to return are not asked for again within FAILED_DATE_TTL seconds.
+
+        Parameters:
+        - api_key (str): The API key for accessing the rate providers.
+        - base_currency (str): The currency the rates are quoted against.
+        - dates (Iterable): Dates as YYYY-MM-DD strings or datetime64.
+
+        Returns:
+        int: The number of dates fetched and stored.
+
+        Example:
+        fetch_history('your_api_key', 'USD', ['2024-01-31', '2024-02-29'])
+        """
+    if conversion.rate_store.offline:
+        return 0
+
+    missing = rate_history.missing_dates(base_currency, dates)
+    # Today's table is still moving and the future has none
+    missing = missing[missing < np.datetime64('today', 'D')]
+    # A date the providers just failed to return would cost a request on every chunk of a batch
+    missing = rate_history.without_recent_failures(base_currency, missing)
+    if not len(missing):
+        return 0
+
+    dates_text = [str(date) for date in missing]
+    with ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY) as executor:
+        tables = executor.map(lambda date: conversion.rate_provider.fetch_table(api_key, base_currency, date),
+                              dates_text)
+        fetched = {date: table for date, table in zip(dates_text, tables) if table is not None}
+
+    rate_history.record_failures(base_currency, [date for date in dates_text if date not in fetched])
+    if fetched:
+        rate_history.add_tables(base_currency, fetched)
+        try:
+            rate_history.save(base_currency)
+        except OSError as e:
+            log_error(type(e).__name__, str(e))
+    return len(fetched)
+
+
+def get_rate_history(api_key: str, source_currency: str, target_currency: str,
+                     start, end) -> Tuple[np.ndarray, np.ndarray]:
+    """
+        Return a pair's daily rates between two dates, fetching only the dates not stored yet.
+
+        Parameters:
+        - api_key (str): The API key for accessing the rate providers.
+        - source_currency (str): The currency code of the source currency.
+        - target_currency (str): The currency code of the target currency.
+        - start, end: First and last date, both included, as YYYY-MM-DD strings or datetime64.
+
+        Returns:
+        tuple: (dates, rates) arrays, NaN where no rate is known.
+
+        Example:
+        dates, rates = get_rate_history('your_api_key', 'USD', 'EUR', '2024-01-01', '2024-03-31')
+        print(rates.mean())
+        """
+    fetch_history(api_key, source_currency, np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1))
+    return rate_history.get_series(source_currency, target_currency, start, end)
+
+
+def get_historical_rates(api_key: str, source_currency: str, target_currency: str, dates: Iterable) -> np.ndarray:
+    """
+        Return a pair's rate on each of many dates, see RateHistory.get_rates().
+        """
+    dates = _to_dates(dates)
+    fetch_history(api_key, source_currency, dates)
+    return rate_history.get_rates(source_currency, target_currency, dates)
+
+
+def convert_dated(api_key: str, source_currency: str, target_currency: str, dates: Iterable,
+                  amounts: Iterable[float]) -> np.ndarray:
+    """
+        Convert dated amounts at the rate of their own date, for revaluations and ledgers.
+
+        Each distinct date is fetched at most once and only if it is not stored yet. The conversion
+        itself is one vectorized lookup and multiplication over all transactions.
+
+        Parameters:
+        - api_key (str): The API key for accessing the rate providers.
+        - source_currency (str): The currency code of the source currency.
+        - target_currency (str): The currency code of the target currency.
+        - dates (Iterable): The date of each transaction.
+        - amounts (Iterable[float]): The amount of each transaction.
+
+        Returns:
+        np.ndarray: Converted amounts, NaN where no rate is known for the date.
+
+        Example:
+        converted = convert_dated('your_api_key', 'USD', 'EUR', ['2024-01-31', '2024-02-29'], [100.0, 250.0])
+        """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    return amounts * get_historical_rates(api_key, source_currency, target_currency, dates)
+
+
+def get_historical_rate(api_key: str, source_currency: str, target_currency: str, date) -> Optional[float]:
+    """
+        Return a pair's rate on one date, None if it is not known.
+
+        Example:
+        print(get_historical_rate('your_api_key', 'USD', 'EUR', '2024-01-31'))
+        """
+    rate = get_historical_rates(api_key, source_currency, target_currency, [date])[0]
+    return None if np.isnan(rate) else float(rate)
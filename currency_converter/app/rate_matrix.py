@@ -0,0 +1,209 @@
+import csv
+from os import replace
+from typing import Dict, Iterable, List, Optional, Sequence
+import numpy as np
+import conversion
+from currencies import get_registry
+
+# Currency every matrix is derived from unless asked otherwise
+BASE_CURRENCY = 'USD'
+# Longest currency code stored in the binary format
+CODE_LENGTH = 8
+
+
+class RateMatrix:
+    """
+        Every cross rate among a set of currencies, held as one N x N NumPy array.
+
+        rates[i, j] is the amount of currency j one unit of currency i buys. The whole matrix comes from
+        a single base-rate vector v as rates[i, j] = v[j] / v[i], one vectorized division instead of N²
+        rate lookups. Currencies the base table does not quote have NaN rows and columns.
+
+        Parameters:
+        - currencies (Sequence[str]): Currency codes, in row and column order.
+        - rates (np.ndarray): The N x N matrix, possibly a read-only memory map.
+
+        Example:
+        matrix = RateMatrix.from_base_rates('USD', {'EUR': 0.9, 'JPY': 150.0})
+        matrix.rate('EUR', 'JPY')
+        166.66666666666666
+        matrix.save('rates.npy')
+        shared = RateMatrix.load('rates.npy')  # memory-mapped, nothing is copied
+        """
+
+    def __init__(self, currencies: Sequence[str], rates: np.ndarray) -> None:
+        self.currencies = list(currencies)
+        self.rates = rates
+        self.index: Dict[str, int] = {currency: position for position, currency in enumerate(self.currencies)}
+
+    @classmethod
+    def from_base_rates(cls, base_currency: str, table: Dict[str, float],
+                        currencies: Optional[Iterable[str]] = None) -> 'RateMatrix':
+        """
+            Build the matrix from one base currency's rate table.
+
+            Parameters:
+            - base_currency (str): The currency the table is quoted against.
+            - table (dict): {currency: rate} for one unit of the base currency.
+            - currencies (Iterable[str], optional): Rows and columns, the table's currencies by default.
+
+            Returns:
+            RateMatrix: The cross rates of every pair.
+            """
+        codes = sorted(set(table) | {base_currency}) if currencies is None else list(dict.fromkeys(currencies))
+        quoted = {**table, base_currency: 1.0}
+        vector = np.array([quoted.get(code, np.nan) for code in codes], dtype=np.float64)
+        # Zero or negative quotes are bad data, not rates
+        vector[~(vector > 0)] = np.nan
+        return cls(codes, vector[np.newaxis, :] / vector[:, np.newaxis])
+
+    def rate(self, source_currency: str, target_currency: str) -> Optional[float]:
+        """
+            Return the rate of one pair, None if either currency is unknown or not quoted.
+            """
+        source_index = self.index.get(source_currency)
+        target_index = self.index.get(target_currency)
+        if source_index is None or target_index is None:
+            return None
+        rate = float(self.rates[source_index, target_index])
+        return None if np.isnan(rate) else rate
+
+    def inverse(self, source_currency: str, target_currency: str) -> Optional[float]:
+        """
+            Return the pair's rate as the reciprocal of the opposite quote, target -> source.
+
+            Equal to rate() on a matrix built from one base vector, it cross-checks matrices loaded
+            from elsewhere.
+            """
+        rate = self.rate(target_currency, source_currency)
+        return 1 / rate if rate else None
+
+    def triangulate(self, source_currency: str, target_currency: str, via: str) -> Optional[float]:
+        """
+            Return the pair's rate through a third currency, source -> via -> target.
+
+            Example:
+            matrix.triangulate('EUR', 'JPY', via='USD')
+            """
+        first = self.rate(source_currency, via)
+        second = self.rate(via, target_currency)
+        if first is None or second is None:
+            return None
+        return first * second
+
+    def get_rates(self, source_currencies: Sequence[str], target_currencies: Sequence[str]) -> np.ndarray:
+        """
+            Look up many pairs at once, element by element.
+
+            Returns:
+            np.ndarray: The rate of each (source, target) pair, NaN where either currency is unknown.
+            """
+        sources = np.array([self.index.get(code, -1) for code in source_currencies], dtype=np.intp)
+        targets = np.array([self.index.get(code, -1) for code in target_currencies], dtype=np.intp)
+        rates = self.rates[sources, targets].astype(np.float64)
+        rates[(sources < 0) | (targets < 0)] = np.nan
+        return rates
+
+    def to_csv(self, output: str) -> None:
+        """
+            Write the matrix as CSV, one row per source currency and one column per target currency.
+            """
+        with open(output, 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow([''] + self.currencies)
+            for currency, row in zip(self.currencies, self.rates.tolist()):
+                writer.writerow([currency] + ['' if rate != rate else repr(rate) for rate in row])
+
+    def save(self, output: str) -> None:
+        """
+            Write the matrix as one self-describing .npy file that load() can memory-map.
+
+            Each record holds a currency code and its row of rates, so codes and rates travel
+            together. The file is written next to its destination and renamed into place, so readers
+            never map a half-written matrix.
+            """
+        records = np.empty(len(self.currencies), dtype=_record_dtype(len(self.currencies)))
+        records['code'] = self.currencies
+        records['rates'] = self.rates
+        temporary_path = f'{output}.tmp'
+        with open(temporary_path, 'wb') as npy_file:
+            np.save(npy_file, records)
+        replace(temporary_path, output)
+
+    def to_parquet(self, output: str) -> None:
+        """
+            Write the matrix as a Parquet table: a 'currency' column and one rate column per target.
+
+            Needs pyarrow, which is only imported here.
+            """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = {'currency': self.currencies}
+        columns.update({currency: np.ascontiguousarray(self.rates[:, position])
+                        for position, currency in enumerate(self.currencies)})
+        pq.write_table(pa.table(columns), output)
+
+    @classmethod
+    def load(cls, source: str, mmap: bool = True) -> 'RateMatrix':
+        """
+            Read a matrix written by save().
+
+            Parameters:
+            - source (str): The .npy file.
+            - mmap (bool): Map the file read-only instead of reading it, so processes share the pages.
+
+            Returns:
+            RateMatrix: The matrix, its rates a view into the mapped file when mmap is True.
+            """
+        records = np.load(source, mmap_mode='r' if mmap else None, allow_pickle=False)
+        return cls(records['code'].tolist(), records['rates'])
+
+
+def _record_dtype(size: int) -> np.dtype:
+    return np.dtype([('code', f'U{CODE_LENGTH}'), ('rates', np.float64, (size,))])
+
+
+def build_rate_matrix(api_key: str, currencies: Optional[Iterable[str]] = None,
+                      base_currency: str = BASE_CURRENCY) -> Optional[RateMatrix]:
+    """
+        Build the cross-rate matrix of every known currency from a single rate table.
+
+        Parameters:
+        - api_key (str): The API key for accessing the rate provider.
+        - currencies (Iterable[str], optional): Rows and columns, every currency in the registry by default.
+        - base_currency (str): The one table fetched, through the shared cache.
+
+        Returns:
+        RateMatrix or None: The matrix, None if the base table could not be fetched.
+
+        Example:
+        matrix = build_rate_matrix('your_api_key')
+        print(matrix.rate('GBP', 'JPY'))
+        """
+    table = conversion.get_rate_table(api_key, base_currency)
+    if table is None:
+        return None
+    if currencies is None:
+        currencies = sorted(get_registry().codes)
+    return RateMatrix.from_base_rates(base_currency, table, currencies)
+
+
+def export_rate_matrix(matrix: RateMatrix, output: str) -> None:
+    """
+        Write a matrix in the format its file extension names: .csv, .parquet, or .npy otherwise.
+        """
+    if output.endswith('.csv'):
+        matrix.to_csv(output)
+    elif output.endswith('.parquet'):
+        matrix.to_parquet(output)
+    else:
+        matrix.save(output)
+
+
+def quoted_currencies(matrix: RateMatrix) -> List[str]:
+    """
+        Return the currencies whose rates are known, the others are NaN throughout.
+        """
+    known = ~np.isnan(np.diagonal(matrix.rates))
+    return [currency for currency, is_known in zip(matrix.currencies, known.tolist()) if is_known]
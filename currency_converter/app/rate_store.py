@@ -0,0 +1,122 @@
+import json
+import sqlite3
+from os import makedirs, path
+from threading import Lock
+from time import time
+from typing import Dict, Optional, Tuple
+from logs import app_dir
+
+# SQLite file next to the log in the ~/.anwoo directory
+RATE_STORE_PATH = path.join(app_dir, 'rates.sqlite3')
+# Seconds a stored snapshot is fresh enough to answer without the network
+MAX_AGE = 900.0
+# Snapshots kept per base currency, older ones are pruned on save
+SNAPSHOTS_PER_BASE = 48
+
+
+class RateStore:
+    """
+        Timestamped rate table snapshots persisted in SQLite, so a fresh process can answer immediately.
+
+        Each snapshot holds every rate for one base currency as fetched from the provider. A snapshot
+        younger than 'max_age' seconds is used instead of the network. In offline mode the newest
+        snapshot is used whatever its age, and the network is never contacted.
+
+        Parameters:
+        - db_path (str): Location of the SQLite file, created on first use.
+        - max_age (float): Seconds a snapshot is fresh enough to skip the network.
+        - offline (bool): Answer only from stored snapshots.
+
+        Example:
+        store = RateStore()
+        store.save('USD', {'EUR': 0.91, 'JPY': 149.8})
+        rates, fetched_at = store.load('USD')
+        print(store.staleness('USD'))
+        """
+
+    def __init__(self, db_path: str = RATE_STORE_PATH, max_age: float = MAX_AGE, offline: bool = False) -> None:
+        self.db_path = db_path
+        self.max_age = max_age
+        self.offline = offline
+        self._connection = None
+        self._lock = Lock()
+        # base currency -> wall-clock time its table in use was fetched from the provider
+        self.fetched_at: Dict[str, float] = {}
+
+    def save(self, base_currency: str, rates: Dict[str, float], fetched_at: Optional[float] = None) -> None:
+        """
+            Store a snapshot of a base currency's rate table.
+
+            Parameters:
+            - base_currency (str): The currency the rates are quoted against.
+            - rates (dict): {currency: rate}.
+            - fetched_at (float, optional): Unix time the rates were fetched, now by default.
+            """
+        fetched_at = time() if fetched_at is None else fetched_at
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute('INSERT INTO snapshots (base, fetched_at, rates) VALUES (?, ?, ?)',
+                                   (base_currency, fetched_at, json.dumps(rates, separators=(',', ':'))))
+                # Keep the file compact by pruning old snapshots of this base
+                connection.execute('DELETE FROM snapshots WHERE base = ? AND fetched_at NOT IN '
+                                   '(SELECT fetched_at FROM snapshots WHERE base = ? '
+                                   'ORDER BY fetched_at DESC LIMIT ?)',
+                                   (base_currency, base_currency, SNAPSHOTS_PER_BASE))
+            self.fetched_at[base_currency] = fetched_at
+
+    def load(self, base_currency: str, max_age: Optional[float] = None) -> Optional[Tuple[Dict[str, float], float]]:
+        """
+            Return the newest snapshot of a base currency's rate table.
+
+            Parameters:
+            - base_currency (str): The currency the rates are quoted against.
+            - max_age (float, optional): Ignore snapshots older than this many seconds.
+
+            Returns:
+            tuple or None: ({currency: rate}, fetched_at), None if there is no usable snapshot.
+            """
+        with self._lock:
+            row = self._connect().execute('SELECT rates, fetched_at FROM snapshots WHERE base = ? '
+                                          'ORDER BY fetched_at DESC LIMIT 1', (base_currency,)).fetchone()
+        if row is None:
+            return None
+
+        rates, fetched_at = json.loads(row[0]), row[1]
+        if max_age is not None and time() - fetched_at > max_age:
+            return None
+
+        self.fetched_at[base_currency] = fetched_at
+        return rates, fetched_at
+
+    def staleness(self, base_currency: str) -> Optional[float]:
+        """
+            Return the age in seconds of the table in use for a base currency, None if none was loaded.
+            """
+        fetched_at = self.fetched_at.get(base_currency)
+        return time() - fetched_at if fetched_at is not None else None
+
+    def max_staleness(self) -> Optional[float]:
+        """
+            Return the age in seconds of the oldest table in use, None if none was loaded.
+            """
+        if not self.fetched_at:
+            return None
+        return time() - min(self.fetched_at.values())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Open lazily so importing the module never touches the disk
+        if self._connection is None:
+            makedirs(path.dirname(self.db_path) or '.', exist_ok=True)
+            self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._connection.execute('CREATE TABLE IF NOT EXISTS snapshots '
+                                     '(base TEXT NOT NULL, fetched_at REAL NOT NULL, rates TEXT NOT NULL)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS snapshots_base_time '
+                                     'ON snapshots (base, fetched_at)')
+        return self._connection
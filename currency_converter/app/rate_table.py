@@ -0,0 +1,141 @@
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
+from rate_cache import RateCache
+
+# Fetch one table per source currency
+STRATEGY_DIRECT = 'direct'
+# Fetch only the pivot currency's table and derive every other pair from it
+STRATEGY_PIVOT = 'pivot'
+
+
+class RateTable:
+    """
+        Answer any currency pair from full base-currency rate tables held in memory.
+
+        A table maps every target currency to its rate against one base currency and is fetched
+        with a single upstream request. With the 'direct' strategy the source currency's own table
+        is used, unless the pivot table is already in memory, in which case the pair is derived from
+        it as a cross rate (e.g. EUR->JPY = USD->JPY / USD->EUR). With the 'pivot' strategy only the
+        pivot table is ever fetched.
+
+        Parameters:
+        - fetch_table (Callable[[str, str], dict or None]): Called with (api_key, base_currency),
+          returns {currency: rate} or None on failure.
+        - cache (RateCache): Cache holding the tables, keyed by base currency.
+        - pivot_currency (str): Currency used to derive cross rates.
+        - strategy (str): 'direct' or 'pivot'.
+
+        Example:
+        table = RateTable(fetch_rate_table, RateCache(ttl=300))
+        rate = table.get_rate('your_api_key', 'EUR', 'JPY')
+        print(table.stats()['requests_avoided'])
+        """
+
+    def __init__(self, fetch_table: Callable[[str, str], Optional[Dict[str, float]]], cache: RateCache,
+                 pivot_currency: str = 'USD', strategy: str = STRATEGY_DIRECT) -> None:
+        self.fetch_table = fetch_table
+        self.cache = cache
+        self.pivot_currency = pivot_currency
+        self.strategy = strategy
+
+        # Counters
+        self._lock = Lock()
+        self.lookups = 0
+        self.upstream_requests = 0
+
+    @property
+    def strategy(self) -> str:
+        return self._strategy
+
+    @strategy.setter
+    def strategy(self, strategy: str) -> None:
+        # Checked on every change, a misspelt strategy would otherwise silently act as neither
+        if strategy not in (STRATEGY_DIRECT, STRATEGY_PIVOT):
+            raise ValueError(f'Unknown rate table strategy: {strategy}')
+        self._strategy = strategy
+
+    def get_table(self, api_key: str, base_currency: str) -> Optional[Dict[str, float]]:
+        """
+            Return the full rate table for 'base_currency', fetching it only if it is not cached.
+
+            Parameters:
+            - api_key (str): The API key for accessing the rate provider.
+            - base_currency (str): The currency all rates in the table are quoted against.
+
+            Returns:
+            dict or None: {currency: rate} for every currency the provider knows, None on failure.
+            """
+        return self.cache.get(base_currency, lambda: self._fetch(api_key, base_currency))
+
+    def peek_rate(self, source_currency: str, target_currency: str) -> Optional[float]:
+        """
+            Return the rate for a pair if it can be answered from memory, without any upstream request.
+            """
+        if source_currency == target_currency:
+            return 1.0
+
+        table = self.cache.peek(source_currency)
+        if table is not None:
+            return table.get(target_currency)
+
+        return self._cross_rate(self.cache.peek(self.pivot_currency), source_currency, target_currency)
+
+    def get_rate(self, api_key: str, source_currency: str, target_currency: str) -> Optional[float]:
+        """
+            Return the exchange rate from 'source_currency' to 'target_currency'.
+
+            Parameters:
+            - api_key (str): The API key for accessing the rate provider.
+            - source_currency (str): The currency code of the source currency.
+            - target_currency (str): The currency code of the target currency.
+
+            Returns:
+            float or None: The exchange rate, None if it could not be fetched or a currency is unknown.
+            """
+        with self._lock:
+            self.lookups += 1
+
+        # Identical currencies never need a lookup
+        if source_currency == target_currency:
+            return 1.0
+
+        # Prefer the source currency's own table when it is already in memory
+        if self.strategy == STRATEGY_DIRECT and (self.cache.peek(source_currency) is not None
+                                                  or self.cache.peek(self.pivot_currency) is None):
+            table = self.get_table(api_key, source_currency)
+            return table.get(target_currency) if table is not None else None
+
+        # Otherwise derive the pair from the pivot table
+        return self._cross_rate(self.get_table(api_key, self.pivot_currency), source_currency, target_currency)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+            Return the lookup counters.
+
+            Returns:
+            dict: lookups, upstream_requests and requests_avoided compared to one request per lookup.
+            """
+        with self._lock:
+            return {
+                'lookups': self.lookups,
+                'upstream_requests': self.upstream_requests,
+                'requests_avoided': max(self.lookups - self.upstream_requests, 0),
+            }
+
+    def _cross_rate(self, pivot_table: Optional[Dict[str, float]], source_currency: str,
+                    target_currency: str) -> Optional[float]:
+        # Rates are quoted as 1 pivot = rate currency, so source->target = pivot->target / pivot->source
+        if pivot_table is None:
+            return None
+
+        source_rate = 1.0 if source_currency == self.pivot_currency else pivot_table.get(source_currency)
+        target_rate = 1.0 if target_currency == self.pivot_currency else pivot_table.get(target_currency)
+        if not source_rate or target_rate is None:
+            return None
+
+        return target_rate / source_rate
+
+    def _fetch(self, api_key: str, base_currency: str) -> Optional[Dict[str, float]]:
+        with self._lock:
+            self.upstream_requests += 1
+        return self.fetch_table(api_key, base_currency)
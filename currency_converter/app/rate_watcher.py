@@ -0,0 +1,268 @@
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import conversion
+from logs import log_error
+
+# Seconds between polls, shared by every watched pair
+POLL_INTERVAL = 60.0
+# Relative change of a rate, since subscribers were last told, that notifies them again
+CHANGE_THRESHOLD = 0.0005
+
+
+class RateChange(NamedTuple):
+    source_currency: str
+    target_currency: str
+    # None the first time a pair is seen without a known rate
+    old_rate: Optional[float]
+    new_rate: float
+
+
+class Subscription:
+    """
+        One subscriber's interest in a currency pair, returned by RateWatcher.subscribe().
+        """
+
+    def __init__(self, source_currency: str, target_currency: str, callback: Callable[[RateChange], None],
+                 threshold: float, rate: Optional[float]) -> None:
+        self.source_currency = source_currency
+        self.target_currency = target_currency
+        self.callback = callback
+        self.threshold = threshold
+        # Rate this subscriber was last told about, movements are measured against it
+        self.rate = rate
+
+    def is_moved(self, new_rate: float) -> bool:
+        if self.rate is None:
+            return True
+        return abs(new_rate - self.rate) > self.threshold * abs(self.rate)
+
+
+def fetch_fresh_table(api_key: str, base_currency: str) -> Optional[Dict[str, float]]:
+    """
+        Load a base currency's table past the in-memory cache and store it there for conversions.
+
+        Offline mode and unreachable providers are answered from the stored snapshots, exactly like
+        conversion.load_rate_table().
+        """
+    table = conversion.load_rate_table(api_key, base_currency)
+    if table is not None:
+        # Conversions of any pair on this base now use the rates the watcher just saw
+        conversion.rate_cache.set(base_currency, table)
+    return table
+
+
+class RateWatcher:
+    """
+        Poll watched currency pairs on one shared schedule and notify subscribers when a rate moves.
+
+        Each poll groups the watched pairs by source currency and fetches one rate table per base, so
+        ten pairs out of USD cost a single request. With a pivot currency every pair is derived from
+        the pivot's table as a cross rate, one request in total. Subscribers are only called when a
+        rate moved by more than their threshold since they were last notified, so slow drifts add up
+        instead of slipping through one small step at a time.
+
+        poll() does the network work and notify() calls the subscribers, so callers decide the thread
+        each runs on: start() runs both on a background thread for library use, attach_to_tk() polls
+        on a ConversionWorker and notifies on the Tk main loop.
+
+        Parameters:
+        - fetch_table (Callable[[str, str], dict or None]): Called with (api_key, base_currency).
+        - interval (float): Seconds between polls.
+        - threshold (float): Default relative change that notifies a subscriber, 0.0005 is 0.05%.
+        - pivot_currency (str, optional): Fetch only this currency's table and derive every pair from it.
+
+        Example:
+        watcher = RateWatcher(interval=30)
+        watcher.subscribe('USD', 'EUR', lambda change: print(change.new_rate), threshold=0.001)
+        watcher.subscribe('USD', 'JPY', lambda change: print(change.new_rate))
+        watcher.start('your_api_key')
+        """
+
+    def __init__(self, fetch_table: Callable[[str, str], Optional[Dict[str, float]]] = fetch_fresh_table,
+                 interval: float = POLL_INTERVAL, threshold: float = CHANGE_THRESHOLD,
+                 pivot_currency: Optional[str] = None) -> None:
+        self.fetch_table = fetch_table
+        self.interval = interval
+        self.threshold = threshold
+        self.pivot_currency = pivot_currency
+        self._subscriptions: List[Subscription] = []
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+
+        # Counters
+        self.polls = 0
+        self.requests = 0
+        self.notifications = 0
+
+    def subscribe(self, source_currency: str, target_currency: str, callback: Callable[[RateChange], None],
+                  threshold: Optional[float] = None, rate: Optional[float] = None) -> Subscription:
+        """
+            Watch a pair and call 'callback' with a RateChange whenever its rate moves past 'threshold'.
+
+            Parameters:
+            - source_currency (str): The currency code of the source currency.
+            - target_currency (str): The currency code of the target currency.
+            - callback (Callable[[RateChange], None]): Called from notify().
+            - threshold (float, optional): Relative change that notifies, the watcher's default if None.
+            - rate (float, optional): Rate the subscriber already shows, otherwise the first poll notifies.
+
+            Returns:
+            Subscription: Pass it to unsubscribe() to stop watching.
+            """
+        subscription = Subscription(source_currency, target_currency, callback,
+                                    self.threshold if threshold is None else threshold, rate)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def pairs(self) -> List[Tuple[str, str]]:
+        """
+            Return the watched pairs, each listed once however many subscribers share it.
+            """
+        with self._lock:
+            return list(dict.fromkeys((subscription.source_currency, subscription.target_currency)
+                                      for subscription in self._subscriptions))
+
+    def poll(self, api_key: str) -> Dict[Tuple[str, str], float]:
+        """
+            Fetch the current rate of every watched pair, one request per base currency.
+
+            Safe to call from any thread, it never calls the subscribers.
+
+            Returns:
+            dict: {(source_currency, target_currency): rate} for the pairs that could be fetched.
+            """
+        # base currency -> pairs answered from its table
+        groups: Dict[str, List[Tuple[str, str]]] = {}
+        for pair in self.pairs():
+            groups.setdefault(self.pivot_currency or pair[0], []).append(pair)
+
+        rates = {}
+        for base_currency, pairs in groups.items():
+            self.requests += 1
+            try:
+                table = self.fetch_table(api_key, base_currency)
+            except Exception as e:
+                # One failing base must not stop the others from being watched
+                log_error(type(e).__name__, str(e))
+                continue
+            if not table:
+                continue
+
+            for source_currency, target_currency in pairs:
+                rate = _rate_from_table(table, base_currency, source_currency, target_currency)
+                if rate is not None:
+                    rates[(source_currency, target_currency)] = rate
+
+        self.polls += 1
+        return rates
+
+    def notify(self, rates: Dict[Tuple[str, str], float]) -> List[RateChange]:
+        """
+            Call every subscriber whose pair moved past its threshold, on the calling thread.
+
+            Parameters:
+            - rates (dict): Result of poll().
+
+            Returns:
+            list: The RateChange delivered to each notified subscriber.
+            """
+        changes = []
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            new_rate = rates.get((subscription.source_currency, subscription.target_currency))
+            if new_rate is None or not subscription.is_moved(new_rate):
+                continue
+
+            change = RateChange(subscription.source_currency, subscription.target_currency, subscription.rate,
+                                new_rate)
+            subscription.rate = new_rate
+            try:
+                subscription.callback(change)
+            except Exception as e:
+                # A broken subscriber must not keep the others from being told
+                log_error(type(e).__name__, str(e))
+            changes.append(change)
+
+        self.notifications += len(changes)
+        return changes
+
+    def check(self, api_key: str) -> List[RateChange]:
+        """
+            Poll once and notify the subscribers on the calling thread.
+            """
+        return self.notify(self.poll(api_key))
+
+    def start(self, api_key: str) -> None:
+        """
+            Poll every 'interval' seconds on a background thread, calling subscribers from that thread.
+            """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, args=(api_key,), name='rate-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+            Stop the background thread started by start(), waiting for a poll in progress.
+            """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def attach_to_tk(self, root, worker, get_api_key: Callable[[], str]) -> None:
+        """
+            Poll every 'interval' seconds on a ConversionWorker and notify subscribers on the Tk main loop.
+
+            Nothing is fetched while no pair is watched or no API key is entered.
+
+            Parameters:
+            - root (tkinter.Misc): Widget whose after() schedules the polls.
+            - worker (ConversionWorker): Runs each poll off the main loop, best one of its own so background
+              polls stay out of the busy state and the Stop button of user-started conversions.
+            - get_api_key (Callable[[], str]): Returns the current API key, e.g. api_key_var.get.
+            """
+        def tick() -> None:
+            api_key = get_api_key()
+            if api_key and self.pairs():
+                worker.submit(self.poll, api_key, on_done=self.notify,
+                              on_error=lambda error: log_error(type(error).__name__, str(error)),
+                              channel='rate-watcher')
+            root.after(int(self.interval * 1000), tick)
+
+        root.after(int(self.interval * 1000), tick)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            subscriptions = len(self._subscriptions)
+        return {'subscriptions': subscriptions, 'pairs': len(self.pairs()), 'polls': self.polls,
+                'requests': self.requests, 'notifications': self.notifications}
+
+    def _run(self, api_key: str) -> None:
+        # Wait first, subscribers passed the rate they already show
+        while not self._stop.wait(self.interval):
+            if self.pairs():
+                self.check(api_key)
+
+
+def _rate_from_table(table: Dict[str, float], base_currency: str, source_currency: str,
+                     target_currency: str) -> Optional[float]:
+    # Direct rate from the source's own table, or a cross rate through the pivot's table
+    if source_currency == target_currency:
+        return 1.0
+    target_rate = 1.0 if target_currency == base_currency else table.get(target_currency)
+    if source_currency == base_currency:
+        return target_rate
+    source_rate = table.get(source_currency)
+    if target_rate is None or not source_rate:
+        return None
+    return target_rate / source_rate
@@ -0,0 +1,6 @@
+import sys
+from os import path
+
+# The application modules import each other as top-level scripts (e.g. 'from conversion import ...'),
+# so make the app directory importable for the test run
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from threading import Lock
+from time import sleep
+from unittest.mock import patch
+from app.async_conversion import AsyncConverter
+
+
+class SlowRates:
+    # Stands in for the blocking get_exchange_rate and records every call
+    def __init__(self) -> None:
+        self.calls = []
+        self.lock = Lock()
+
+    def __call__(self, api_key, source_currency, target_currency):
+        with self.lock:
+            self.calls.append((source_currency, target_currency))
+        sleep(0.05)
+        return {'EUR': 0.9, 'JPY': 150.0}.get(target_currency)
+
+
+def test_concurrent_callers_share_one_lookup():
+    slow_rates = SlowRates()
+    converter = AsyncConverter(max_concurrency=4)
+
+    async def run():
+        return await asyncio.gather(*(converter.get_exchange_rate('api_key', 'USD', 'EUR') for _ in range(100)))
+
+    with patch('app.async_conversion.get_exchange_rate', slow_rates):
+        rates = asyncio.run(run())
+
+    # 100 callers, one blocking lookup
+    assert rates == [0.9] * 100
+    assert slow_rates.calls == [('USD', 'EUR')]
+    assert converter.merged == 99
+
+
+def test_many_pairs_are_fetched_concurrently():
+    slow_rates = SlowRates()
+    converter = AsyncConverter(max_concurrency=4)
+    pairs = [('USD', 'EUR'), ('USD', 'JPY'), ('USD', 'EUR'), ('USD', 'XYZ')]
+
+    with patch('app.async_conversion.get_exchange_rate', slow_rates):
+        rates = asyncio.run(converter.get_exchange_rates('api_key', pairs))
+
+    assert rates == {('USD', 'EUR'): 0.9, ('USD', 'JPY'): 150.0, ('USD', 'XYZ'): None}
+    # Duplicate pairs are only looked up once
+    assert len(slow_rates.calls) == 3
+
+
+@pytest.mark.parametrize('amount, expected_result', [
+    (100, 90.0),
+    (0, 0.0),
+])
+def test_convert_currency_async(amount, expected_result):
+    converter = AsyncConverter()
+
+    with patch('app.async_conversion.get_exchange_rate', return_value=0.9):
+        result = asyncio.run(converter.convert_currency('api_key', 'USD', 'EUR', amount))
+
+    assert result == pytest.approx(expected_result)
@@ -0,0 +1,82 @@
+import pytest
+from unittest.mock import patch
+from app.batch import convert_many, convert_file
+from app.decimal_conversion import convert_exact
+
+# Mock exchange rates per currency pair
+RATES = {('USD', 'EUR'): 0.9, ('USD', 'JPY'): 150.0, ('EUR', 'USD'): 1.1}
+
+
+@patch('app.batch.get_exchange_rate', side_effect=lambda api_key, source, target: RATES.get((source, target)))
+def test_convert_many_resolves_each_pair_once(mock_get_exchange_rate):
+    rows = [
+        {'source_currency': 'USD', 'target_currency': 'EUR', 'amount': '100'},
+        {'source_currency': 'USD', 'target_currency': 'JPY', 'amount': '2'},
+        {'source_currency': 'USD', 'target_currency': 'EUR', 'amount': '10'},
+        {'source_currency': 'EUR', 'target_currency': 'USD', 'amount': '50'},
+    ]
+
+    # A small chunk size makes the pairs span several vectorized passes
+    result = list(convert_many('api_key', rows, chunk_size=3))
+
+    # Rows keep their order and carry the converted amount
+    assert [row['converted_amount'] for row in result] == pytest.approx([90.0, 300.0, 9.0, 55.0])
+    # Three distinct pairs, three rate lookups
+    assert mock_get_exchange_rate.call_count == 3
+
+
+@pytest.mark.parametrize('amount', ['abc', '', None])
+@patch('app.batch.get_exchange_rate', return_value=0.9)
+def test_invalid_amounts_do_not_abort_the_batch(mock_get_exchange_rate, amount):
+    rows = [{'amount': amount}, {'amount': '10'}]
+
+    result = list(convert_many('api_key', rows, 'USD', 'EUR'))
+
+    assert result[0]['converted_amount'] is None
+    assert result[1]['converted_amount'] == pytest.approx(9.0)
+
+
+@pytest.mark.parametrize('output_name', ['out.csv', 'out.jsonl'])
+@patch('app.batch.get_exchange_rate', return_value=None)
+def test_convert_file_reports_failed_pairs(mock_get_exchange_rate, tmp_path, output_name):
+    input_path = tmp_path / 'in.csv'
+    input_path.write_text('amount,target_currency\n1,EUR\n2,EUR\n3,JPY\n')
+
+    summary = convert_file('api_key', str(input_path), str(tmp_path / output_name), source_currency='USD')
+
+    assert summary == {'rows': 3, 'pairs': 2, 'failed_pairs': 2}
+    assert (tmp_path / output_name).exists()
+
+
+@patch('app.batch.get_exchange_rate', return_value=0.9)
+@patch('app.batch.get_historical_rates', side_effect=lambda api_key, source, target, dates: [0.5] * len(dates))
+def test_dated_rows_use_the_rate_history(mock_get_historical_rates, mock_get_exchange_rate):
+    rows = [{'amount': '10', 'date': '2024-01-31'}, {'amount': '10'}, {'amount': '4', 'date': '2024-02-29'}]
+
+    result = list(convert_many('api_key', rows, 'USD', 'EUR'))
+
+    assert [row['converted_amount'] for row in result] == pytest.approx([5.0, 9.0, 2.0])
+    # Both dated rows of the pair are looked up together
+    assert mock_get_historical_rates.call_count == 1
+
+
+@patch('app.batch.get_exchange_rate', return_value=149.805)
+def test_exact_mode_rounds_to_minor_units(mock_get_exchange_rate):
+    rows = [{'amount': '100'}, {'amount': '19.99'}, {'amount': 'abc'}]
+
+    result = list(convert_many('api_key', rows, 'USD', 'JPY', exact=True, rounding='half_even'))
+
+    assert [row['converted_amount'] for row in result] == ['14980', '2995', None]
+
+
+@patch('app.batch.get_exchange_rate', return_value=1.5)
+def test_exact_mode_matches_convert_exact_below_one_minor_unit(mock_get_exchange_rate):
+    amounts = ['10.005', '10.00', '0.0049', '12345678901234.56789', '-2.675']
+    rows = [{'amount': amount} for amount in amounts]
+
+    result = list(convert_many('api_key', rows, 'USD', 'EUR', exact=True))
+
+    # Rounded once, like a single conversion, not first to cents and then again
+    assert [row['converted_amount'] for row in result] == [str(convert_exact(amount, 1.5, 'EUR'))
+                                                           for amount in amounts]
+    assert result[0]['converted_amount'] == '15.01'
@@ -0,0 +1,53 @@
+import pytest
+from unittest.mock import patch
+from app.clipboard_features import convert_clipboard_text, parse_clipboard_amounts
+
+# Mock exchange rates per currency pair
+RATES = {('USD', 'EUR'): 0.9, ('GBP', 'EUR'): 1.2, ('USD', 'JPY'): 150.0}
+
+
+@pytest.mark.parametrize('cell, expected', [
+    ('100', '100'),
+    ('1,234.50', '1234.50'),
+    ('1.234,50', '1234.50'),
+    ('12,5', '12.5'),
+    ('$ 1 000', '1000'),
+    ('(12.00)', '-12.00'),
+    ('n/a', None),
+])
+def test_spreadsheet_amounts_are_normalized(cell, expected):
+    row = next(parse_clipboard_amounts(cell, 'USD', 'EUR'))
+
+    assert row['amount'] == expected
+
+
+def test_codes_in_a_row_override_the_defaults():
+    text = 'Amount\n100\n2,500.50 GBP\nUSD\t10\tJPY\n1\t2\t3\n\n'
+
+    rows = list(parse_clipboard_amounts(text, 'USD', 'EUR'))
+
+    assert [(row['amount'], row['source_currency'], row['target_currency']) for row in rows] == [
+        # The header line keeps its place in the column
+        (None, 'USD', 'EUR'),
+        ('100', 'USD', 'EUR'),
+        ('2500.50', 'GBP', 'EUR'),
+        ('10', 'USD', 'JPY'),
+        ('1', 'USD', 'EUR'),
+        ('2', 'USD', 'EUR'),
+        ('3', 'USD', 'EUR'),
+    ]
+
+
+@patch('batch.get_exchange_rate', side_effect=lambda api_key, source, target: RATES.get((source, target)))
+def test_pasted_column_is_converted_with_one_lookup_per_pair(mock_get_exchange_rate):
+    text = '\n'.join(['100', '10 GBP', 'total', '7 CHF'] * 5000) + '\n'
+
+    result = convert_clipboard_text('api_key', text, 'USD', 'EUR')
+
+    lines = result.text.splitlines()
+    assert len(lines) == 20000
+    # Results line up with the pasted lines, empty where nothing could be converted
+    assert lines[:4] == ['90.00', '12.00', '', '']
+    assert (result.amounts, result.converted, result.pairs) == (15000, 10000, 3)
+    # USD->EUR and GBP->EUR, the unquoted CHF->EUR pair is asked once too
+    assert mock_get_exchange_rate.call_count == 3
@@ -0,0 +1,124 @@
+import json
+import logging
+from datetime import datetime
+import pytest
+from unittest.mock import patch
+from app.conversion_history import ConversionHistory, ConversionHistoryHandler, import_logged_conversions
+
+
+def timestamp(text):
+    return datetime.strptime(text, '%Y-%m-%dT%H:%M:%S').timestamp()
+
+
+CONVERSIONS = [
+    (timestamp('2024-03-01T09:00:00'), 'USD', 'EUR', 100.0, 92.0),
+    (timestamp('2024-03-01T17:30:00'), 'USD', 'EUR', 50.0, 46.0),
+    (timestamp('2024-03-02T08:15:00'), 'USD', 'JPY', 10.0, 1500.0),
+    (timestamp('2024-03-02T12:00:00'), 'GBP', 'EUR', 20.0, 23.4),
+]
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = ConversionHistory(str(tmp_path / 'conversions.sqlite3'))
+    history.add_many(CONVERSIONS)
+    yield history
+    history.close()
+
+
+@pytest.mark.parametrize('filters, expected_amounts', [
+    ({}, [20.0, 10.0, 50.0, 100.0]),
+    ({'target_currency': 'EUR'}, [20.0, 50.0, 100.0]),
+    ({'source_currency': 'USD', 'target_currency': 'EUR'}, [50.0, 100.0]),
+    ({'since': timestamp('2024-03-01T12:00:00'), 'until': timestamp('2024-03-02T12:00:00')}, [10.0, 50.0]),
+    ({'limit': 1}, [20.0]),
+])
+def test_search_returns_matches_newest_first(history, filters, expected_amounts):
+    rows = history.search(**filters)
+
+    assert [row['amount'] for row in rows] == expected_amounts
+
+
+def test_totals_per_pair_and_day(history):
+    rows = history.totals(source_currency='USD')
+
+    assert rows == [
+        {'day': '2024-03-02', 'source_currency': 'USD', 'target_currency': 'JPY', 'conversions': 1,
+         'amount': 10.0, 'converted_amount': 1500.0},
+        {'day': '2024-03-01', 'source_currency': 'USD', 'target_currency': 'EUR', 'conversions': 2,
+         'amount': 150.0, 'converted_amount': 138.0},
+    ]
+
+
+def test_totals_over_a_day_range(history):
+    rows = history.totals(target_currency='EUR', since_day='2024-03-02', by_day=False)
+
+    assert rows == [{'source_currency': 'GBP', 'target_currency': 'EUR', 'conversions': 1,
+                     'amount': 20.0, 'converted_amount': 23.4}]
+
+
+def test_handler_indexes_only_conversions(tmp_path):
+    history = ConversionHistory(str(tmp_path / 'conversions.sqlite3'))
+    handler = ConversionHistoryHandler(history, flush_records=2)
+    fields = {'event': 'conversion', 'source_currency': 'USD', 'target_currency': 'EUR',
+              'amount': '12.5', 'converted_amount': 11.5}
+
+    for extra in ({'fields': fields}, {'fields': {'event': 'error', 'exception_type': 'ValueError'}}, {}):
+        record = logging.LogRecord('test', logging.INFO, __file__, 1, 'message', None, None)
+        record.__dict__.update(extra)
+        handler.handle(record)
+    # Nothing is inserted until a batch is full or the handler is flushed
+    assert history.count() == 0
+
+    handler.flush()
+    rows = history.search()
+    history.close()
+
+    assert [(row['source_currency'], row['amount']) for row in rows] == [('USD', 12.5)]
+
+
+def test_import_logged_conversions_runs_once(tmp_path):
+    log_path = tmp_path / 'anwoo_log.log'
+    entries = [
+        {'time': '2024-03-01T09:00:00.120', 'level': 'INFO', 'event': 'conversion', 'source_currency': 'USD',
+         'target_currency': 'EUR', 'amount': 100.0, 'converted_amount': 92.0},
+        {'time': '2024-03-01T09:01:00.000', 'level': 'ERROR', 'event': 'error', 'exception_type': 'OSError'},
+    ]
+    log_path.write_text('\n'.join(map(json.dumps, entries)) + '\nplain text line\n', encoding='utf-8')
+    history = ConversionHistory(str(tmp_path / 'conversions.sqlite3'))
+
+    assert import_logged_conversions(history, str(log_path)) == 1
+    assert import_logged_conversions(history, str(log_path)) == 0
+    assert history.count() == 1
+    history.close()
+
+
+def test_import_reads_legacy_lines_and_skips_entries_without_a_pair(tmp_path):
+    log_path = tmp_path / 'anwoo_log.log'
+    (tmp_path / 'anwoo_log.log.1').write_text(
+        '2023-05-01 10:00:00,500 - INFO - USD to JPY, Amount:10.0 Converted: 1400.0\n'
+        '2023-05-01 10:00:05,000 - ERROR - Error: ValueError, Message: bad amount\n', encoding='utf-8')
+    log_path.write_text(json.dumps({'time': '2023-05-02T08:00:00.000', 'event': 'conversion', 'amount': 5.0})
+                        + '\n', encoding='utf-8')
+    history = ConversionHistory(str(tmp_path / 'conversions.sqlite3'))
+
+    assert import_logged_conversions(history, str(log_path)) == 1
+    assert [(row['source_currency'], row['amount']) for row in history.search()] == [('USD', 10.0)]
+    history.close()
+
+
+def test_logs_are_not_read_again_once_imported(tmp_path):
+    log_path = tmp_path / 'anwoo_log.log'
+    log_path.write_text('2023-05-01 10:00:00,500 - INFO - USD to JPY, Amount:10.0 Converted: 1400.0\n',
+                        encoding='utf-8')
+    db_path = str(tmp_path / 'conversions.sqlite3')
+    history = ConversionHistory(db_path)
+    assert import_logged_conversions(history, str(log_path)) == 1
+    history.close()
+
+    # The marker is stored with the history, a later run does not touch the logs at all
+    reopened = ConversionHistory(db_path)
+    with patch('pdf_report.read_logged_conversions', side_effect=AssertionError('log read again')):
+        assert import_logged_conversions(reopened, str(log_path)) == 0
+    assert reopened.count() == 1
+    reopened.close()
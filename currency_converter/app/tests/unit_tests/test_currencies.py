@@ -0,0 +1,62 @@
+import pytest
+from unittest.mock import Mock, patch
+from app.currencies import CurrencyRegistry, Currency, BUILTIN_CURRENCIES, _merge, get_registry, refresh_currencies
+
+
+@pytest.fixture
+def registry():
+    return CurrencyRegistry(BUILTIN_CURRENCIES)
+
+
+@pytest.mark.parametrize('currency, expected_result', [
+    ('USD', True),
+    ('CHF', True),
+    ('usd', False),
+    ('XYZ', False),
+    ('', False),
+])
+def test_validation(registry, currency, expected_result):
+    assert (currency in registry.codes) == expected_result
+
+
+def test_builtin_table_has_no_duplicates():
+    codes = [currency.code for currency in BUILTIN_CURRENCIES]
+    assert len(codes) == len(set(codes))
+
+
+@pytest.mark.parametrize('prefix, expected_codes', [
+    ('US', ['USD']),
+    ('sw', ['SEK', 'CHF']),
+    ('yen', ['JPY']),
+    ('', []),
+])
+def test_prefix_search(registry, prefix, expected_codes):
+    assert [currency.code for currency in registry.search(prefix)] == expected_codes
+
+
+def test_provider_currencies_extend_the_builtin_table():
+    provider = [Currency('XAU', 'Gold', 2), Currency('JPY', 'Japanese Yen', 2)]
+
+    registry = CurrencyRegistry(_merge(BUILTIN_CURRENCIES, provider))
+
+    assert 'XAU' in registry.codes
+    # The builtin minor units stay authoritative
+    assert registry.by_code['JPY'].minor_units == 0
+
+
+@pytest.mark.parametrize('response', [
+    # HTML error page served with a 200
+    Mock(status_code=200, json=Mock(side_effect=ValueError('Expecting value'))),
+    Mock(status_code=200, json=Mock(return_value={'data': ['EUR', 'USD']})),
+    Mock(status_code=200, json=Mock(return_value={'data': {'EUR': 'Euro'}})),
+    Mock(status_code=200, json=Mock(return_value=['EUR'])),
+])
+@patch('app.currencies.log_error')
+def test_malformed_currency_list_keeps_the_registry(mock_log_error, response):
+    registry = get_registry()
+
+    with patch('http_client.get', return_value=response):
+        assert refresh_currencies('api_key') is False
+
+    assert get_registry() is registry
+    assert mock_log_error.called
@@ -0,0 +1,62 @@
+import pytest
+from http.client import HTTPConnection
+from threading import Thread
+from unittest.mock import patch
+from app import daemon
+from app.daemon_client import DaemonClient
+
+RATES = {('USD', 'EUR'): 0.9, ('EUR', 'JPY'): 160.0}
+
+
+@pytest.fixture
+def client():
+    # Daemon on a free port, answering from fixed rates instead of the API
+    server = daemon.create_server('api_key', port=0)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    with patch.object(daemon.rate_table, 'get_rate',
+                      side_effect=lambda api_key, source, target: RATES.get((source, target))):
+        thread.start()
+        client = DaemonClient(port=server.server_address[1])
+        yield client
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_convert(client):
+    assert client.convert('USD', 'EUR', 100.0) == pytest.approx(90.0)
+    # The same connection serves the next request
+    assert client.convert('EUR', 'JPY', 2.0) == pytest.approx(320.0)
+
+
+def test_convert_many_keeps_order(client):
+    results = client.convert_many([('EUR', 'JPY', 1.0), ('USD', 'EUR', 10.0), ('USD', 'XYZ', 1.0)])
+
+    assert results[0] == pytest.approx(160.0)
+    assert results[1] == pytest.approx(9.0)
+    assert results[2] is None
+
+
+def test_invalid_currency_is_rejected(client):
+    with pytest.raises(ValueError):
+        client.convert('USD', 'XYZ', 1.0)
+
+
+def test_unreachable_daemon_raises():
+    client = DaemonClient(socket_path='/nonexistent/daemon.sock', timeout=0.5)
+
+    with pytest.raises(OSError):
+        client.convert('USD', 'EUR', 1.0)
+
+
+def test_metrics_are_served_as_prometheus_text(client):
+    client.convert('USD', 'EUR', 1.0)
+    connection = HTTPConnection(client.host, client.port)
+    connection.request('GET', '/metrics')
+    response = connection.getresponse()
+    text = response.read().decode()
+    connection.close()
+
+    assert response.status == 200
+    assert response.getheader('Content-Type').startswith('text/plain')
+    assert 'anwoo_stage_seconds_count{stage="rate_lookup"}' in text
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from decimal import Decimal
+from unittest.mock import patch
+from app.decimal_conversion import (ROUNDING_MODES, convert_exact, convert_minor_units, format_minor_units,
+                                    to_minor_units, to_rate)
+
+
+@pytest.mark.parametrize('amount, rate, target_currency, rounding, expected_result', [
+    ('100.00', 0.9127, 'EUR', 'half_even', Decimal('91.27')),
+    ('0.125', 1, 'USD', 'half_even', Decimal('0.12')),
+    ('0.125', 1, 'USD', 'half_up', Decimal('0.13')),
+    ('-0.125', 1, 'USD', 'half_up', Decimal('-0.13')),
+    ('100', 149.805, 'JPY', 'half_even', Decimal('14980')),
+    ('100', 149.805, 'JPY', 'ceiling', Decimal('14981')),
+    # 0.1 and 0.2 stay exact, float arithmetic would give 0.020000000000000004
+    (0.1, 0.2, 'USD', 'half_even', Decimal('0.02')),
+])
+def test_convert_exact(amount, rate, target_currency, rounding, expected_result):
+    assert convert_exact(amount, rate, target_currency, rounding) == expected_result
+
+
+@pytest.mark.parametrize('rounding', sorted(ROUNDING_MODES))
+@pytest.mark.parametrize('rate, source_currency, target_currency', [
+    (0.9127000165, 'USD', 'EUR'),
+    (149.805, 'USD', 'JPY'),
+    (0.0066752, 'JPY', 'USD'),
+    (2.5, 'USD', 'EUR'),
+])
+def test_vectorized_rounding_matches_decimal(rounding, rate, source_currency, target_currency):
+    generator = np.random.default_rng(0)
+    # Random amounts plus exact ties, on both sides of zero
+    minor = np.concatenate([generator.integers(-10 ** 8, 10 ** 8, 2000), np.arange(-50, 51)])
+
+    converted = convert_minor_units(minor, rate, source_currency, target_currency, rounding)
+
+    source_exponent = Decimal(1).scaleb(-2 if source_currency != 'JPY' else 0)
+    expected = [convert_exact(Decimal(value) * source_exponent, rate, target_currency, rounding)
+                for value in minor.tolist()]
+    # Compared as numbers, Decimal keeps a sign on zero ('-0.00') that integers cannot
+    assert [Decimal(text) for text in format_minor_units(converted, target_currency)] == expected
+
+
+def test_amounts_too_large_for_int64_fall_back_to_decimal():
+    minor = np.array([10 ** 17, 5], dtype=np.int64)
+
+    converted = convert_minor_units(minor, 0.9127000165, 'USD', 'EUR')
+
+    assert converted.tolist() == [91270001650000000, 5]
+
+
+def test_minor_units_round_trip():
+    minor = to_minor_units(['10.15', '0.1', '-0.05'], 'USD')
+
+    assert minor.tolist() == [1015, 10, -5]
+    assert format_minor_units(minor, 'USD') == ['10.15', '0.10', '-0.05']
+
+
+def test_long_cross_rates_stay_on_the_vectorized_path():
+    # A USD-pivot cross rate carries float noise down to the 15th digit
+    rate = 0.680522387872477
+    minor = to_minor_units([1000.0, 12345.67, 250000.0, 9999999.99], 'USD')
+
+    with patch('app.decimal_conversion._convert_minor_units_decimal') as mock_decimal:
+        converted = convert_minor_units(minor, rate, 'USD', 'EUR')
+
+    mock_decimal.assert_not_called()
+    # Both paths convert at the same rounded rate and agree
+    assert format_minor_units(converted, 'EUR') == [
+        str(convert_exact(amount, rate, 'EUR')) for amount in ['1000.00', '12345.67', '250000.00', '9999999.99']]
+
+
+def test_rates_are_rounded_to_significant_digits():
+    assert to_rate(0.680522387872477) == Decimal('0.6805223879')
+    assert to_rate(149.805) == Decimal('149.805')
+    assert to_rate(0) == 0
@@ -0,0 +1,98 @@
+import pytest
+from threading import Event
+from time import sleep
+from unittest.mock import patch
+from app.gui_worker import ConversionWorker
+
+
+class FakeRoot:
+    # Collects after() callbacks so the test can drive the "main loop" by hand
+    def __init__(self) -> None:
+        self.callbacks = []
+
+    def after(self, delay_ms, callback):
+        self.callbacks.append(callback)
+
+    def run_until_idle(self, worker, timeout=2.0):
+        waited = 0.0
+        while self.callbacks and waited < timeout:
+            callback = self.callbacks.pop(0)
+            sleep(0.01)
+            waited += 0.01
+            callback()
+
+
+@pytest.fixture
+def root():
+    return FakeRoot()
+
+
+def test_result_is_delivered_on_the_main_loop(root):
+    busy_states = []
+    results = []
+    worker = ConversionWorker(root, on_busy_change=busy_states.append)
+
+    worker.submit(lambda amount: amount * 0.9, 100, on_done=results.append)
+    root.run_until_idle(worker)
+
+    assert results == [pytest.approx(90.0)]
+    assert busy_states == [True, False]
+
+
+def test_stale_results_are_suppressed(root):
+    release = Event()
+    results = []
+    worker = ConversionWorker(root)
+
+    # The first conversion is still running when the second one is fired
+    worker.submit(lambda: release.wait() and 'first', on_done=results.append, channel='convert')
+    worker.submit(lambda: 'second', on_done=results.append, channel='convert')
+    release.set()
+    root.run_until_idle(worker)
+
+    assert results == ['second']
+    assert worker.suppressed == 1
+
+
+def test_cancelled_work_is_not_delivered(root):
+    release = Event()
+    results = []
+    worker = ConversionWorker(root)
+
+    worker.submit(lambda: release.wait(), on_done=results.append, channel='convert')
+    worker.cancel('convert')
+    release.set()
+    root.run_until_idle(worker)
+
+    assert results == []
+    assert not worker.busy
+
+
+def test_errors_go_to_the_error_callback(root):
+    errors = []
+    worker = ConversionWorker(root)
+
+    worker.submit(lambda: 1 / 0, on_done=lambda result: None, on_error=errors.append)
+    root.run_until_idle(worker)
+
+    assert isinstance(errors[0], ZeroDivisionError)
+
+
+@patch('app.gui_worker.log_error')
+def test_failing_callback_does_not_stop_polling(mock_log_error, root):
+    busy_states = []
+    results = []
+    worker = ConversionWorker(root, on_busy_change=busy_states.append)
+
+    def broken_callback(result):
+        raise RuntimeError('widget destroyed')
+
+    worker.submit(lambda: 'first', on_done=broken_callback, channel='first')
+    worker.submit(lambda: 'second', on_done=results.append, channel='second')
+    root.run_until_idle(worker)
+
+    # The second result still arrives and the worker goes idle
+    assert results == ['second']
+    assert not worker.busy
+    assert busy_states[-1] is False
+    assert mock_log_error.call_args[0] == ('RuntimeError', 'widget destroyed')
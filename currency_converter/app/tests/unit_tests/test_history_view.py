@@ -0,0 +1,18 @@
+import pytest
+from unittest.mock import patch
+from app.history_view import load_history
+
+
+@pytest.mark.parametrize('import_logs, imports', [(True, 1), (False, 0)])
+@patch('conversion_history.conversion_history')
+@patch('conversion_history.import_logged_conversions')
+@patch('app.history_view.flush_logs')
+def test_only_the_first_query_imports_the_logs(mock_flush_logs, mock_import, mock_history, import_logs, imports):
+    mock_history.search.return_value = []
+
+    load_history('USD', None, None, totals=False, import_logs=import_logs)
+
+    # Queued conversions are flushed on every refresh, the logs are only read when the window opens
+    mock_flush_logs.assert_called_once_with()
+    assert mock_import.call_count == imports
+    mock_history.search.assert_called_once()
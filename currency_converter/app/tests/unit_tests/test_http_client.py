@@ -0,0 +1,135 @@
+import pytest
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from time import sleep
+from unittest.mock import patch
+from app.http_client import HttpClient, CircuitBreaker, CircuitOpenError
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Statuses returned in order, the last one repeats
+    statuses = [200]
+    # Seconds to stall before answering
+    delay = 0.0
+    calls = 0
+
+    def do_GET(self):
+        cls = type(self)
+        status = cls.statuses[min(cls.calls, len(cls.statuses) - 1)]
+        cls.calls += 1
+        sleep(cls.delay)
+
+        body = b'{"data": {"EUR": 0.9}}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        # Keep the test output quiet
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    # Fresh handler class per test so scripted statuses do not leak
+    handler = type('Handler', (StubHandler,), {'statuses': [200], 'delay': 0.0, 'calls': 0})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+
+    yield handler, f'http://127.0.0.1:{server.server_port}/v1/latest'
+
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(**kwargs):
+    # Never actually sleep between retries
+    return HttpClient(sleep_function=lambda seconds: None, **kwargs)
+
+
+@pytest.mark.parametrize('statuses, expected_status, expected_calls', [
+    ([200], 200, 1),
+    ([503, 429, 200], 200, 3),
+    ([500, 500, 500, 500, 500], 500, 4),
+    ([404], 404, 1),
+])
+def test_get_retries_retryable_statuses(stub_server, statuses, expected_status, expected_calls):
+    handler, url = stub_server
+    handler.statuses = statuses
+    client = make_client(max_retries=3)
+
+    response = client.get(url)
+
+    assert response.status_code == expected_status
+    assert handler.calls == expected_calls
+
+
+def test_read_timeout_is_enforced(stub_server):
+    handler, url = stub_server
+    handler.delay = 0.5
+    client = make_client(read_timeout=0.1, max_retries=1)
+
+    with pytest.raises(requests.exceptions.Timeout):
+        client.get(url)
+
+    assert client.stats()['retries'] == 1
+
+
+def test_open_circuit_fails_fast(stub_server):
+    handler, url = stub_server
+    handler.statuses = [503]
+    client = make_client(max_retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+
+    # Two failed calls open the circuit
+    client.get(url)
+    client.get(url)
+
+    # The third call never reaches the server
+    with pytest.raises(CircuitOpenError):
+        client.get(url)
+
+    assert handler.calls == 2
+    assert client.stats()['circuit'] == CircuitBreaker.OPEN
+
+
+def test_circuit_closes_after_successful_trial():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+
+    assert not breaker.allow()
+
+    # After the reset timeout one trial call is allowed
+    now[0] = 11
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.parametrize('error', [
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ContentDecodingError,
+    requests.exceptions.TooManyRedirects,
+])
+def test_failed_trial_reopens_the_circuit_whatever_the_error(error):
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    now[0] = 11
+    client = make_client(breaker=breaker)
+
+    with patch.object(client.session, 'get', side_effect=error('broken response')) as mock_get:
+        with pytest.raises(error):
+            client.get('http://127.0.0.1:9/v1/latest')
+
+    # Not retried, and the circuit is open again instead of stuck half-open
+    assert mock_get.call_count == 1
+    assert breaker.state == CircuitBreaker.OPEN
+    # After the next reset timeout another trial is allowed
+    now[0] = 22
+    assert breaker.allow()
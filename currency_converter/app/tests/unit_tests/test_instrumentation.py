@@ -0,0 +1,57 @@
+import json
+import pytest
+from app.instrumentation import Histogram, Metrics
+
+
+@pytest.mark.parametrize('q, expected', [
+    (0.5, 0.01),
+    (0.9, 0.1),
+    (1.0, float('inf')),
+])
+def test_histogram_quantile_is_the_bucket_bound(q, expected):
+    histogram = Histogram(buckets=(0.001, 0.01, 0.1))
+    for value in [0.0005] * 4 + [0.005] * 4 + [0.05] + [5.0]:
+        histogram.observe(value)
+
+    assert histogram.quantile(q) == expected
+    assert histogram.count == 10
+
+
+def test_stage_records_time_spent():
+    metrics = Metrics()
+    for _ in range(3):
+        with metrics.stage('parse'):
+            pass
+
+    stage = metrics.snapshot()['stages']['parse']
+    assert stage['count'] == 3
+    assert stage['sum_seconds'] >= 0
+
+
+def test_prometheus_export():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.observe('http', 0.05)
+    metrics.observe('http', 0.5)
+    metrics.increment('provider_requests', provider='stub', outcome='ok')
+    metrics.increment('provider_requests', provider='stub', outcome='ok')
+    metrics.add_collector('rate_cache', lambda: {'hits': 7, 'circuit': 'closed'})
+
+    lines = metrics.to_prometheus().splitlines()
+
+    assert 'anwoo_stage_seconds_bucket{stage="http",le="0.1"} 1' in lines
+    assert 'anwoo_stage_seconds_bucket{stage="http",le="1"} 2' in lines
+    assert 'anwoo_stage_seconds_bucket{stage="http",le="+Inf"} 2' in lines
+    assert 'anwoo_stage_seconds_count{stage="http"} 2' in lines
+    assert 'anwoo_provider_requests_total{outcome="ok",provider="stub"} 2' in lines
+    assert 'anwoo_rate_cache_hits 7' in lines
+    # Text values are not gauges
+    assert not any('circuit' in line for line in lines)
+
+
+def test_json_export_and_disabled_metrics():
+    metrics = Metrics(enabled=False)
+    with metrics.stage('convert'):
+        pass
+    metrics.increment('connections_opened')
+
+    assert json.loads(metrics.to_json()) == {'stages': {}, 'counters': {}, 'gauges': {}}
@@ -0,0 +1,202 @@
+import pytest
+from threading import Event
+from time import sleep
+from unittest.mock import patch
+from app.gui_worker import ConversionWorker
+from app.live_result import LiveResult, LIVE_DEBOUNCE_MS
+
+
+class FakeVar:
+    # Minimal StringVar, write traces fire synchronously like Tk's
+    def __init__(self, value='') -> None:
+        self.value = value
+        self.traces = []
+
+    def get(self):
+        return self.value
+
+    def set(self, value) -> None:
+        self.value = value
+        for trace in self.traces:
+            trace()
+
+    def trace_add(self, mode, callback) -> None:
+        self.traces.append(callback)
+
+
+class FakeRoot:
+    # Collects after() callbacks so the test can drive the "main loop" by hand, ids allow cancelling
+    def __init__(self) -> None:
+        self.callbacks = []
+        self.delays = []
+
+    def after(self, delay_ms, callback):
+        self.delays.append(delay_ms)
+        self.callbacks.append(callback)
+        return callback
+
+    def after_cancel(self, after_id) -> None:
+        self.callbacks.remove(after_id)
+
+    def run_until_idle(self, timeout=2.0):
+        waited = 0.0
+        while self.callbacks and waited < timeout:
+            callback = self.callbacks.pop(0)
+            sleep(0.01)
+            waited += 0.01
+            callback()
+
+
+class FakeWorker:
+    # Records submitted lookups, the test delivers them by hand
+    def __init__(self) -> None:
+        self.submitted = []
+
+    def submit(self, function, *args, on_done=None, on_error=None, channel=None):
+        self.submitted.append((args, on_done, channel))
+
+
+@pytest.fixture
+def root():
+    return FakeRoot()
+
+
+@pytest.fixture
+def worker():
+    return FakeWorker()
+
+
+def make_live_result(root, worker, amount='100', source='USD', target='EUR'):
+    variables = {
+        'amount': FakeVar(amount), 'source': FakeVar(source), 'target': FakeVar(target), 'result': FakeVar(),
+    }
+    LiveResult(root, worker, FakeVar('api_key'), variables['source'], variables['target'], variables['amount'],
+               variables['result'], lambda currency: len(currency) == 3)
+    return variables
+
+
+@patch('app.live_result.get_cached_exchange_rate', return_value=None)
+def test_quick_currency_changes_make_one_lookup(mock_cached, root, worker):
+    variables = make_live_result(root, worker)
+
+    # Typing 'GBP' one letter at a time, then switching the target
+    for source in ('G', 'GB', 'GBP'):
+        variables['source'].set(source)
+    variables['target'].set('JPY')
+    root.run_until_idle()
+
+    assert root.delays == [LIVE_DEBOUNCE_MS] * 4
+    assert [(args, channel) for args, on_done, channel in worker.submitted] == [
+        (('api_key', 'GBP', 'JPY'), 'rate')]
+
+
+@patch('app.live_result.get_cached_exchange_rate', return_value=None)
+def test_amount_edits_recompute_without_a_lookup(mock_cached, root, worker):
+    variables = make_live_result(root, worker)
+    variables['source'].set('USD')
+    root.run_until_idle()
+    args, on_done, channel = worker.submitted[0]
+    on_done(0.9)
+
+    variables['amount'].set('250')
+
+    assert variables['result'].get() == '250.0 USD = 225.00000 EUR'
+    # Neither a new lookup nor a debounce timer
+    assert len(worker.submitted) == 1
+    assert root.callbacks == []
+    assert mock_cached.call_count == 1
+
+
+@patch('app.live_result.get_cached_exchange_rate', return_value=0.9)
+def test_cached_rates_are_applied_without_the_worker(mock_cached, root, worker):
+    variables = make_live_result(root, worker)
+    variables['target'].set('EUR')
+    root.run_until_idle()
+
+    assert variables['result'].get() == '100.0 USD = 90.00000 EUR'
+    assert worker.submitted == []
+
+
+@patch('app.live_result.get_cached_exchange_rate', return_value=None)
+def test_rate_of_a_previous_pair_is_not_applied(mock_cached, root, worker):
+    variables = make_live_result(root, worker)
+    variables['target'].set('EUR')
+    root.run_until_idle()
+    worker.submitted[0][1](0.9)
+
+    # The pair changes, an amount edit before the new rate arrives must not reuse the old one
+    variables['target'].set('GBP')
+    variables['amount'].set('200')
+
+    assert variables['result'].get() == '100.0 USD = 90.00000 EUR'
+
+
+@patch('app.live_result.get_cached_exchange_rate', return_value=None)
+def test_superseded_lookup_result_is_dropped(mock_cached, root):
+    release = Event()
+    worker = ConversionWorker(root)
+    variables = make_live_result(root, worker)
+
+    def get_exchange_rate(api_key, source_currency, target_currency):
+        # The EUR lookup is slow, the GBP one answers straight away
+        if target_currency == 'EUR':
+            release.wait()
+            return 0.9
+        return 0.8
+
+    with patch('app.live_result.get_exchange_rate', side_effect=get_exchange_rate):
+        variables['target'].set('EUR')
+        root.callbacks.pop(0)()
+        # A newer lookup for another pair is fired while the first one is still running
+        variables['target'].set('GBP')
+        root.callbacks.pop()()
+        release.set()
+        root.run_until_idle()
+
+    assert variables['result'].get() == '100.0 USD = 80.00000 GBP'
+    assert worker.suppressed == 1
+
+
+@pytest.mark.parametrize('lookup, logged_errors', [
+    (lambda *args: None, 0),
+    (lambda *args: 1 / 0, 1),
+])
+@patch('app.live_result.log_error')
+@patch('app.live_result.get_cached_exchange_rate', return_value=None)
+def test_failed_lookup_replaces_the_fetching_text(mock_cached, mock_log_error, root, lookup, logged_errors):
+    worker = ConversionWorker(root)
+    variables = make_live_result(root, worker)
+
+    with patch('app.live_result.get_exchange_rate', side_effect=lookup):
+        variables['target'].set('EUR')
+        root.callbacks.pop(0)()
+        assert variables['result'].get() == 'Fetching rate...'
+        root.run_until_idle()
+
+    assert variables['result'].get() == 'Failed to fetch exchange rate'
+    # Only the raised error is logged, a missing rate was already logged by the lookup
+    assert mock_log_error.call_count == logged_errors
+
+
+@patch('app.live_result.get_cached_exchange_rate', return_value=None)
+def test_error_of_a_superseded_lookup_is_dropped(mock_cached, root):
+    release = Event()
+    worker = ConversionWorker(root)
+    variables = make_live_result(root, worker)
+
+    def get_exchange_rate(api_key, source_currency, target_currency):
+        # The EUR lookup fails late, after the GBP one has answered
+        if target_currency == 'EUR':
+            release.wait()
+            raise ConnectionError('timed out')
+        return 0.8
+
+    with patch('app.live_result.get_exchange_rate', side_effect=get_exchange_rate):
+        variables['target'].set('EUR')
+        root.callbacks.pop(0)()
+        variables['target'].set('GBP')
+        root.callbacks.pop()()
+        release.set()
+        root.run_until_idle()
+
+    assert variables['result'].get() == '100.0 USD = 80.00000 GBP'
@@ -0,0 +1,29 @@
+import json
+import subprocess
+import sys
+from os import environ, path
+
+APP_DIR = path.dirname(path.dirname(path.dirname(path.abspath(__file__))))
+
+# Runs in a fresh interpreter, the logging set-up is process-wide and happens once
+HOST_PROCESS = '''
+import logging
+logging.basicConfig(level=logging.INFO)
+import logs
+logging.getLogger('urllib3').info('third-party record')
+logs.log_conversion('USD', 'EUR', 100, 91.0)
+logs.stop_logging()
+logs.stop_logging()
+'''
+
+
+def test_conversions_are_logged_when_the_host_configured_the_root_logger(tmp_path):
+    subprocess.run([sys.executable, '-c', HOST_PROCESS], cwd=APP_DIR, check=True, capture_output=True,
+                   env={**environ, 'HOME': str(tmp_path), 'USERPROFILE': str(tmp_path)})
+
+    with open(tmp_path / '.anwoo' / 'anwoo_log.log', encoding='utf-8') as log_file:
+        entries = [json.loads(line) for line in log_file]
+
+    # Our record reaches the file and the history, the host's own records stay out of both
+    assert [entry['event'] for entry in entries] == ['conversion']
+    assert (tmp_path / '.anwoo' / 'conversions.sqlite3').exists()
@@ -0,0 +1,161 @@
+import pytest
+from time import sleep
+from unittest.mock import patch
+from app.gui_worker import ConversionWorker
+from app.multi_target_panel import MultiTargetPanel, DEBOUNCE_MS
+
+RATES = {'EUR': 0.9, 'GBP': 0.8, 'JPY': 150.0}
+
+
+class FakeRoot:
+    # Collects after() callbacks so the test can drive the "main loop" by hand, ids allow cancelling
+    def __init__(self) -> None:
+        self.callbacks = []
+
+    def after(self, delay_ms, callback):
+        self.callbacks.append(callback)
+        return callback
+
+    def after_cancel(self, after_id) -> None:
+        self.callbacks.remove(after_id)
+
+    def run_until_idle(self, timeout=2.0):
+        waited = 0.0
+        while self.callbacks and waited < timeout:
+            callback = self.callbacks.pop(0)
+            sleep(0.01)
+            waited += 0.01
+            callback()
+
+
+class FakeVar:
+    # Minimal StringVar, write traces fire synchronously like Tk's and every set() is counted
+    def __init__(self, master=None, value='') -> None:
+        self.value = value
+        self.traces = []
+        self.writes = 0
+
+    def get(self):
+        return self.value
+
+    def set(self, value) -> None:
+        self.value = value
+        self.writes += 1
+        for trace in self.traces:
+            trace()
+
+    def trace_add(self, mode, callback) -> None:
+        self.traces.append(callback)
+
+
+class FakeWidget:
+    # Stands in for Frame, Label and Entry, so no display is needed; the frame's after() is the root's
+    root = None
+
+    def __init__(self, master=None, **options) -> None:
+        self.options = options
+        self.destroyed = False
+
+    def grid(self, **options) -> None:
+        self.options['grid'] = options
+
+    def destroy(self) -> None:
+        self.destroyed = True
+
+    def after(self, delay_ms, callback):
+        assert delay_ms == DEBOUNCE_MS
+        return self.root.after(delay_ms, callback)
+
+    def after_cancel(self, after_id) -> None:
+        self.root.after_cancel(after_id)
+
+
+@pytest.fixture
+def root():
+    root = FakeRoot()
+    with patch.object(FakeWidget, 'root', root), \
+            patch.multiple('app.multi_target_panel', Frame=FakeWidget, Label=FakeWidget, Entry=FakeWidget,
+                           StringVar=FakeVar):
+        yield root
+
+
+@pytest.fixture
+def get_exchange_rates():
+    with patch('app.multi_target_panel.get_exchange_rates',
+               side_effect=lambda api_key, source, targets: {target: RATES[target] for target in targets}) \
+            as mock_rates:
+        yield mock_rates
+
+
+def make_panel(root, worker=None):
+    amount_var, source_currency_var = FakeVar(value='100'), FakeVar(value='USD')
+    panel = MultiTargetPanel(None, worker or ConversionWorker(root), FakeVar(value='api_key'),
+                             source_currency_var, amount_var, lambda currency: len(currency) == 3)
+    return panel, amount_var, source_currency_var
+
+
+def row_values(panel):
+    return {target: value_var.get() for target, (code_label, value_label, value_var) in panel._rows.items()}
+
+
+def test_fan_out_makes_one_rates_call(root, get_exchange_rates):
+    panel, amount_var, source_currency_var = make_panel(root)
+
+    # Typing the list one keystroke at a time is debounced into a single lookup
+    for targets in ('EUR', 'EUR, GBP', 'EUR, GBP, JPY'):
+        panel.targets_var.set(targets)
+    root.run_until_idle()
+
+    get_exchange_rates.assert_called_once_with('api_key', 'USD', ['EUR', 'GBP', 'JPY'])
+    assert row_values(panel) == {'EUR': '90.00000', 'GBP': '80.00000', 'JPY': '15000.00000'}
+
+
+class ManualWorker:
+    # Holds submitted lookups until the test delivers them
+    def __init__(self) -> None:
+        self.submitted = []
+
+    def submit(self, function, *args, on_done=None, on_error=None, channel=None):
+        self.submitted.append(on_done)
+
+
+def test_rows_fill_in_when_the_rates_arrive(root):
+    worker = ManualWorker()
+    panel, amount_var, source_currency_var = make_panel(root, worker)
+    panel.targets_var.set('EUR GBP')
+    root.run_until_idle()
+
+    # Rows exist straight away, with a placeholder until the lookup answers
+    assert row_values(panel) == {'EUR': '-', 'GBP': '-'}
+
+    worker.submitted[0]({'EUR': 0.9, 'GBP': None})
+    assert row_values(panel) == {'EUR': '90.00000', 'GBP': '-'}
+
+    # A new amount is applied to the rates already fetched, nothing new is submitted
+    amount_var.set('10')
+    assert row_values(panel) == {'EUR': '9.00000', 'GBP': '-'}
+    assert len(worker.submitted) == 1
+
+
+def test_changing_targets_only_touches_their_own_rows(root, get_exchange_rates):
+    panel, amount_var, source_currency_var = make_panel(root)
+    panel.targets_var.set('EUR, GBP, JPY')
+    root.run_until_idle()
+    rows = dict(panel._rows)
+    writes = {target: value_var.writes for target, (code_label, value_label, value_var) in rows.items()}
+
+    # Removing GBP destroys its row only
+    panel.targets_var.set('EUR, JPY')
+    root.run_until_idle()
+    assert rows['GBP'][0].destroyed and rows['GBP'][1].destroyed
+    assert panel._rows == {'EUR': rows['EUR'], 'JPY': rows['JPY']}
+
+    # Re-adding it creates a new row, the others keep their widgets and values
+    panel.targets_var.set('EUR, GBP, JPY')
+    root.run_until_idle()
+    assert panel._rows['GBP'] is not rows['GBP']
+    assert panel._rows['EUR'] is rows['EUR'] and panel._rows['JPY'] is rows['JPY']
+    assert row_values(panel)['GBP'] == '80.00000'
+    for target in ('EUR', 'JPY'):
+        assert not rows[target][0].destroyed
+        assert rows[target][2].writes == writes[target]
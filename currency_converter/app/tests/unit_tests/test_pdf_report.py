@@ -0,0 +1,41 @@
+import io
+import json
+import pytest
+from app.pdf_report import read_logged_conversions, write_conversion_report
+
+pytest.importorskip('reportlab')
+
+
+def test_report_spans_pages_in_one_pass():
+    conversions = ({'time': f'2024-01-01T00:00:{index % 60:02d}', 'source_currency': 'USD',
+                    'target_currency': 'EUR', 'amount': index, 'converted_amount': index * 0.9}
+                   for index in range(1000))
+    output = io.BytesIO()
+
+    count = write_conversion_report(output, conversions)
+
+    assert count == 1000
+    pdf = output.getvalue()
+    assert pdf.startswith(b'%PDF')
+    # 1000 rows do not fit on one page
+    assert pdf.count(b'/Type /Page\n') > 1
+
+
+def test_read_logged_conversions_includes_rotated_files(tmp_path):
+    log_path = tmp_path / 'anwoo_log.log'
+    (tmp_path / 'anwoo_log.log.1').write_text(
+        json.dumps({'event': 'conversion', 'amount': 1}) + '\n' +
+        json.dumps({'event': 'error', 'exception_type': 'ValueError'}) + '\n')
+    log_path.write_text(
+        '2023-01-01 00:00:00,250 - INFO - USD to EUR, Amount:5 Converted: 4.5\n' +
+        '2023-01-01 00:00:01,000 - ERROR - Error: ValueError, Message: bad amount\n' +
+        json.dumps({'event': 'conversion', 'amount': 2}) + '\n')
+
+    conversions = list(read_logged_conversions(str(log_path)))
+
+    # Oldest file first, conversions logged before the JSON format included, errors skipped
+    assert [conversion['amount'] for conversion in conversions] == [1, 5.0, 2]
+    assert conversions[1] == {'time': '2023-01-01T00:00:00.250', 'level': 'INFO',
+                              'message': 'USD to EUR, Amount:5 Converted: 4.5', 'event': 'conversion',
+                              'source_currency': 'USD', 'target_currency': 'EUR', 'amount': 5.0,
+                              'converted_amount': 4.5}
@@ -0,0 +1,67 @@
+from datetime import date, datetime
+import pytest
+from app.conversion_history import ConversionHistory
+from app.prefetch import Prefetcher, plan_tables, predict_pairs
+
+
+def timestamp(text):
+    return datetime.strptime(text, '%Y-%m-%dT%H:%M:%S').timestamp()
+
+
+CONVERSIONS = [
+    (timestamp('2024-03-01T09:00:00'), 'USD', 'EUR', 100.0, 92.0),
+    (timestamp('2024-03-01T17:30:00'), 'USD', 'EUR', 50.0, 46.0),
+    (timestamp('2024-03-02T08:15:00'), 'EUR', 'GBP', 10.0, 8.6),
+    (timestamp('2024-03-02T09:15:00'), 'EUR', 'GBP', 10.0, 8.6),
+    (timestamp('2024-03-02T10:15:00'), 'EUR', 'GBP', 10.0, 8.6),
+    (timestamp('2024-03-02T12:00:00'), 'USD', 'JPY', 20.0, 3000.0),
+    # Outside a seven day window ending on 2024-03-02
+    (timestamp('2024-02-01T12:00:00'), 'CHF', 'SEK', 1.0, 12.0),
+    (timestamp('2024-02-01T13:00:00'), 'CHF', 'SEK', 1.0, 12.0),
+    (timestamp('2024-02-01T14:00:00'), 'CHF', 'SEK', 1.0, 12.0),
+    (timestamp('2024-02-01T15:00:00'), 'CHF', 'SEK', 1.0, 12.0),
+]
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = ConversionHistory(str(tmp_path / 'conversions.sqlite3'))
+    history.add_many(CONVERSIONS)
+    yield history
+    history.close()
+
+
+def test_most_frequent_recent_pairs_are_predicted(history):
+    pairs = predict_pairs(history, days=7, limit=2, today=date(2024, 3, 2))
+
+    assert pairs == [('EUR', 'GBP'), ('USD', 'EUR')]
+
+
+@pytest.mark.parametrize('pairs, expected', [
+    ([], []),
+    # One source, its own table answers every pair directly
+    ([('EUR', 'GBP'), ('EUR', 'USD')], ['EUR']),
+    # Several sources, the pivot table answers them all as cross rates
+    ([('EUR', 'GBP'), ('USD', 'JPY')], ['USD']),
+])
+def test_one_table_is_planned(pairs, expected):
+    assert plan_tables(pairs, 'USD') == expected
+
+
+def test_prefetch_fetches_the_planned_table_and_reports_the_hit_rate(history):
+    fetched = []
+    prefetcher = Prefetcher(history, days=10000, limit=3,
+                            get_table=lambda api_key, base_currency: fetched.append(base_currency) or {})
+
+    assert prefetcher.start('api_key').join(timeout=5) is None
+    assert fetched == ['USD']
+
+    prefetcher.record('EUR', 'GBP')
+    prefetcher.record('USD', 'EUR')
+    prefetcher.record('GBP', 'CAD')
+    prefetcher.record('EUR', 'GBP')
+
+    stats = prefetcher.stats()
+    assert stats['pairs'] == ['CHF->SEK', 'EUR->GBP', 'USD->EUR']
+    assert stats['tables_fetched'] == 1
+    assert (stats['conversions'], stats['hits'], stats['hit_rate']) == (4, 3, 0.75)
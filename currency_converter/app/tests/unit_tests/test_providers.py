@@ -0,0 +1,236 @@
+import gzip
+import json
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Thread
+from app.http_client import HttpClient
+from app.providers import FreeCurrencyApiProvider, OpenExchangeRatesProvider, ProviderPool, RateProvider
+from app.quota import ApiKeyPool
+
+
+class FakeProvider(RateProvider):
+    # Answers after 'delay' seconds with 'table', None stands for a failed request
+    def __init__(self, name, table, delay=0.0):
+        super().__init__()
+        self.name = name
+        self.table = table
+        self.delay = delay
+        self.calls = 0
+        self.released = Event()
+
+    def fetch_table(self, api_key, base_currency, date=None):
+        self.calls += 1
+        self.released.wait(self.delay)
+        return self.table
+
+
+def test_measured_provider_is_preferred():
+    slow = FakeProvider('slow', {'EUR': 0.9}, delay=0.05)
+    fast = FakeProvider('fast', {'EUR': 0.91})
+    pool = ProviderPool([slow, fast], hedge_delay=None)
+
+    # The slow provider fails once, the one that answered is measured and ranks first from then on
+    slow.table = None
+    assert pool.fetch_table('api_key', 'USD') == {'EUR': 0.91}
+    slow.table = {'EUR': 0.9}
+    assert pool.ranked() == [fast, slow]
+    assert pool.fetch_table('api_key', 'USD') == {'EUR': 0.91}
+    assert slow.calls == 1
+
+
+def test_slow_provider_is_hedged():
+    slow = FakeProvider('slow', {'EUR': 0.9}, delay=5.0)
+    fast = FakeProvider('fast', {'EUR': 0.91})
+    pool = ProviderPool([slow, fast], hedge_delay=0.02)
+
+    assert pool.fetch_table('api_key', 'USD') == {'EUR': 0.91}
+    assert pool.stats()['hedged'] == 1
+    assert pool.stats()['providers']['fast']['wins'] == 1
+    slow.released.set()
+
+
+def test_failed_provider_fails_over_without_waiting():
+    broken = FakeProvider('broken', None)
+    backup = FakeProvider('backup', {'EUR': 0.9})
+    pool = ProviderPool([broken, backup], hedge_delay=10.0)
+
+    assert pool.fetch_table('api_key', 'USD') == {'EUR': 0.9}
+    stats = pool.stats()
+    assert stats['failovers'] == 1
+    assert stats['providers']['broken']['errors'] == 1
+    # The failing provider now ranks last
+    assert pool.ranked() == [backup, broken]
+
+
+def test_every_provider_failing_returns_none():
+    pool = ProviderPool([FakeProvider('a', None), FakeProvider('b', None)], hedge_delay=0.01)
+
+    assert pool.fetch_table('api_key', 'USD') is None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    payload = {}
+    status = 200
+    calls = 0
+
+    def do_GET(self):
+        type(self).calls += 1
+        body = json.dumps(type(self).payload).encode()
+        self.send_response(type(self).status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    StubHandler.calls = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}/latest'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize('provider_class, payload, base_currency, expected_table', [
+    (FreeCurrencyApiProvider, {'data': {'EUR': 0.9, 'USD': 1.0}}, 'USD', {'EUR': 0.9, 'USD': 1.0}),
+    (OpenExchangeRatesProvider, {'rates': {'USD': 1.0, 'CAD': 1.33}}, 'USD', {'USD': 1.0, 'CAD': 1.33}),
+    # USD-quoted table rebased onto EUR
+    (OpenExchangeRatesProvider, {'rates': {'USD': 1.0, 'EUR': 0.5}}, 'EUR', {'USD': 2.0, 'EUR': 1.0}),
+    # Unexpected shape counts as a failure
+    (OpenExchangeRatesProvider, {'error': True}, 'USD', None),
+])
+def test_adapters_parse_responses(stub_url, provider_class, payload, base_currency, expected_table):
+    StubHandler.payload = payload
+    provider = provider_class(client=HttpClient(max_retries=0))
+    provider.url = stub_url
+
+    assert provider.fetch_table('api_key', base_currency) == expected_table
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload, headers):
+        self.status_code = status_code
+        self.headers = headers
+        self.text = json.dumps(payload)
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class ThrottlingClient:
+    # Throttles 'throttled_key', answers every other key
+    def __init__(self, throttled_key):
+        self.throttled_key = throttled_key
+        self.keys = []
+        self.retry_statuses = []
+
+    def get(self, url, headers=None, params=None, retry_statuses=None):
+        key = headers['apikey']
+        self.retry_statuses.append(retry_statuses)
+        self.keys.append(key)
+        if key == self.throttled_key:
+            return FakeResponse(429, {'message': 'rate limited'}, {'Retry-After': '60'})
+        return FakeResponse(200, {'data': {'EUR': 0.9}}, {'X-RateLimit-Remaining-Quota-Month': '100'})
+
+
+def test_throttled_key_is_rotated_out_of_the_pool():
+    client = ThrottlingClient('first_key_1')
+    pool = ApiKeyPool(['first_key_1', 'second_key_2'])
+    provider = FreeCurrencyApiProvider(client=client, key_pool=pool)
+
+    assert provider.fetch_table('caller_key', 'USD') == {'EUR': 0.9}
+    # Another base currency, the USD table is still fresh and would not be requested again
+    assert provider.fetch_table('caller_key', 'GBP') == {'EUR': 0.9}
+    # The caller's key is never sent, and the throttled key rests after its 429
+    assert client.keys == ['first_key_1', 'second_key_2', 'second_key_2']
+    # The client never retries a 429 on the same key
+    assert all(429 not in statuses for statuses in client.retry_statuses)
+
+
+def test_pooled_key_429_is_not_retried_by_the_client(stub_url):
+    StubHandler.status = 429
+    StubHandler.payload = {'message': 'rate limited'}
+    pool = ApiKeyPool(['first_key_1', 'second_key_2'], max_wait=0)
+    client = HttpClient(sleep_function=lambda seconds: None)
+    provider = FreeCurrencyApiProvider(client=client, key_pool=pool)
+    provider.url = stub_url
+
+    try:
+        assert provider.fetch_table('caller_key', 'USD') is None
+    finally:
+        StubHandler.status = 200
+
+    # One request per key, both rested by the pool, no client retries in between
+    assert client.stats()['retries'] == 0
+    assert StubHandler.calls == 2
+
+
+class ConditionalHandler(BaseHTTPRequestHandler):
+    # Answers with a gzipped table and an ETag, 304 when the client already has it
+    protocol_version = 'HTTP/1.1'
+    etag = '"v1"'
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('ETag', self.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = json.dumps({'data': {f'C{index:02d}': 1.0 + index for index in range(100)}}).encode()
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_response(200)
+            self.send_header('Content-Encoding', 'gzip')
+        else:
+            self.send_response(200)
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_unchanged_table_is_revalidated_not_downloaded():
+    ConditionalHandler.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ConditionalHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    provider = FreeCurrencyApiProvider(client=HttpClient(max_retries=0))
+    provider.url = f'http://127.0.0.1:{server.server_port}/latest'
+
+    try:
+        first = provider.fetch_table('api_key', 'USD')
+        second = provider.fetch_table('api_key', 'USD')
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert first == second and len(first) == 100
+    assert ConditionalHandler.requests[1]['If-None-Match'] == '"v1"'
+    transfer = provider.stats()['transfer']
+    assert (transfer['full_responses'], transfer['not_modified']) == (1, 1)
+    # Compressed on the wire, and the 304 carried no body at all
+    assert transfer['wire_bytes'] < transfer['body_bytes']
+    assert transfer['saved_bytes'] > transfer['body_bytes']
+
+
+def test_table_without_validators_is_reused_for_the_fallback_ttl():
+    client = ThrottlingClient(throttled_key=None)
+    provider = FreeCurrencyApiProvider(api_key='key', client=client)
+
+    assert provider.fetch_table('key', 'USD') == {'EUR': 0.9}
+    assert provider.fetch_table('key', 'USD') == {'EUR': 0.9}
+
+    assert client.keys == ['key']
+    assert provider.fresh == 1
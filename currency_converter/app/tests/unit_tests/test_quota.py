@@ -0,0 +1,79 @@
+import pytest
+from app.quota import ApiKeyPool, TokenBucket, parse_rate_limit_headers
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket_paces_after_the_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=2, clock=clock)
+
+    assert [bucket.take() for _ in range(3)] == [True, True, False]
+    assert bucket.wait_time() == pytest.approx(0.5)
+    clock.sleep(0.5)
+    assert bucket.take()
+
+
+def test_freecurrencyapi_headers():
+    quota = parse_rate_limit_headers({
+        'X-RateLimit-Limit-Quota-Minute': '10', 'X-RateLimit-Remaining-Quota-Minute': '7',
+        'X-RateLimit-Limit-Quota-Month': '5000', 'X-RateLimit-Remaining-Quota-Month': '4321',
+        'Content-Type': 'application/json',
+    })
+
+    assert quota['per_second'] == pytest.approx(10 / 60)
+    assert quota['window_remaining'] == 7
+    assert (quota['limit'], quota['remaining']) == (5000, 4321)
+
+
+def test_pool_prefers_the_key_with_most_quota():
+    pool = ApiKeyPool(['key_one_aaaa', 'key_two_bbbb'])
+    pool.record('key_one_aaaa', 200, {'X-RateLimit-Remaining': '10'})
+    pool.record('key_two_bbbb', 200, {'X-RateLimit-Remaining': '900'})
+
+    assert pool.acquire() == 'key_two_bbbb'
+
+
+def test_pool_rotates_when_a_key_runs_out_of_tokens():
+    clock = FakeClock()
+    pool = ApiKeyPool(['key_one_aaaa', 'key_two_bbbb'], rate=1.0, burst=1, clock=clock,
+                      sleep_function=clock.sleep)
+
+    keys = [pool.acquire() for _ in range(4)]
+
+    # Both keys burst once, then one wait of a second refills both
+    assert sorted(keys[:2]) == sorted(keys[2:]) == ['key_one_aaaa', 'key_two_bbbb']
+    assert clock.now == pytest.approx(1001.0)
+    assert sum(stats['waits'] for stats in pool.stats().values()) == 1
+
+
+def test_throttled_key_rests_and_pool_gives_up_after_max_wait():
+    clock = FakeClock()
+    pool = ApiKeyPool(['only_key_cccc'], max_wait=5, clock=clock, sleep_function=clock.sleep)
+    pool.record('only_key_cccc', 429, {'Retry-After': '30'})
+
+    assert pool.acquire() is None
+    clock.sleep(30)
+    assert pool.acquire() == 'only_key_cccc'
+    assert pool.stats()['only...cc']['throttled'] == 1
+
+
+def test_minute_limit_header_sets_the_pace():
+    clock = FakeClock()
+    pool = ApiKeyPool(['only_key_cccc'], clock=clock, sleep_function=clock.sleep, max_wait=120)
+    pool.record('only_key_cccc', 200, {'X-RateLimit-Limit-Quota-Minute': '10',
+                                       'X-RateLimit-Remaining-Quota-Minute': '0'})
+
+    assert pool.acquire() == 'only_key_cccc'
+    # The empty minute window rests the key for a minute
+    assert clock.now == pytest.approx(1060.0)
+    assert pool.stats()['only...cc']['requests_per_second'] == pytest.approx(10 / 60)
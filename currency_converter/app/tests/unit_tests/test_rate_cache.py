@@ -0,0 +1,103 @@
+import pytest
+from threading import Thread
+from time import sleep
+from app.rate_cache import RateCache
+
+
+class FakeClock:
+    # Manually advanced time source so TTL behaviour is deterministic
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_fresh_entry_is_served_from_cache(clock):
+    cache = RateCache(ttl=10, clock=clock)
+    calls = []
+
+    # First lookup is a miss and calls the loader
+    assert cache.get(('USD', 'EUR'), lambda: calls.append(1) or 0.91) == 0.91
+    # Second lookup within the TTL is a hit
+    clock.now = 5
+    assert cache.get(('USD', 'EUR'), lambda: calls.append(1) or 0.5) == 0.91
+
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_stale_entry_is_served_while_refreshing(clock):
+    cache = RateCache(ttl=10, stale_ttl=100, clock=clock)
+    cache.get(('USD', 'EUR'), lambda: 0.91)
+
+    # Past the TTL the old rate is still returned and a background refresh runs
+    clock.now = 20
+    assert cache.get(('USD', 'EUR'), lambda: 0.95) == 0.91
+
+    # Wait for the refresh thread to store the new rate
+    for _ in range(100):
+        if cache.stats()['refreshes']:
+            break
+        sleep(0.01)
+
+    assert cache.peek(('USD', 'EUR')) == 0.95
+    assert cache.stats()['stale_hits'] == 1
+
+
+def test_expired_entry_beyond_stale_window_is_a_miss(clock):
+    cache = RateCache(ttl=10, stale_ttl=10, clock=clock)
+    cache.get(('USD', 'EUR'), lambda: 0.91)
+
+    # Too old to serve, so the loader runs synchronously
+    clock.now = 50
+    assert cache.get(('USD', 'EUR'), lambda: 0.95) == 0.95
+    assert cache.stats()['misses'] == 2
+
+
+@pytest.mark.parametrize('max_size, expected_evictions', [
+    (1, 2),
+    (3, 0),
+])
+def test_least_recently_used_entries_are_evicted(clock, max_size, expected_evictions):
+    cache = RateCache(ttl=10, max_size=max_size, clock=clock)
+
+    for target in ('EUR', 'GBP', 'JPY'):
+        cache.get(('USD', target), lambda: 1.0)
+
+    assert cache.stats()['evictions'] == expected_evictions
+    # The most recently used pair always survives
+    assert cache.peek(('USD', 'JPY')) == 1.0
+
+
+def test_failed_load_is_not_cached(clock):
+    cache = RateCache(ttl=10, clock=clock)
+
+    assert cache.get(('USD', 'EUR'), lambda: None) is None
+    assert cache.stats()['size'] == 0
+
+
+def test_concurrent_misses_share_one_load(clock):
+    cache = RateCache(ttl=10, clock=clock)
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        sleep(0.2)
+        return 0.91
+
+    # Several threads miss on the same key at once
+    threads = [Thread(target=cache.get, args=(('USD', 'EUR'), slow_loader)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert cache.stats()['merged_misses'] == 4
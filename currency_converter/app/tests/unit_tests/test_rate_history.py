@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from app import rate_history
+from app.rate_history import RateHistory
+
+TABLES = {
+    '2024-01-31': {'EUR': 0.92, 'GBP': 0.79},
+    '2024-02-02': {'EUR': 0.93},
+    '2024-02-29': {'EUR': 0.94, 'GBP': 0.80},
+}
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = RateHistory(str(tmp_path))
+    history.add_tables('USD', TABLES)
+    return history
+
+
+def test_get_series_returns_the_date_range(history):
+    dates, rates = history.get_series('USD', 'GBP', '2024-02-01', '2024-02-29')
+
+    assert dates.tolist() == np.array(['2024-02-02', '2024-02-29'], dtype='datetime64[D]').tolist()
+    # GBP was not quoted on 2024-02-02
+    assert np.isnan(rates[0]) and rates[1] == 0.80
+
+
+@pytest.mark.parametrize('date, max_as_of_days, expected_rate', [
+    ('2024-01-31', 7, 0.92),
+    # Weekend after 2024-02-02 resolves to the previous close
+    ('2024-02-04', 7, 0.93),
+    ('2024-02-04', 0, None),
+    # Too far from any stored date
+    ('2024-02-20', 7, None),
+    ('2023-12-31', 7, None),
+])
+def test_get_rates_falls_back_to_the_previous_date(history, date, max_as_of_days, expected_rate):
+    rate = history.get_rates('USD', 'EUR', [date], max_as_of_days=max_as_of_days)[0]
+
+    if expected_rate is None:
+        assert np.isnan(rate)
+    else:
+        assert rate == expected_rate
+
+
+def test_saved_history_is_loaded_back(history, tmp_path):
+    history.save('USD')
+    reloaded = RateHistory(str(tmp_path))
+
+    rates = reloaded.get_rates('USD', 'EUR', ['2024-02-29', '2024-01-31'])
+    assert rates.tolist() == [0.94, 0.92]
+
+
+class FakeProvider:
+    def __init__(self):
+        self.dates = []
+
+    def fetch_table(self, api_key, base_currency, date=None):
+        self.dates.append(date)
+        return TABLES.get(date)
+
+
+def test_convert_dated_fetches_each_missing_date_once(tmp_path):
+    provider = FakeProvider()
+    dates = ['2024-01-31', '2024-02-29', '2024-01-31', '2024-02-29']
+
+    with patch.object(rate_history, 'rate_history', RateHistory(str(tmp_path))), \
+            patch.object(rate_history.conversion, 'rate_provider', provider):
+        converted = rate_history.convert_dated('api_key', 'USD', 'EUR', dates, [100.0, 100.0, 50.0, 10.0])
+        # Everything is stored now, nothing more is fetched
+        rate_history.convert_dated('api_key', 'USD', 'EUR', dates, [1.0, 1.0, 1.0, 1.0])
+
+    assert converted == pytest.approx([92.0, 94.0, 46.0, 9.4])
+    assert sorted(provider.dates) == ['2024-01-31', '2024-02-29']
+
+
+def test_failed_dates_are_not_fetched_again(tmp_path):
+    provider = FakeProvider()
+    # The provider has no table for this date
+    dates = ['2024-01-31', '2023-12-25']
+
+    with patch.object(rate_history, 'rate_history', RateHistory(str(tmp_path))), \
+            patch.object(rate_history.conversion, 'rate_provider', provider):
+        for _ in range(3):
+            rates = rate_history.get_historical_rates('api_key', 'USD', 'EUR', dates)
+
+    assert sorted(provider.dates) == ['2023-12-25', '2024-01-31']
+    assert rates[0] == pytest.approx(0.92)
+    assert np.isnan(rates[1])
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from app.rate_matrix import RateMatrix, quoted_currencies
+
+TABLE = {'EUR': 0.9, 'GBP': 0.8, 'JPY': 150.0}
+
+
+@pytest.fixture
+def matrix():
+    return RateMatrix.from_base_rates('USD', TABLE, ['EUR', 'GBP', 'JPY', 'USD', 'XYZ'])
+
+
+@pytest.mark.parametrize('source, target, expected', [
+    ('USD', 'EUR', 0.9),
+    ('EUR', 'USD', 1 / 0.9),
+    ('EUR', 'JPY', 150.0 / 0.9),
+    ('GBP', 'GBP', 1.0),
+    ('USD', 'XYZ', None),
+    ('USD', 'ABC', None),
+])
+def test_rate(matrix, source, target, expected):
+    assert matrix.rate(source, target) == pytest.approx(expected)
+
+
+def test_inverse_and_triangulated_lookups_agree(matrix):
+    assert matrix.inverse('EUR', 'JPY') == pytest.approx(matrix.rate('EUR', 'JPY'))
+    assert matrix.triangulate('EUR', 'JPY', via='GBP') == pytest.approx(matrix.rate('EUR', 'JPY'))
+    assert matrix.triangulate('EUR', 'JPY', via='XYZ') is None
+
+
+def test_get_rates_looks_up_many_pairs(matrix):
+    rates = matrix.get_rates(['USD', 'GBP', 'ABC'], ['JPY', 'EUR', 'USD'])
+
+    assert rates[:2] == pytest.approx([150.0, 0.9 / 0.8])
+    assert np.isnan(rates[2])
+    assert quoted_currencies(matrix) == ['EUR', 'GBP', 'JPY', 'USD']
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_saved_matrix_loads_back(matrix, tmp_path, mmap):
+    output = str(tmp_path / 'rates.npy')
+    matrix.save(output)
+
+    loaded = RateMatrix.load(output, mmap=mmap)
+
+    assert loaded.currencies == matrix.currencies
+    assert isinstance(loaded.rates.base, np.memmap) == mmap
+    np.testing.assert_array_equal(loaded.rates, matrix.rates)
+
+
+def test_csv_export(matrix, tmp_path):
+    output = tmp_path / 'rates.csv'
+    matrix.to_csv(str(output))
+
+    lines = output.read_text(encoding='utf-8').splitlines()
+    assert lines[0] == ',EUR,GBP,JPY,USD,XYZ'
+    assert lines[4] == 'USD,0.9,0.8,150.0,1.0,'
@@ -0,0 +1,61 @@
+import pytest
+from unittest.mock import patch
+from app.rate_cache import RateCache
+from app.rate_store import RateStore
+from app import conversion
+
+
+@pytest.fixture
+def store(tmp_path):
+    rate_store = RateStore(str(tmp_path / 'rates.sqlite3'), max_age=900)
+    yield rate_store
+    rate_store.close()
+
+
+def test_newest_snapshot_is_loaded(store):
+    store.save('USD', {'EUR': 0.9}, fetched_at=1000)
+    store.save('USD', {'EUR': 0.95}, fetched_at=2000)
+
+    rates, fetched_at = store.load('USD')
+
+    assert rates == {'EUR': 0.95}
+    assert fetched_at == 2000
+
+
+def test_old_snapshot_is_ignored_with_max_age(store):
+    store.save('USD', {'EUR': 0.9}, fetched_at=1000)
+
+    assert store.load('USD', max_age=60) is None
+    assert store.load('GBP') is None
+
+
+@pytest.mark.parametrize('offline, fetched_rates, expected_rates, expected_fetches', [
+    # Fresh snapshot answers the cold start without the network
+    (False, {'EUR': 0.95}, {'EUR': 0.9}, 0),
+    # Offline mode never calls the API
+    (True, {'EUR': 0.95}, {'EUR': 0.9}, 0),
+])
+def test_cold_start_is_answered_from_the_store(store, offline, fetched_rates, expected_rates, expected_fetches):
+    store.save('USD', {'EUR': 0.9})
+    store.offline = offline
+
+    with patch.object(conversion, 'rate_store', store), \
+            patch.object(conversion, 'rate_cache', RateCache()), \
+            patch.object(conversion, 'fetch_rate_table', return_value=fetched_rates) as mock_fetch:
+        rates = conversion.load_rate_table('api_key', 'USD')
+
+    assert rates == expected_rates
+    assert mock_fetch.call_count == expected_fetches
+
+
+def test_stale_snapshot_is_used_when_the_api_fails(store):
+    store.save('USD', {'EUR': 0.9}, fetched_at=1000)
+
+    with patch.object(conversion, 'rate_store', store), \
+            patch.object(conversion, 'rate_cache', RateCache()), \
+            patch.object(conversion, 'fetch_rate_table', return_value=None):
+        rates = conversion.load_rate_table('api_key', 'USD')
+
+    assert rates == {'EUR': 0.9}
+    # The staleness reflects the snapshot's fetch time, not the load time
+    assert store.staleness('USD') > 900
@@ -0,0 +1,86 @@
+import pytest
+from app import conversion
+from app.rate_cache import RateCache
+from app.rate_table import RateTable
+
+# Sample tables as the provider would return them
+TABLES = {
+    'USD': {'USD': 1.0, 'EUR': 0.8, 'JPY': 120.0, 'GBP': 0.75},
+    'EUR': {'USD': 1.25, 'EUR': 1.0, 'JPY': 150.0, 'GBP': 0.9375},
+}
+
+
+@pytest.fixture
+def fetched():
+    # Records every base currency requested from the fake provider
+    return []
+
+
+@pytest.fixture
+def make_table(fetched):
+    def fetch_table(api_key, base_currency):
+        fetched.append(base_currency)
+        return TABLES.get(base_currency)
+
+    def make(strategy='direct'):
+        return RateTable(fetch_table, RateCache(ttl=300), pivot_currency='USD', strategy=strategy)
+
+    return make
+
+
+def test_one_request_answers_every_target(make_table, fetched):
+    table = make_table()
+
+    for target in ('EUR', 'JPY', 'GBP'):
+        table.get_rate('key', 'USD', target)
+
+    # Three lookups, one upstream request
+    assert fetched == ['USD']
+    assert table.stats()['requests_avoided'] == 2
+
+
+@pytest.mark.parametrize('source_currency, target_currency, expected_result', [
+    ('EUR', 'JPY', 150.0),
+    ('JPY', 'USD', 1 / 120.0),
+    ('GBP', 'EUR', 0.8 / 0.75),
+])
+def test_cross_rates_come_from_the_pivot_table(make_table, fetched, source_currency, target_currency,
+                                               expected_result):
+    table = make_table(strategy='pivot')
+
+    assert table.get_rate('key', source_currency, target_currency) == pytest.approx(expected_result)
+    assert fetched == ['USD']
+
+
+def test_cached_pivot_table_avoids_fetching_the_source_table(make_table, fetched):
+    table = make_table()
+    table.get_rate('key', 'USD', 'EUR')
+
+    # EUR->JPY is derived from the USD table already in memory
+    assert table.get_rate('key', 'EUR', 'JPY') == pytest.approx(150.0)
+    assert fetched == ['USD']
+
+
+def test_unknown_currency_returns_none(make_table):
+    table = make_table()
+
+    assert table.get_rate('key', 'USD', 'XYZ') is None
+    assert table.peek_rate('ABC', 'XYZ') is None
+
+
+def test_unknown_strategies_are_rejected(make_table):
+    with pytest.raises(ValueError):
+        make_table('pivt')
+
+    table = make_table('pivot')
+    with pytest.raises(ValueError):
+        table.strategy = 'pivt'
+    assert table.strategy == 'pivot'
+
+
+def test_configure_rate_table_rejects_unknown_strategies():
+    with pytest.raises(ValueError):
+        conversion.configure_rate_table(strategy='pivt', pivot_currency='EUR')
+    # Nothing was changed by the rejected call
+    assert conversion.rate_table.strategy == 'direct'
+    assert conversion.rate_table.pivot_currency == 'USD'
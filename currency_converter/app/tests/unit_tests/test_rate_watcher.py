@@ -0,0 +1,105 @@
+import pytest
+from unittest.mock import patch
+from app import rate_watcher
+from app.rate_watcher import RateChange, RateWatcher
+
+TABLES = {
+    'USD': {'EUR': 0.9, 'JPY': 150.0, 'GBP': 0.8},
+    'EUR': {'USD': 1.11, 'GBP': 0.88},
+}
+
+
+class FakeFetch:
+    def __init__(self, tables):
+        self.tables = tables
+        self.bases = []
+
+    def __call__(self, api_key, base_currency):
+        self.bases.append(base_currency)
+        return self.tables.get(base_currency)
+
+
+def test_pairs_sharing_a_base_cost_one_request():
+    fetch = FakeFetch(TABLES)
+    watcher = RateWatcher(fetch)
+    for target in ('EUR', 'JPY', 'GBP'):
+        watcher.subscribe('USD', target, lambda change: None)
+    watcher.subscribe('EUR', 'GBP', lambda change: None)
+
+    rates = watcher.poll('api_key')
+
+    assert sorted(fetch.bases) == ['EUR', 'USD']
+    assert rates == {('USD', 'EUR'): 0.9, ('USD', 'JPY'): 150.0, ('USD', 'GBP'): 0.8, ('EUR', 'GBP'): 0.88}
+
+
+def test_pivot_currency_answers_every_pair_with_one_request():
+    fetch = FakeFetch(TABLES)
+    watcher = RateWatcher(fetch, pivot_currency='USD')
+    watcher.subscribe('EUR', 'JPY', lambda change: None)
+    watcher.subscribe('GBP', 'USD', lambda change: None)
+
+    rates = watcher.poll('api_key')
+
+    assert fetch.bases == ['USD']
+    assert rates[('EUR', 'JPY')] == pytest.approx(150.0 / 0.9)
+    assert rates[('GBP', 'USD')] == pytest.approx(1 / 0.8)
+
+
+@pytest.mark.parametrize('new_rate, notified', [
+    (0.9, False),
+    # 0.04% is within the 0.05% threshold
+    (0.90036, False),
+    (0.9005, True),
+    (0.8995, True),
+])
+def test_subscribers_are_notified_past_the_threshold(new_rate, notified):
+    changes = []
+    watcher = RateWatcher(FakeFetch({'USD': {'EUR': new_rate}}), threshold=0.0005)
+    watcher.subscribe('USD', 'EUR', changes.append, rate=0.9)
+
+    watcher.check('api_key')
+
+    assert changes == ([RateChange('USD', 'EUR', 0.9, new_rate)] if notified else [])
+
+
+def test_small_moves_add_up_against_the_last_notified_rate():
+    changes = []
+    tables = {'USD': {'EUR': 0.9}}
+    watcher = RateWatcher(FakeFetch(tables), threshold=0.001)
+    watcher.subscribe('USD', 'EUR', changes.append)
+
+    # First poll tells the subscriber the rate, then three 0.04% steps
+    for rate in (0.9, 0.90036, 0.90072, 0.90108):
+        tables['USD']['EUR'] = rate
+        watcher.check('api_key')
+
+    assert [change.new_rate for change in changes] == [0.9, 0.90108]
+
+
+def test_failing_base_and_subscriber_do_not_stop_the_others():
+    def fetch(api_key, base_currency):
+        if base_currency == 'EUR':
+            raise OSError('connection reset')
+        return TABLES[base_currency]
+
+    changes = []
+    watcher = RateWatcher(fetch)
+    watcher.subscribe('EUR', 'GBP', changes.append)
+    watcher.subscribe('USD', 'JPY', lambda change: 1 / 0)
+    watcher.subscribe('USD', 'JPY', changes.append)
+
+    with patch.object(rate_watcher, 'log_error') as log_error:
+        watcher.check('api_key')
+
+    assert changes == [RateChange('USD', 'JPY', None, 150.0)]
+    assert log_error.call_count == 2
+
+
+def test_unsubscribed_pairs_are_no_longer_fetched():
+    fetch = FakeFetch(TABLES)
+    watcher = RateWatcher(fetch)
+    subscription = watcher.subscribe('EUR', 'GBP', lambda change: None)
+    watcher.unsubscribe(subscription)
+
+    assert watcher.poll('api_key') == {}
+    assert fetch.bases == []